@@ -0,0 +1,150 @@
+"""
+Latência da fila e do /estatisticas conforme o histórico cresce, com e
+sem arquivamento.
+
+Mantém um conjunto quente fixo (fila, em atendimento e finalizados
+recentes) e adiciona histórico finalizado antigo em passos de --passo
+atendimentos (com --mensagens mensagens cada). Primeiro o histórico fica
+todo na tabela quente; depois ele é arquivado e o crescimento se repete
+arquivando a cada passo. Com o arquivo, as duas rotas devem ficar planas.
+
+    python -m benchmarks.arquivamento --passo 200000 --passos 4
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def popular_quente(db, Atendimento, Cliente, Agente, total, rng):
+    agora = datetime.utcnow()
+    db.session.execute(Cliente.__table__.insert(), [{'nome': 'Bench', 'telefone': '0'}])
+    db.session.execute(Agente.__table__.insert(), [
+        {'nome': f'Agente {i}', 'email': f'bench{i}@x', 'senha_hash': '-', 'status': 'online'}
+        for i in range(20)
+    ])
+    db.session.execute(Atendimento.__table__.insert(), [
+        {
+            'cliente_id': 1,
+            'agente_id': None if status == 'fila' else rng.randint(1, 20),
+            'status': status,
+            'prioridade': rng.choice([0, 0, 0, 1, 2]),
+            'iniciado_em': agora - timedelta(hours=rng.uniform(0, 48)),
+            'finalizado_em': agora - timedelta(hours=rng.uniform(0, 24)) if status == 'finalizado' else None,
+            'tempo_espera': rng.randint(5, 900) if status != 'fila' else None,
+            'tempo_atendimento': rng.randint(60, 3600) if status == 'finalizado' else None
+        }
+        for status in rng.choices(['fila', 'em_atendimento', 'finalizado'], [20, 20, 60], k=total)
+    ])
+    db.session.commit()
+
+
+def adicionar_historico(db, Atendimento, AtendimentoArquivado, Mensagem, total, mensagens, rng):
+    """Atendimentos finalizados entre 100 e 1000 dias atrás, com mensagens"""
+    agora = datetime.utcnow()
+    # Ids novos acima dos já arquivados, como numa tabela que só cresce
+    ultimo_id = max(
+        db.session.query(db.func.max(Atendimento.id)).scalar() or 0,
+        db.session.query(db.func.max(AtendimentoArquivado.id)).scalar() or 0
+    )
+
+    for inicio in range(0, total, 20000):
+        atendimentos = []
+        linhas_mensagens = []
+        for i in range(inicio, min(total, inicio + 20000)):
+            atendimento_id = ultimo_id + i + 1
+            iniciado = agora - timedelta(days=rng.uniform(100, 1000))
+            atendimentos.append({
+                'id': atendimento_id,
+                'cliente_id': 1,
+                'agente_id': rng.randint(1, 20),
+                'status': 'finalizado',
+                'prioridade': 0,
+                'iniciado_em': iniciado,
+                'finalizado_em': iniciado + timedelta(minutes=30),
+                'tempo_espera': rng.randint(5, 900),
+                'tempo_atendimento': rng.randint(60, 3600)
+            })
+            linhas_mensagens += [
+                {'atendimento_id': atendimento_id, 'cliente_id': 1, 'remetente': 'cliente', 'conteudo': 'histórico',
+                 'enviada_em': iniciado + timedelta(minutes=j)}
+                for j in range(mensagens)
+            ]
+        db.session.execute(Atendimento.__table__.insert(), atendimentos)
+        if linhas_mensagens:
+            db.session.execute(Mensagem.__table__.insert(), linhas_mensagens)
+        db.session.commit()
+
+
+def p50(cliente, url, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resposta = cliente.get(url)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        assert resposta.status_code == 200, resposta.get_json()
+    tempos.sort()
+    return tempos[len(tempos) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quentes', type=int, default=2000, help='atendimentos do conjunto quente')
+    parser.add_argument('--passo', type=int, default=100000, help='histórico adicionado por passo')
+    parser.add_argument('--passos', type=int, default=4)
+    parser.add_argument('--mensagens', type=int, default=3, help='mensagens por atendimento histórico')
+    parser.add_argument('--repeticoes', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    # Mede o cálculo, não o cache
+    os.environ['ESTATISTICAS_TTL'] = '0'
+
+    from src.main import app
+    from src.models.user import db
+    from src.models.atendimento import Agente, Atendimento, AtendimentoArquivado, Cliente, Mensagem
+    from src.services import arquivamento
+
+    rng = random.Random(args.seed)
+    cliente = app.test_client()
+    with app.app_context():
+        popular_quente(db, Atendimento, Cliente, Agente, args.quentes, rng)
+
+    print(f'{"modo":<16} {"histórico":>10} {"quentes":>9} {"/fila p50":>11} {"/estatisticas p50":>19}')
+
+    def medir(modo, historico):
+        with app.app_context():
+            quentes = Atendimento.query.count()
+        fila = p50(cliente, '/api/fila', args.repeticoes)
+        estatisticas = p50(cliente, '/api/estatisticas', args.repeticoes)
+        print(f'{modo:<16} {historico:>10} {quentes:>9} {fila:>9.2f}ms {estatisticas:>17.2f}ms')
+
+    historico = 0
+    for _ in range(args.passos):
+        with app.app_context():
+            adicionar_historico(db, Atendimento, AtendimentoArquivado, Mensagem, args.passo, args.mensagens, rng)
+        historico += args.passo
+        medir('sem arquivo', historico)
+
+    with app.app_context():
+        inicio = time.perf_counter()
+        atendimentos, mensagens = arquivamento.arquivar(dias=90, lote=2000, pausa=0)
+        duracao = time.perf_counter() - inicio
+    print(f'arquivados {atendimentos} atendimentos e {mensagens} mensagens em {duracao:.1f}s '
+          f'({atendimentos / duracao:.0f} atendimentos/s)')
+    medir('com arquivo', historico)
+
+    for _ in range(args.passos):
+        with app.app_context():
+            adicionar_historico(db, Atendimento, AtendimentoArquivado, Mensagem, args.passo, args.mensagens, rng)
+            arquivamento.arquivar(dias=90, lote=2000, pausa=0)
+        historico += args.passo
+        medir('com arquivo', historico)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Latência da busca de clientes com uma base grande.
+
+Gera clientes sintéticos (nome, email e telefone), monta o índice de
+busca e mede p50/p99 de consultas por prefixo de nome, nome completo,
+começo e final do telefone, comparando com o ILIKE '%termo%' antigo.
+Para rodar contra MySQL/Postgres, defina DATABASE_URL.
+
+    python -m benchmarks.busca_clientes --clientes 2000000 --consultas 200
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+NOMES = ['Ana', 'João', 'Maria', 'José', 'Antônio', 'Francisca', 'Carlos', 'Paulo', 'Lúcia', 'Pedro',
+         'Luiz', 'Marcos', 'Gabriel', 'Rafael', 'Juliana', 'Fernanda', 'Letícia', 'Bruno', 'Mariana', 'Vitória']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima',
+              'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Araújo', 'Melo', 'Barbosa', 'Cardoso']
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def medir(funcao, consultas):
+    tempos = []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        funcao(consulta)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return percentil(tempos, 0.5), percentil(tempos, 0.99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clientes', type=int, default=2000000)
+    parser.add_argument('--consultas', type=int, default=200)
+    parser.add_argument('--lote', type=int, default=20000)
+    parser.add_argument('--sem-ilike', dest='ilike', action='store_false', help='pula a comparação com o ILIKE')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    from src.main import app
+    from src.models.user import db
+    from src.models.atendimento import Cliente
+    from src.services import busca_clientes
+
+    rng = random.Random(args.seed)
+
+    def gerar(i):
+        nome = f'{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}'
+        return {
+            'nome': nome,
+            'telefone': f'55{rng.randint(11, 99)}9{i:08d}',
+            'email': f'{nome.split()[0].lower()}{i}@exemplo.com' if i % 3 else None
+        }
+
+    with app.app_context():
+        inicio = time.perf_counter()
+        for base in range(0, args.clientes, args.lote):
+            db.session.execute(Cliente.__table__.insert(), [
+                gerar(i) for i in range(base, min(base + args.lote, args.clientes))
+            ])
+        db.session.commit()
+        print(f'{args.clientes} clientes inseridos em {time.perf_counter() - inicio:.1f}s')
+
+        inicio = time.perf_counter()
+        busca_clientes.reindexar(args.lote)
+        print(f'índice montado em {time.perf_counter() - inicio:.1f}s')
+
+        amostra = [gerar(rng.randrange(args.clientes)) for _ in range(args.consultas)]
+        cenarios = {
+            'prefixo do nome': [c['nome'].split()[1][:4] for c in amostra],
+            'nome completo': [c['nome'] for c in amostra],
+            'início do telefone': [c['telefone'][:8] for c in amostra],
+            'final do telefone': [c['telefone'][-4:] for c in amostra],
+        }
+
+        def ilike(termo):
+            Cliente.query.filter(db.or_(
+                Cliente.nome.ilike(f'%{termo}%'),
+                Cliente.telefone.ilike(f'%{termo}%'),
+                Cliente.email.ilike(f'%{termo}%')
+            )).limit(busca_clientes.LIMITE_PADRAO).all()
+
+        print(f'{"consulta":<20} {"índice p50":>11} {"p99 (ms)":>9} {"ilike p50":>10} {"p99 (ms)":>9}')
+        for nome, consultas in cenarios.items():
+            p50, p99 = medir(busca_clientes.buscar, consultas)
+            linha = f'{nome:<20} {p50:>11.2f} {p99:>9.2f}'
+            if args.ilike:
+                # O ILIKE varre a tabela inteira; poucas consultas já bastam
+                i50, i99 = medir(ilike, consultas[:20])
+                linha += f' {i50:>10.2f} {i99:>9.2f}'
+            print(linha)
+            db.session.remove()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""
+Driver de carga HTTP com um mix realista de uso.
+
+Três tipos de usuário virtual rodam em paralelo por --duracao segundos:
+
+- painel: polling do dashboard (estatísticas, fila, atendimentos em
+  andamento e agentes disponíveis) a cada --intervalo-painel segundos;
+- bot: mensagens de clientes em /api/chatbot/processar, ~20% pedindo
+  atendente (o que alimenta a fila);
+- agente: pega o próximo da fila, lê o histórico, envia mensagens e
+  finaliza; com a fila vazia, espera um pouco e tenta de novo.
+
+Sem --url, popula um banco novo com benchmarks.dados (--escala) e sobe o
+gunicorn. O resultado por endpoint (p50/p95/p99 e vazão) é impresso e,
+com --saida, gravado em JSON para comparar com benchmarks.relatorio.
+
+    python -m benchmarks.carga --escala 100k --painel 20 --bots 20 --agentes 10 --saida antes.json
+    python -m benchmarks.carga --url http://localhost:8000 --duracao 120 --saida depois.json
+    python -m benchmarks.relatorio depois.json --base antes.json
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import requests
+from benchmarks.relatorio import imprimir, resumir
+
+TEXTOS_BOT = ['oi', 'bom dia', 'qual o horário?', 'vendas', 'suporte', 'meu pedido não chegou', 'obrigado',
+              'financeiro', 'segunda via do boleto']
+
+
+class Coletor:
+    """Latências e erros por endpoint, compartilhados entre as threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = {}
+        self.erros = {}
+
+    def registrar(self, endpoint, inicio, ok):
+        duracao = (time.perf_counter() - inicio) * 1000
+        with self._lock:
+            self.latencias.setdefault(endpoint, []).append(duracao)
+            if not ok:
+                self.erros[endpoint] = self.erros.get(endpoint, 0) + 1
+
+
+class Usuario:
+    def __init__(self, url, coletor, rng, fim):
+        self.url = url
+        self.coletor = coletor
+        self.rng = rng
+        self.fim = fim
+        self.sessao = requests.Session()
+
+    def chamar(self, metodo, endpoint, caminho, esperado=(200, 201), **kwargs):
+        inicio = time.perf_counter()
+        try:
+            resposta = self.sessao.request(metodo, self.url + caminho, timeout=60, **kwargs)
+        except requests.RequestException:
+            self.coletor.registrar(endpoint, inicio, False)
+            return None
+        self.coletor.registrar(endpoint, inicio, resposta.status_code in esperado)
+        return resposta
+
+    def ativo(self):
+        return time.monotonic() < self.fim
+
+
+class Painel(Usuario):
+    def __init__(self, *args, intervalo):
+        super().__init__(*args)
+        self.intervalo = intervalo
+        self.etags = {}
+
+    def consultar(self, endpoint, caminho):
+        # Como o frontend: reenvia o ETag e aceita 304
+        etag = self.etags.get(caminho)
+        resposta = self.chamar('GET', endpoint, caminho, esperado=(200, 304),
+                               headers={'If-None-Match': etag} if etag else None)
+        if resposta is not None and resposta.status_code == 200 and 'ETag' in resposta.headers:
+            self.etags[caminho] = resposta.headers['ETag']
+
+    def executar(self):
+        while self.ativo():
+            self.consultar('GET /api/estatisticas', '/api/estatisticas')
+            self.consultar('GET /api/fila', '/api/fila')
+            self.consultar('GET /api/atendimentos?status=em_atendimento', '/api/atendimentos?status=em_atendimento&limit=20')
+            self.consultar('GET /api/agentes/disponiveis', '/api/agentes/disponiveis')
+            time.sleep(self.intervalo)
+
+
+class Bot(Usuario):
+    def __init__(self, *args, telefones):
+        super().__init__(*args)
+        self.telefones = telefones
+
+    def executar(self):
+        while self.ativo():
+            texto = 'quero falar com atendente' if self.rng.random() < 0.2 else self.rng.choice(TEXTOS_BOT)
+            self.chamar('POST', 'POST /api/chatbot/processar', '/api/chatbot/processar', json={
+                'telefone': f'+5599{self.rng.randrange(self.telefones):09d}',
+                'mensagem': texto,
+                'nome': 'Cliente Carga'
+            })
+
+
+class Agente(Usuario):
+    def __init__(self, *args, agente_id, mensagens):
+        super().__init__(*args)
+        self.agente_id = agente_id
+        self.mensagens = mensagens
+
+    def executar(self):
+        while self.ativo():
+            resposta = self.chamar('POST', 'POST /api/fila/proximo', '/api/fila/proximo', esperado=(200, 404, 400),
+                                   json={'agente_id': self.agente_id})
+            if resposta is None or resposta.status_code != 200:
+                # Fila vazia ou agente sem capacidade
+                time.sleep(0.5)
+                continue
+            atendimento_id = resposta.json()['id']
+            self.chamar('GET', 'GET /api/atendimentos/{id}/mensagens', f'/api/atendimentos/{atendimento_id}/mensagens')
+            for _ in range(self.mensagens):
+                self.chamar('POST', 'POST /api/atendimentos/{id}/mensagens', f'/api/atendimentos/{atendimento_id}/mensagens',
+                            json={'remetente': 'agente', 'agente_id': self.agente_id, 'conteudo': 'Em que posso ajudar?'})
+            self.chamar('POST', 'POST /api/atendimentos/{id}/finalizar', f'/api/atendimentos/{atendimento_id}/finalizar',
+                        json={'avaliacao': self.rng.randint(3, 5)})
+
+
+def preparar_banco(args):
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    from src.main import app
+    from benchmarks.dados import gerar, ler_escala
+    with app.app_context():
+        gerar(ler_escala(args.escala), args.seed, progresso=lambda _: None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='servidor já em execução (não gera dados nem sobe gunicorn)')
+    parser.add_argument('--escala', default='100k', help='mensagens geradas antes da carga (sem --url)')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--painel', type=int, default=10, help='usuários do dashboard')
+    parser.add_argument('--intervalo-painel', type=float, default=1.0, help='segundos entre atualizações do painel')
+    parser.add_argument('--bots', type=int, default=10, help='clientes falando com o bot')
+    parser.add_argument('--telefones', type=int, default=5000, help='telefones distintos usados pelos bots')
+    parser.add_argument('--agentes', type=int, default=5, help='agentes atendendo a fila')
+    parser.add_argument('--mensagens', type=int, default=3, help='mensagens enviadas por atendimento')
+    parser.add_argument('--duracao', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--saida', help='grava o resultado em JSON')
+    args = parser.parse_args()
+
+    processo = None
+    url = args.url
+    if not url:
+        if 'DATABASE_URL' not in os.environ:
+            preparar_banco(args)
+        from benchmarks.pool import subir_gunicorn
+        processo, url = subir_gunicorn(args)
+
+    try:
+        agentes = [a['id'] for a in requests.get(f'{url}/api/agentes?limit=200&count=false', timeout=30).json()['agentes']]
+        coletor = Coletor()
+        fim = time.monotonic() + args.duracao
+        rng = random.Random(args.seed)
+
+        def novo(classe, **kwargs):
+            return classe(url, coletor, random.Random(rng.random()), fim, **kwargs)
+
+        usuarios = [novo(Painel, intervalo=args.intervalo_painel) for _ in range(args.painel)]
+        usuarios += [novo(Bot, telefones=args.telefones) for _ in range(args.bots)]
+        usuarios += [novo(Agente, agente_id=agentes[i % len(agentes)], mensagens=args.mensagens) for i in range(args.agentes)]
+
+        threads = [threading.Thread(target=u.executar) for u in usuarios]
+        inicio = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        duracao = time.perf_counter() - inicio
+    finally:
+        if processo:
+            processo.terminate()
+            processo.wait()
+
+    resultado = resumir(coletor.latencias, coletor.erros, duracao)
+    resultado['meta'] = {
+        'url': args.url or 'gunicorn local',
+        'escala': None if args.url else args.escala,
+        'workers': None if args.url else args.workers,
+        'threads': None if args.url else args.threads,
+        'painel': args.painel,
+        'bots': args.bots,
+        'agentes': args.agentes,
+        'duracao': args.duracao,
+        'seed': args.seed,
+    }
+    imprimir(resultado)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""
+Gerador determinístico de dados sintéticos.
+
+Popula agentes, clientes, atendimentos e mensagens no banco de
+DATABASE_URL (SQLite ou MySQL) com inserts em lote. --escala é o total de
+mensagens (10k a 10M, aceita sufixos k/m); as demais tabelas seguem a
+proporção de um ambiente real: 10 mensagens por atendimento, 4
+atendimentos por cliente e um agente a cada 20k mensagens (entre 10 e
+500). A mesma semente e a mesma --referencia geram os mesmos dados; as
+datas são relativas à referência (padrão: hoje, 00:00 UTC), então as
+rotas de "últimas 24h" sempre têm movimento.
+
+Tabelas com dados são estendidas a partir do maior id existente.
+
+    python -m benchmarks.dados --escala 100k
+    DATABASE_URL=mysql+pymysql://u:s@host/db python -m benchmarks.dados --escala 10m --referencia 2026-01-01
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+LOTE = 10000
+DEPARTAMENTOS = ['vendas', 'suporte', 'financeiro']
+NOMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Fábio', 'Gabriela', 'Hugo', 'Isabela', 'João',
+         'Karina', 'Lucas', 'Marina', 'Nelson', 'Olívia', 'Paulo', 'Renata', 'Sérgio', 'Tatiane', 'Vítor']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima', 'Gomes']
+TEXTOS_CLIENTE = ['oi', 'bom dia', 'meu pedido não chegou', 'quero a segunda via do boleto', 'qual o prazo de entrega?',
+                  'preciso trocar um produto', 'obrigado!', 'ainda estou aguardando', 'pode me ajudar?']
+TEXTOS_AGENTE = ['Olá! Em que posso ajudar?', 'Vou verificar para você.', 'Pode me informar o número do pedido?',
+                 'Já encaminhei a solicitação.', 'Mais alguma dúvida?', 'Obrigado pelo contato!']
+# Status dos atendimentos: a maior parte do histórico já foi finalizada
+STATUS = (['finalizado', 'fila', 'em_atendimento', 'bot'], [94, 2, 2, 2])
+
+
+def ler_escala(valor):
+    valor = valor.strip().lower()
+    multiplicador = {'k': 1000, 'm': 1000000}.get(valor[-1], 1)
+    return int(float(valor.rstrip('km')) * multiplicador)
+
+
+def proporcoes(escala):
+    atendimentos = max(1, escala // 10)
+    return {
+        'mensagens': escala,
+        'atendimentos': atendimentos,
+        'clientes': max(1, atendimentos // 4),
+        'agentes': min(500, max(10, escala // 20000)),
+    }
+
+
+def _maior_id(db, modelo):
+    return db.session.query(db.func.max(modelo.id)).scalar() or 0
+
+
+def gerar(escala, seed=42, referencia=None, progresso=print):
+    """
+    Gera os dados na sessão do app (chamar dentro de um app_context).
+    Retorna as quantidades inseridas por tabela.
+    """
+    from werkzeug.security import generate_password_hash
+    from src.models.user import db
+    from src.models.atendimento import Agente, Atendimento, Cliente, Mensagem
+    from src.services import busca_clientes, estatisticas_agente
+
+    rng = random.Random(seed)
+    referencia = referencia or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    totais = proporcoes(escala)
+
+    # Agentes: todos online, com a senha 'bench' para o driver de carga
+    base_agente = _maior_id(db, Agente)
+    senha = generate_password_hash('bench')
+    agentes = list(range(base_agente + 1, base_agente + totais['agentes'] + 1))
+    db.session.execute(Agente.__table__.insert(), [
+        {'id': agente_id, 'nome': f'Agente {agente_id}', 'email': f'agente{agente_id}@bench.local', 'senha_hash': senha,
+         'status': 'online', 'max_atendimentos': 5, 'atendimentos_ativos': 0, 'criado_em': referencia - timedelta(days=400)}
+        for agente_id in agentes
+    ])
+    db.session.commit()
+
+    base_cliente = _maior_id(db, Cliente)
+    for inicio in range(0, totais['clientes'], LOTE):
+        linhas = []
+        for i in range(inicio, min(totais['clientes'], inicio + LOTE)):
+            cliente_id = base_cliente + i + 1
+            nome = f'{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}'
+            linhas.append({
+                'id': cliente_id,
+                'nome': nome,
+                'telefone': f'+55{cliente_id:011d}',
+                'email': f'cliente{cliente_id}@exemplo.com.br' if rng.random() < 0.6 else None,
+                'criado_em': referencia - timedelta(days=rng.uniform(30, 730)),
+                'ultima_interacao': referencia - timedelta(days=rng.uniform(0, 30)),
+            })
+        db.session.execute(Cliente.__table__.insert(), linhas)
+        # Inserts em lote não passam pelos eventos do ORM
+        busca_clientes.indexar([SimpleNamespace(**linha) for linha in linhas])
+        db.session.commit()
+    progresso(f'clientes: {totais["clientes"]}')
+
+    base_atendimento = _maior_id(db, Atendimento)
+    base_mensagem = _maior_id(db, Mensagem)
+    ativos = {}
+    mensagem_id = base_mensagem
+    restantes = totais['mensagens']
+    for inicio in range(0, totais['atendimentos'], LOTE):
+        atendimentos = []
+        mensagens = []
+        for i in range(inicio, min(totais['atendimentos'], inicio + LOTE)):
+            atendimento_id = base_atendimento + i + 1
+            status = rng.choices(*STATUS)[0]
+            # ~5% do histórico cai nas últimas 24h; abertos são sempre recentes
+            if status != 'finalizado' or rng.random() < 0.05:
+                iniciado = referencia - timedelta(hours=rng.uniform(0, 24))
+            else:
+                iniciado = referencia - timedelta(days=rng.uniform(1, 365))
+            espera = rng.randint(5, 900)
+            duracao = rng.randint(60, 3600)
+            agente_id = rng.choice(agentes) if status in ('finalizado', 'em_atendimento') else None
+            if status == 'em_atendimento':
+                if ativos.get(agente_id, 0) >= 5:
+                    status, agente_id = 'fila', None
+                else:
+                    ativos[agente_id] = ativos.get(agente_id, 0) + 1
+            atendimentos.append({
+                'id': atendimento_id,
+                'cliente_id': base_cliente + rng.randrange(totais['clientes']) + 1,
+                'agente_id': agente_id,
+                'status': status,
+                'prioridade': rng.choices([0, 1, 2], [85, 12, 3])[0],
+                'departamento': rng.choice(DEPARTAMENTOS) if status != 'bot' else None,
+                'iniciado_em': iniciado,
+                'atribuido_em': iniciado + timedelta(seconds=espera) if agente_id else None,
+                'finalizado_em': iniciado + timedelta(seconds=espera + duracao) if status == 'finalizado' else None,
+                'tempo_espera': espera if agente_id else None,
+                'tempo_atendimento': duracao if status == 'finalizado' else None,
+                'avaliacao': rng.choice([None, 3, 4, 5, 5]) if status == 'finalizado' else None,
+            })
+
+            # Distribui as mensagens restantes entre os atendimentos restantes
+            faltam = totais['atendimentos'] - i
+            quantidade = restantes // faltam + (1 if rng.random() < (restantes % faltam) / faltam else 0)
+            restantes -= quantidade
+            momento = iniciado
+            for j in range(quantidade):
+                remetente = 'cliente' if j % 2 == 0 else ('agente' if agente_id else 'bot')
+                momento += timedelta(seconds=rng.randint(5, 120))
+                mensagem_id += 1
+                mensagens.append({
+                    'id': mensagem_id,
+                    'atendimento_id': atendimento_id,
+                    'cliente_id': atendimentos[-1]['cliente_id'],
+                    'agente_id': agente_id if remetente == 'agente' else None,
+                    'tipo': 'texto',
+                    'remetente': remetente,
+                    'conteudo': rng.choice(TEXTOS_CLIENTE if remetente == 'cliente' else TEXTOS_AGENTE),
+                    'lida': status == 'finalizado',
+                    'enviada_em': momento,
+                })
+        db.session.execute(Atendimento.__table__.insert(), atendimentos)
+        for parte in range(0, len(mensagens), LOTE):
+            db.session.execute(Mensagem.__table__.insert(), mensagens[parte:parte + LOTE])
+        db.session.commit()
+        progresso(f'atendimentos: {min(totais["atendimentos"], inicio + LOTE)}/{totais["atendimentos"]}')
+
+    for agente_id, total in ativos.items():
+        Agente.query.filter_by(id=agente_id).update({Agente.atendimentos_ativos: total})
+    db.session.commit()
+
+    # Totais por agente também são mantidos fora do ORM
+    estatisticas_agente.recalcular()
+    totais['mensagens'] = mensagem_id - base_mensagem
+    return totais
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escala', default='100k', help='total de mensagens: 10k, 1m, 10m...')
+    parser.add_argument('--referencia', help='data de referência ISO (padrão: hoje)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+        print(f'DATABASE_URL={os.environ["DATABASE_URL"]}')
+
+    from src.main import app
+
+    referencia = datetime.fromisoformat(args.referencia) if args.referencia else None
+    with app.app_context():
+        inicio = time.perf_counter()
+        totais = gerar(ler_escala(args.escala), args.seed, referencia)
+        duracao = time.perf_counter() - inicio
+    linhas = sum(totais.values())
+    print(', '.join(f'{tabela}: {total}' for tabela, total in totais.items()))
+    print(f'{linhas} linhas em {duracao:.1f}s -> {linhas / duracao:.0f} linhas/s')
+
+
+if __name__ == '__main__':
+    main()
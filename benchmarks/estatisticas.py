@@ -0,0 +1,107 @@
+"""
+Compara o /estatisticas antigo (seis COUNTs + médias calculadas em Python)
+com a agregação em uma única varredura e com a resposta em cache.
+
+    python -m benchmarks.estatisticas --atendimentos 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def popular(db, Atendimento, Cliente, Agente, total, seed):
+    rng = random.Random(seed)
+    agora = datetime.utcnow()
+    db.session.execute(Cliente.__table__.insert(), [{'nome': 'Bench', 'telefone': '0'}])
+    db.session.execute(Agente.__table__.insert(), [
+        {'nome': f'Agente {i}', 'email': f'bench{i}@x', 'senha_hash': '-', 'status': rng.choice(['online', 'offline'])}
+        for i in range(50)
+    ])
+
+    lote = []
+    for i in range(total):
+        # ~5% dos atendimentos caem nas últimas 24h
+        idade = rng.uniform(0, 1) if rng.random() < 0.05 else rng.uniform(1, 365)
+        status = rng.choices(['finalizado', 'fila', 'em_atendimento', 'bot'], [90, 3, 4, 3])[0]
+        lote.append({
+            'cliente_id': 1,
+            'status': status,
+            'prioridade': 0,
+            'iniciado_em': agora - timedelta(days=idade),
+            'tempo_espera': rng.randint(5, 900) if status != 'fila' else None,
+            'tempo_atendimento': rng.randint(60, 3600) if status == 'finalizado' else None
+        })
+        if len(lote) == 50000:
+            db.session.execute(Atendimento.__table__.insert(), lote)
+            lote = []
+    if lote:
+        db.session.execute(Atendimento.__table__.insert(), lote)
+    db.session.commit()
+
+
+def estatisticas_antigas(Atendimento, Agente):
+    """Reprodução da implementação anterior, para comparação"""
+    resultado = {
+        'total_atendimentos': Atendimento.query.count(),
+        'em_fila': Atendimento.query.filter_by(status='fila').count(),
+        'em_atendimento': Atendimento.query.filter_by(status='em_atendimento').count(),
+        'finalizados': Atendimento.query.filter_by(status='finalizado').count(),
+        'agentes_online': Agente.query.filter_by(status='online').count(),
+        'agentes_total': Agente.query.count(),
+    }
+    ontem = datetime.utcnow() - timedelta(days=1)
+    recentes = Atendimento.query.filter(Atendimento.iniciado_em >= ontem, Atendimento.tempo_espera.isnot(None)).all()
+    resultado['tempo_medio_espera'] = int(sum(a.tempo_espera for a in recentes) / len(recentes)) if recentes else 0
+    finalizados = Atendimento.query.filter(Atendimento.iniciado_em >= ontem, Atendimento.tempo_atendimento.isnot(None)).all()
+    resultado['tempo_medio_atendimento'] = int(sum(a.tempo_atendimento for a in finalizados) / len(finalizados)) if finalizados else 0
+    return resultado
+
+
+def medir(funcao, repeticoes, db):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        db.session.expunge_all()
+    tempos.sort()
+    return tempos[len(tempos) // 2], resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--atendimentos', type=int, default=1000000)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    from src.main import app
+    from src.models.user import db
+    from src.models.atendimento import Atendimento, Cliente, Agente
+    from src.services.estatisticas import calcular_estatisticas, obter_estatisticas
+
+    with app.app_context():
+        inicio = time.perf_counter()
+        popular(db, Atendimento, Cliente, Agente, args.atendimentos, args.seed)
+        print(f'{args.atendimentos} atendimentos gerados em {time.perf_counter() - inicio:.1f}s')
+
+        antigo, resultado_antigo = medir(lambda: estatisticas_antigas(Atendimento, Agente), args.repeticoes, db)
+        novo, resultado_novo = medir(calcular_estatisticas, args.repeticoes, db)
+        obter_estatisticas()
+        cache, _ = medir(obter_estatisticas, args.repeticoes, db)
+
+        print(f'{"implementação":<22} {"p50 (ms)":>10} {"speedup":>9}')
+        print(f'{"antiga":<22} {antigo:>10.1f} {1:>8.1f}x')
+        print(f'{"agregação única":<22} {novo:>10.1f} {antigo / novo:>8.1f}x')
+        print(f'{"agregação + cache":<22} {cache:>10.3f} {antigo / cache:>8.0f}x')
+        print('resultados iguais:', resultado_antigo == resultado_novo)
+
+
+if __name__ == '__main__':
+    main()
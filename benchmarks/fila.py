@@ -0,0 +1,99 @@
+"""
+Teste de estresse do /fila/proximo com vários agentes concorrentes.
+
+Enche a fila, dispara uma thread por agente reivindicando atendimentos
+até a fila esvaziar e confere que nenhum atendimento foi atribuído duas
+vezes e que nenhum agente passou do max_atendimentos. Para rodar contra
+MySQL/Postgres, defina DATABASE_URL.
+
+    python -m benchmarks.fila --agentes 16 --atendimentos 2000
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--agentes', type=int, default=16)
+    parser.add_argument('--atendimentos', type=int, default=2000)
+    parser.add_argument('--capacidade', type=int, default=1000000)
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    from src.main import app
+    from src.models.user import db
+    from src.models.atendimento import Agente, Cliente, Atendimento
+    from src.services import fila
+
+    with app.app_context():
+        db.session.execute(Cliente.__table__.insert(), [{'nome': 'Bench', 'telefone': 'bench'}])
+        cliente_id = Cliente.query.filter_by(telefone='bench').one().id
+        agentes = [
+            Agente(nome=f'Bench {i}', email=f'bench{i}@bench', senha_hash='-', status='online',
+                   max_atendimentos=args.capacidade, atendimentos_ativos=0, total_atendimentos=0)
+            for i in range(args.agentes)
+        ]
+        db.session.add_all(agentes)
+        db.session.execute(Atendimento.__table__.insert(), [
+            {'cliente_id': cliente_id, 'status': 'fila', 'prioridade': i % 3}
+            for i in range(args.atendimentos)
+        ])
+        db.session.commit()
+        agente_ids = [a.id for a in agentes]
+
+    reivindicados = []
+    erros = Counter()
+    lock = threading.Lock()
+    largada = threading.Barrier(len(agente_ids))
+
+    def agente_trabalhando(agente_id):
+        with app.app_context():
+            largada.wait()
+            while True:
+                try:
+                    atendimento = fila.reivindicar_proximo(agente_id)
+                except fila.CapacidadeEsgotada:
+                    break
+                except Exception as e:
+                    with lock:
+                        erros[type(e).__name__] += 1
+                    continue
+                if atendimento is None:
+                    break
+                with lock:
+                    reivindicados.append((atendimento.id, agente_id))
+            db.session.remove()
+
+    threads = [threading.Thread(target=agente_trabalhando, args=(agente_id,)) for agente_id in agente_ids]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    with app.app_context():
+        duplicados = sum(1 for _, n in Counter(a for a, _ in reivindicados).items() if n > 1)
+        restantes = Atendimento.query.filter_by(status='fila').count()
+        por_agente = Counter(agente for _, agente in reivindicados)
+        excedidos = sum(
+            1 for a in Agente.query.filter(Agente.id.in_(agente_ids))
+            if a.atendimentos_ativos > a.max_atendimentos or a.atendimentos_ativos != por_agente[a.id]
+        )
+
+    print(f'reivindicações: {len(reivindicados)} em {duracao:.2f}s ({len(reivindicados) / duracao:.0f}/s)')
+    print(f'atribuições duplicadas: {duplicados}')
+    print(f'agentes com contador inconsistente: {excedidos}')
+    print(f'restantes na fila: {restantes}')
+    if erros:
+        print(f'erros: {dict(erros)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Importação e exportação de clientes em massa.
+
+Gera um CSV (ou NDJSON) sintético com --clientes contatos, uma fração de
+telefones repetidos e de linhas inválidas, importa pelo
+/api/clientes/importar, reimporta o mesmo arquivo (tudo vira atualização)
+e exporta pelo /api/clientes/exportar, medindo tempo, vazão e o pico de
+memória do processo.
+
+    python -m benchmarks.importacao_clientes --clientes 1000000
+    python -m benchmarks.importacao_clientes --clientes 200000 --formato ndjson
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+
+TAGS = ['vip', 'atacado', 'varejo', 'inadimplente', 'lead', 'parceiro', 'sp', 'rj', 'mg']
+
+
+def gerar_arquivo(args, caminho):
+    rng = random.Random(args.seed)
+    with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+        escritor = csv.writer(arquivo)
+        if args.formato == 'csv':
+            escritor.writerow(['telefone', 'nome', 'email', 'notas', 'tags'])
+        for i in range(args.clientes):
+            telefone = f'+55119{rng.randrange(args.clientes * 2):08d}' if rng.random() < args.repetidos else f'+5521{i:09d}'
+            if rng.random() < args.invalidos:
+                telefone = ''
+            registro = {
+                'telefone': telefone,
+                'nome': f'Cliente {i}',
+                'email': f'cliente{i}@exemplo.com.br',
+                'notas': None,
+                'tags': rng.sample(TAGS, rng.randrange(3))
+            }
+            if args.formato == 'csv':
+                escritor.writerow([registro['telefone'], registro['nome'], registro['email'], '', ';'.join(registro['tags'])])
+            else:
+                arquivo.write(json.dumps(registro) + '\n')
+
+
+def pico_memoria_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clientes', type=int, default=1000000)
+    parser.add_argument('--formato', choices=['csv', 'ndjson'], default='csv')
+    parser.add_argument('--repetidos', type=float, default=0.05, help='fração de telefones repetidos')
+    parser.add_argument('--invalidos', type=float, default=0.001, help='fração de linhas sem telefone')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    diretorio = tempfile.mkdtemp()
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(diretorio, 'bench.db')}"
+
+    from src.main import app
+
+    caminho = os.path.join(diretorio, f'clientes.{args.formato}')
+    inicio = time.perf_counter()
+    gerar_arquivo(args, caminho)
+    print(f'arquivo: {os.path.getsize(caminho) / 2**20:.0f} MB gerado em {time.perf_counter() - inicio:.1f}s')
+    print(f'memória após gerar: {pico_memoria_mb():.0f} MB')
+
+    cliente = app.test_client()
+    for rodada in ('importação', 'reimportação'):
+        with open(caminho, 'rb') as arquivo:
+            inicio = time.perf_counter()
+            resposta = cliente.post(f'/api/clientes/importar?formato={args.formato}', data=arquivo,
+                                    content_type='text/csv' if args.formato == 'csv' else 'application/x-ndjson')
+            duracao = time.perf_counter() - inicio
+        resultado = resposta.get_json()
+        if resposta.status_code != 200:
+            print(f'{rodada}: erro {resposta.status_code} {resultado}')
+            return
+        print(f'{rodada}: {resultado["processados"]} linhas em {duracao:.1f}s -> {resultado["processados"] / duracao:.0f} linhas/s '
+              f'(inseridos {resultado["inseridos"]}, atualizados {resultado["atualizados"]}, erros {resultado["total_erros"]})')
+        print(f'pico de memória: {pico_memoria_mb():.0f} MB')
+
+    inicio = time.perf_counter()
+    resposta = cliente.get(f'/api/clientes/exportar?formato={args.formato}', buffered=False)
+    tamanho = 0
+    linhas = 0
+    for pedaco in resposta.response:
+        tamanho += len(pedaco)
+        linhas += pedaco.count(b'\n') if isinstance(pedaco, bytes) else pedaco.count('\n')
+    resposta.close()
+    duracao = time.perf_counter() - inicio
+    print(f'exportação: {linhas} linhas, {tamanho / 2**20:.0f} MB em {duracao:.1f}s -> {linhas / duracao:.0f} linhas/s')
+    print(f'pico de memória: {pico_memoria_mb():.0f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Microbenchmark do casamento de intenções do chatbot.
+
+Compara o custo por mensagem do MotorIntencoes (autômato compilado) com a
+varredura antiga `any(palavra in mensagem ...)` conforme o número de
+palavras-chave cresce.
+
+    python -m benchmarks.intencoes --palavras 10 100 1000 5000
+"""
+import argparse
+import json
+import random
+import string
+import time
+from src.services.intencoes import MotorIntencoes, normalizar
+
+
+def palavra_aleatoria(rng):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+
+
+def gerar_faqs(rng, total):
+    faqs = []
+    for i in range(total):
+        pergunta = ' '.join(palavra_aleatoria(rng) for _ in range(rng.randint(1, 3)))
+        faqs.append({'pergunta': pergunta, 'resposta': f'resposta {i}'})
+    return faqs
+
+
+def gerar_mensagens(rng, faqs, total):
+    mensagens = []
+    for _ in range(total):
+        palavras = [palavra_aleatoria(rng) for _ in range(12)]
+        if faqs and rng.random() < 0.3:
+            palavras.insert(rng.randrange(len(palavras)), rng.choice(faqs)['pergunta'])
+        mensagens.append(' '.join(palavras))
+    return mensagens
+
+
+def varredura_ingenua(palavras_chave, mensagem):
+    mensagem = normalizar(mensagem)
+    for palavra in palavras_chave:
+        if palavra in mensagem:
+            return palavra
+    return None
+
+
+def medir(funcao, mensagens, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for mensagem in mensagens:
+            funcao(mensagem)
+    return (time.perf_counter() - inicio) / (repeticoes * len(mensagens)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--palavras', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--mensagens', type=int, default=500)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f'{"palavras":>9} {"compilação (ms)":>16} {"motor (µs/msg)":>15} {"any() (µs/msg)":>15}')
+    for total in args.palavras:
+        rng = random.Random(args.seed)
+        faqs = gerar_faqs(rng, total)
+        mensagens = gerar_mensagens(rng, faqs, args.mensagens)
+
+        inicio = time.perf_counter()
+        motor = MotorIntencoes(perguntas_frequentes=json.dumps(faqs))
+        compilacao = (time.perf_counter() - inicio) * 1000
+
+        palavras_chave = [normalizar(f['pergunta']) for f in faqs]
+        tempo_motor = medir(motor.identificar, mensagens, args.repeticoes)
+        tempo_ingenuo = medir(lambda m: varredura_ingenua(palavras_chave, m), mensagens, args.repeticoes)
+
+        print(f'{total:>9} {compilacao:>16.1f} {tempo_motor:>15.2f} {tempo_ingenuo:>15.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Teste de carga do pool de conexões sob gunicorn (vários workers gthread).
+
+Sobe o app com --workers processos de --threads threads, dispara
+--concorrencia clientes HTTP durante --duracao segundos contra rotas de
+leitura e escrita e, no fim, coleta /api/health/db de cada worker: uso do
+pool, excedente, espera por conexão e timeouts. Pool e timeouts são
+passados pelo ambiente (BANCO_POOL_*), como em produção; com pool menor
+que as threads, a espera e os timeouts aparecem nas métricas.
+
+    python -m benchmarks.pool --workers 4 --threads 32 --concorrencia 128
+    BANCO_POOL_TAMANHO=2 BANCO_POOL_EXCEDENTE=0 BANCO_POOL_TIMEOUT=1 python -m benchmarks.pool --threads 16
+    python -m benchmarks.pool --url http://localhost:8000 --concorrencia 64
+"""
+import argparse
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import requests
+
+ROTAS = [
+    ('GET', '/api/fila', 5),
+    ('GET', '/api/estatisticas', 3),
+    ('GET', '/api/clientes?limit=20', 3),
+    ('GET', '/api/atendimentos?limit=20', 3),
+    ('POST', '/api/chatbot/processar', 1),
+]
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))] if valores else 0.0
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def subir_gunicorn(args):
+    porta = porta_livre()
+    ambiente = dict(os.environ)
+    ambiente.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+    processo = subprocess.Popen([
+        sys.executable, '-m', 'gunicorn', 'src.main:app', '--preload',
+        '--workers', str(args.workers), '--worker-class', 'gthread', '--threads', str(args.threads),
+        '--bind', f'127.0.0.1:{porta}', '--log-level', 'warning'
+    ], env=ambiente)
+    url = f'http://127.0.0.1:{porta}'
+    for _ in range(100):
+        try:
+            requests.get(f'{url}/api/health', timeout=1)
+            return processo, url
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    processo.terminate()
+    raise RuntimeError('gunicorn não respondeu')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='servidor já em execução (não sobe gunicorn)')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--concorrencia', type=int, default=64)
+    parser.add_argument('--duracao', type=float, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    processo = None
+    url = args.url
+    if not url:
+        processo, url = subir_gunicorn(args)
+
+    latencias = {}
+    status = {}
+    lock = threading.Lock()
+    fim = time.monotonic() + args.duracao
+
+    def cliente(indice):
+        rng = random.Random(args.seed + indice)
+        sessao = requests.Session()
+        locais = {}
+        codigos = {}
+        while time.monotonic() < fim:
+            metodo, rota, _ = rng.choices(ROTAS, [peso for _, _, peso in ROTAS])[0]
+            inicio = time.perf_counter()
+            try:
+                if metodo == 'POST':
+                    resposta = sessao.post(url + rota, json={
+                        'telefone': f'+5511{rng.randrange(10000):08d}', 'mensagem': 'oi'
+                    }, timeout=60)
+                else:
+                    resposta = sessao.get(url + rota, timeout=60)
+                codigo = resposta.status_code
+            except requests.RequestException:
+                codigo = 'erro de conexão'
+            locais.setdefault(rota, []).append((time.perf_counter() - inicio) * 1000)
+            codigos[codigo] = codigos.get(codigo, 0) + 1
+        with lock:
+            for rota, tempos in locais.items():
+                latencias.setdefault(rota, []).extend(tempos)
+            for codigo, total in codigos.items():
+                status[codigo] = status.get(codigo, 0) + total
+
+    try:
+        threads = [threading.Thread(target=cliente, args=(i,)) for i in range(args.concorrencia)]
+        inicio = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        duracao = time.perf_counter() - inicio
+
+        # Cada requisição cai em um worker; repete até ouvir todos
+        pools = {}
+        for _ in range(args.workers * 20):
+            dados = requests.get(f'{url}/api/health/db', timeout=10).json()
+            pools[dados['pool']['pid']] = dados['pool']
+            if len(pools) >= args.workers:
+                break
+    finally:
+        if processo:
+            processo.terminate()
+            processo.wait()
+
+    total = sum(status.values())
+    print(f'{args.workers} worker(s) x {args.threads} threads, {args.concorrencia} clientes: '
+          f'{total} requisições em {duracao:.1f}s -> {total / duracao:.0f} req/s')
+    print('status:', dict(sorted(status.items(), key=str)))
+    print(f'{"rota":<30} {"n":>7} {"p50":>9} {"p95":>9} {"p99":>9}')
+    for rota, tempos in sorted(latencias.items()):
+        print(f'{rota:<30} {len(tempos):>7} {percentil(tempos, 0.5):>7.1f}ms {percentil(tempos, 0.95):>7.1f}ms '
+              f'{percentil(tempos, 0.99):>7.1f}ms')
+    print(f'{"pid":>8} {"tamanho":>8} {"conexões":>9} {"checkouts":>10} {"espera média":>13} {"espera máx":>11} {"timeouts":>9}')
+    for pid, pool in sorted(pools.items()):
+        print(f'{pid:>8} {pool.get("tamanho", "-"):>8} {pool["conexoes_abertas"]:>9} {pool["checkouts"]:>10} '
+              f'{pool["espera_media_ms"]:>11.2f}ms {pool["espera_maxima_ms"]:>9.1f}ms {pool["timeouts"]:>9}')
+
+
+if __name__ == '__main__':
+    main()
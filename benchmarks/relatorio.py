@@ -0,0 +1,95 @@
+"""
+Relatório de uma execução do driver de carga (benchmarks.carga).
+
+Mostra, por endpoint, requisições, erros, vazão e latência p50/p95/p99.
+Com --base, compara com uma execução anterior e mostra a variação de
+cada número (latência menor e vazão maior são melhoras).
+
+    python -m benchmarks.relatorio resultado.json
+    python -m benchmarks.relatorio depois.json --base antes.json
+"""
+import argparse
+import json
+
+
+def percentil(valores, p):
+    """Percentil por posição em uma lista já ordenada"""
+    if not valores:
+        return 0.0
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def resumir(latencias, erros, duracao):
+    """
+    Resumo por endpoint a partir de {endpoint: [latências em ms]} e
+    {endpoint: erros}, no formato gravado em JSON pelo driver.
+    """
+    endpoints = {}
+    todas = []
+    for endpoint in sorted(set(latencias) | set(erros)):
+        tempos = sorted(latencias.get(endpoint, []))
+        todas += tempos
+        endpoints[endpoint] = {
+            'requisicoes': len(tempos),
+            'erros': erros.get(endpoint, 0),
+            'rps': round(len(tempos) / duracao, 2) if duracao else 0.0,
+            'media': round(sum(tempos) / len(tempos), 3) if tempos else 0.0,
+            'p50': round(percentil(tempos, 0.5), 3),
+            'p95': round(percentil(tempos, 0.95), 3),
+            'p99': round(percentil(tempos, 0.99), 3),
+        }
+    todas.sort()
+    total = {
+        'requisicoes': len(todas),
+        'erros': sum(erros.values()),
+        'rps': round(len(todas) / duracao, 2) if duracao else 0.0,
+        'media': round(sum(todas) / len(todas), 3) if todas else 0.0,
+        'p50': round(percentil(todas, 0.5), 3),
+        'p95': round(percentil(todas, 0.95), 3),
+        'p99': round(percentil(todas, 0.99), 3),
+    }
+    return {'duracao': round(duracao, 3), 'endpoints': endpoints, 'total': total}
+
+
+def _variacao(atual, anterior):
+    if not anterior:
+        return ''
+    return f'{(atual - anterior) / anterior * 100:+.0f}%'
+
+
+def imprimir(resultado, base=None):
+    """Imprime a tabela do resultado; com `base`, acrescenta a variação de cada coluna"""
+    meta = resultado.get('meta', {})
+    if meta:
+        print(' '.join(f'{chave}={valor}' for chave, valor in meta.items()))
+    colunas = ('rps', 'p50', 'p95', 'p99')
+    cabecalho = f'{"endpoint":<42} {"n":>8} {"erros":>6}' + ''.join(f' {c:>9}' for c in colunas)
+    if base:
+        cabecalho += ''.join(f' {"Δ" + c:>7}' for c in colunas)
+    print(cabecalho)
+
+    linhas = list(resultado['endpoints'].items()) + [('TOTAL', resultado['total'])]
+    for endpoint, dados in linhas:
+        linha = f'{endpoint:<42} {dados["requisicoes"]:>8} {dados["erros"]:>6}'
+        linha += ''.join(f' {dados[c]:>9.1f}' for c in colunas)
+        if base:
+            anterior = base['total'] if endpoint == 'TOTAL' else base['endpoints'].get(endpoint)
+            linha += ''.join(f' {_variacao(dados[c], anterior[c]) if anterior else "novo":>7}' for c in colunas)
+        print(linha)
+
+
+def carregar(caminho):
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('resultado', help='JSON gravado por benchmarks.carga --saida')
+    parser.add_argument('--base', help='execução anterior para comparar')
+    args = parser.parse_args()
+    imprimir(carregar(args.resultado), carregar(args.base) if args.base else None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Simulação do roteamento automático da fila.
+
+Gera chegadas de Poisson com departamentos, atendimentos de duração
+exponencial e agentes com capacidade limitada, e mede o tempo de espera
+(p50/p99) para cada política do Roteador. A linha 'manual' aproxima o
+fluxo atual: agentes com vaga pegam o próximo da fila, em média, a cada
+`--reacao` segundos.
+
+    python -m benchmarks.roteamento --taxas 10 18 22 --agentes 20
+"""
+import argparse
+import heapq
+import random
+from datetime import datetime, timedelta
+from src.services.roteador import Roteador
+
+DEPARTAMENTOS = ['vendas', 'suporte', 'financeiro']
+PESOS = [0.5, 0.3, 0.2]
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def simular(politica, taxa, args, seed):
+    rng = random.Random(seed)
+    inicio = datetime(2024, 1, 1)
+    agentes = [
+        {'id': i + 1, 'ativos': 0, 'max': args.capacidade, 'departamentos': {DEPARTAMENTOS[i % len(DEPARTAMENTOS)]}}
+        for i in range(args.agentes)
+    ]
+    por_id = {a['id']: a for a in agentes}
+    roteador = Roteador(politica=politica if politica != 'manual' else 'menos_ocupado', afinidade=args.afinidade)
+
+    chegadas = {}
+    termino = []
+    esperas = []
+    proxima_chegada = rng.expovariate(taxa / 60)
+    proximo_id = 1
+
+    for t in range(args.duracao * 60):
+        while proxima_chegada <= t:
+            prioridade = 1 if rng.random() < 0.1 else 0
+            departamento = rng.choices(DEPARTAMENTOS, PESOS)[0]
+            roteador.adicionar(proximo_id, prioridade, inicio + timedelta(seconds=proxima_chegada), departamento)
+            chegadas[proximo_id] = proxima_chegada
+            proximo_id += 1
+            proxima_chegada += rng.expovariate(taxa / 60)
+
+        while termino and termino[0][0] <= t:
+            _, agente_id = heapq.heappop(termino)
+            por_id[agente_id]['ativos'] -= 1
+
+        if politica == 'manual':
+            # Cada agente com vaga só percebe a fila de vez em quando
+            disponiveis = [dict(a) for a in agentes if rng.random() < 1 / args.reacao]
+            atribuicoes = roteador.distribuir(disponiveis)
+            for _, agente_id in atribuicoes:
+                por_id[agente_id]['ativos'] += 1
+        else:
+            atribuicoes = roteador.distribuir(agentes)
+
+        for item, agente_id in atribuicoes:
+            esperas.append(t - chegadas.pop(item[2]))
+            heapq.heappush(termino, (t + rng.expovariate(1 / (args.duracao_media * 60)), agente_id))
+
+    return esperas, len(chegadas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--taxas', type=float, nargs='+', default=[10, 18, 22], help='chegadas por minuto')
+    parser.add_argument('--agentes', type=int, default=20)
+    parser.add_argument('--capacidade', type=int, default=3)
+    parser.add_argument('--duracao-media', type=float, default=2.5, help='minutos por atendimento')
+    parser.add_argument('--duracao', type=int, default=240, help='minutos simulados')
+    parser.add_argument('--reacao', type=float, default=30, help='segundos até um agente pegar da fila (manual)')
+    parser.add_argument('--sem-afinidade', dest='afinidade', action='store_false')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f'{"taxa/min":>8} {"política":<14} {"atendidos":>9} {"p50 (s)":>8} {"p99 (s)":>8} {"na fila":>8}')
+    for taxa in args.taxas:
+        for politica in ('manual', 'menos_ocupado', 'round_robin'):
+            esperas, restantes = simular(politica, taxa, args, args.seed)
+            print(f'{taxa:>8.0f} {politica:<14} {len(esperas):>9} {percentil(esperas, 0.5):>8.0f} '
+                  f'{percentil(esperas, 0.99):>8.0f} {restantes:>8}')
+
+
+if __name__ == '__main__':
+    main()
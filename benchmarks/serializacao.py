@@ -0,0 +1,96 @@
+"""
+Bytes no fio e CPU por resposta das listagens /atendimentos e /clientes.
+
+Gera dados com benchmarks.dados até haver --linhas atendimentos e
+clientes, e percorre as duas listagens página a página (limit=200, o
+máximo) até --linhas registros, combinando o encoder JSON (biblioteca
+padrão ou orjson, se instalado) com a codificação da resposta (identity,
+gzip e br, se brotli estiver instalado). A CPU é o tempo de processo
+gasto pelo test client em cada resposta, do roteamento ao último byte.
+
+    python -m benchmarks.serializacao --linhas 10000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+LIMITE = 200
+
+
+def percorrer(cliente, url, linhas, chave, codificacao):
+    """Percorre a listagem até `linhas` registros; retorna (respostas, bytes, cpu em s)"""
+    respostas = total_bytes = lidas = 0
+    cpu = 0.0
+    cursor = None
+    cabecalhos = {'Accept-Encoding': codificacao}
+    while lidas < linhas:
+        caminho = f'{url}?limit={LIMITE}' + (f'&cursor={cursor}' if cursor else '')
+        inicio = time.process_time()
+        resposta = cliente.get(caminho, headers=cabecalhos)
+        corpo = resposta.get_data()
+        cpu += time.process_time() - inicio
+        assert resposta.status_code == 200, corpo[:200]
+        assert resposta.headers.get('Content-Encoding', 'identity') == codificacao, resposta.headers
+
+        respostas += 1
+        total_bytes += len(corpo)
+        if codificacao != 'identity':
+            # O cursor vem da mesma página sem compressão, fora da medição
+            resposta = cliente.get(caminho, headers={'Accept-Encoding': 'identity'})
+        dados = resposta.get_json()
+        lidas += len(dados[chave])
+        cursor = dados['next_cursor']
+        if not cursor:
+            break
+    return respostas, total_bytes, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=10000, help='registros percorridos em cada listagem')
+    parser.add_argument('--repeticoes', type=int, default=3, help='passadas por combinação (vale a mais rápida)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    from src.main import app
+    from src.models.atendimento import Cliente
+    from src.services import compressao
+    from src.utils import serializacao
+    from benchmarks.dados import gerar
+
+    with app.app_context():
+        faltam = args.linhas - Cliente.query.count()
+        if faltam > 0:
+            # 40 mensagens por cliente (10 por atendimento, 4 atendimentos por cliente)
+            gerar(faltam * 40, args.seed, progresso=lambda *_: None)
+
+    orjson = serializacao.orjson
+    encoders = [('stdlib', None)] + ([('orjson', orjson)] if orjson is not None else [])
+    codificacoes = ['identity', 'gzip'] + (['br'] if compressao.brotli is not None else [])
+    cliente = app.test_client()
+
+    print(f'{"rota":<14} {"encoder":<8} {"codificação":<12} {"respostas":>9} {"KB/resposta":>12} '
+          f'{"CPU ms/resposta":>16} {"CPU total":>10}')
+    try:
+        for url, chave in (('/api/atendimentos', 'atendimentos'), ('/api/clientes', 'clientes')):
+            for nome, modulo in encoders:
+                serializacao.orjson = modulo
+                for codificacao in codificacoes:
+                    melhor = None
+                    for _ in range(args.repeticoes):
+                        resultado = percorrer(cliente, url, args.linhas, chave, codificacao)
+                        if melhor is None or resultado[2] < melhor[2]:
+                            melhor = resultado
+                    respostas, total_bytes, cpu = melhor
+                    print(f'{url[4:]:<14} {nome:<8} {codificacao:<12} {respostas:>9} '
+                          f'{total_bytes / respostas / 1024:>12.1f} {cpu / respostas * 1000:>16.2f} {cpu:>9.2f}s')
+    finally:
+        serializacao.orjson = orjson
+
+
+if __name__ == '__main__':
+    main()
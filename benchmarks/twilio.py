@@ -0,0 +1,109 @@
+"""
+Replay de webhooks do Twilio contra o /api/webhook.
+
+Lê posts gravados (um corpo form-urlencoded por linha, em --arquivo) ou
+gera posts sintéticos com uma fração de reentregas do mesmo MessageSid,
+reenvia todos pelo app e mede a vazão, a latência e quantas mensagens
+foram gravadas. Reentregas não podem gerar mensagens novas. Com
+INGESTAO_ATIVA=1 o mesmo replay mede a gravação em lote.
+
+    python -m benchmarks.twilio --posts 100000 --duplicados 0.1 --threads 8
+    INGESTAO_ATIVA=1 python -m benchmarks.twilio --posts 100000 --threads 32
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from urllib.parse import parse_qsl
+
+TEXTOS = ['oi', 'bom dia', 'qual o horário?', 'quero falar com atendente', 'vendas', 'suporte',
+          'meu pedido não chegou', 'obrigado', 'financeiro', 'segunda via do boleto']
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def gerar_posts(args):
+    rng = random.Random(args.seed)
+    posts = []
+    for i in range(args.posts):
+        if posts and rng.random() < args.duplicados:
+            # Reentrega: o Twilio repete exatamente o mesmo post
+            posts.append(posts[rng.randrange(len(posts))])
+            continue
+        posts.append({
+            'MessageSid': f'SM{i:032x}',
+            'From': f'whatsapp:+55119{rng.randrange(args.telefones):08d}',
+            'To': 'whatsapp:+14155238886',
+            'Body': rng.choice(TEXTOS),
+            'ProfileName': f'Cliente {i % 997}'
+        })
+    return posts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--arquivo', help='posts gravados, um corpo form-urlencoded por linha')
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--duplicados', type=float, default=0.1, help='fração de reentregas')
+    parser.add_argument('--telefones', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    from src.main import app
+    from src.models.atendimento import Mensagem, MensagemExterna
+
+    if args.arquivo:
+        with open(args.arquivo) as arquivo:
+            posts = [dict(parse_qsl(linha.strip())) for linha in arquivo if linha.strip()]
+    else:
+        posts = gerar_posts(args)
+    unicos = len({p.get('MessageSid') for p in posts})
+
+    latencias = []
+    erros = []
+    lock = threading.Lock()
+
+    def enviar(parte):
+        cliente = app.test_client()
+        locais = []
+        for post in parte:
+            inicio = time.perf_counter()
+            resposta = cliente.post('/api/webhook', data=post)
+            locais.append((time.perf_counter() - inicio) * 1000)
+            if resposta.status_code != 200:
+                with lock:
+                    erros.append(resposta.status_code)
+        with lock:
+            latencias.extend(locais)
+
+    partes = [posts[i::args.threads] for i in range(args.threads)]
+    threads = [threading.Thread(target=enviar, args=(parte,)) for parte in partes]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    with app.app_context():
+        mensagens = Mensagem.query.count()
+        externas = MensagemExterna.query.count()
+
+    print(f'posts: {len(posts)} ({unicos} MessageSid distintos) em {duracao:.1f}s -> {len(posts) / duracao:.0f} posts/s')
+    print(f'latência p50 {percentil(latencias, 0.5):.2f} ms, p99 {percentil(latencias, 0.99):.2f} ms')
+    print(f'mensagens gravadas: {mensagens} (esperado {2 * unicos}), ids externos: {externas}')
+    if erros:
+        print(f'respostas com erro: {len(erros)}')
+
+
+if __name__ == '__main__':
+    main()
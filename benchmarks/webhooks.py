@@ -0,0 +1,93 @@
+"""
+Mede a latência de disparar_webhook com assinantes lentos.
+
+Sobe um servidor HTTP local que demora ATRASO segundos para responder,
+cadastra N webhooks apontando para ele e mede quanto tempo a requisição
+leva para enfileirar as entregas, e quanto tempo o entregador leva para
+concluir todas em segundo plano.
+
+    python -m benchmarks.webhooks --assinantes 1 10 50 --atraso 0.5
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def iniciar_stub(atraso):
+    recebidas = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(atraso)
+            recebidas.append(time.perf_counter())
+            self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, recebidas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--assinantes', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--atraso', type=float, default=0.5)
+    parser.add_argument('--disparos', type=int, default=20)
+    args = parser.parse_args()
+
+    banco = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{banco}'
+    os.environ.setdefault('WEBHOOK_WORKERS', '16')
+
+    from src.main import app
+    from src.models.user import db
+    from src.models.atendimento import Webhook, EntregaWebhook
+    from src.routes.chatbot import disparar_webhook
+
+    servidor, recebidas = iniciar_stub(args.atraso)
+    url = f'http://127.0.0.1:{servidor.server_address[1]}/hook'
+
+    print(f'{"assinantes":>10} {"disparo p50 (ms)":>17} {"disparo max (ms)":>17} {"entrega total (s)":>18}')
+    with app.app_context():
+        for total in args.assinantes:
+            Webhook.query.delete()
+            EntregaWebhook.query.delete()
+            db.session.add_all([
+                Webhook(nome=f'bench-{i}', url=url, evento='bench', ativo=True)
+                for i in range(total)
+            ])
+            db.session.commit()
+            recebidas.clear()
+
+            latencias = []
+            inicio = time.perf_counter()
+            for _ in range(args.disparos):
+                t0 = time.perf_counter()
+                disparar_webhook('bench', {'evento': 'bench'})
+                # O commit é do chamador, como numa rota
+                db.session.commit()
+                latencias.append((time.perf_counter() - t0) * 1000)
+
+            esperadas = total * args.disparos
+            while len(recebidas) < esperadas and time.perf_counter() - inicio < 300:
+                time.sleep(0.05)
+            duracao = (max(recebidas) if recebidas else time.perf_counter()) - inicio
+
+            latencias.sort()
+            print(f'{total:>10} {latencias[len(latencias) // 2]:>17.2f} {latencias[-1]:>17.2f} {duracao:>18.2f}')
+
+    servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
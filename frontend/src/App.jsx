@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { Button } from '@/components/ui/button.jsx'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card.jsx'
 import { Input } from '@/components/ui/input.jsx'
@@ -12,6 +12,7 @@ import {
   Send, Phone, Mail, Tag, BarChart3, Settings, LogOut,
   UserCircle, Bot, Zap, TrendingUp, Activity
 } from 'lucide-react'
+import { buscarJson } from '@/lib/api.js'
 import './App.css'
 
 // Configuração da API
@@ -27,6 +28,7 @@ function App() {
   const [fila, setFila] = useState([])
   const [estatisticas, setEstatisticas] = useState({})
   const [loading, setLoading] = useState(false)
+  const atendimentoAtivoRef = useRef(null)
 
   // Login
   const handleLogin = async (e) => {
@@ -54,9 +56,8 @@ function App() {
   // Carregar dados
   const carregarDados = async () => {
     try {
-      // Carregar fila
-      const filaRes = await fetch(`${API_URL}/fila`)
-      const filaData = await filaRes.json()
+      // Carregar fila (com If-None-Match: sem mudanças, volta 304 e nada re-renderiza)
+      const filaData = await buscarJson(`${API_URL}/fila`)
       setFila(filaData.atendimentos || [])
 
       // Carregar estatísticas
@@ -66,8 +67,7 @@ function App() {
 
       // Carregar atendimentos do agente
       if (agente) {
-        const atendRes = await fetch(`${API_URL}/agentes/${agente.id}/atendimentos?status=em_atendimento`)
-        const atendData = await atendRes.json()
+        const atendData = await buscarJson(`${API_URL}/agentes/${agente.id}/atendimentos?status=em_atendimento`)
         setAtendimentos(atendData.atendimentos || [])
       }
     } catch (error) {
@@ -102,9 +102,10 @@ function App() {
   // Carregar mensagens
   const carregarMensagens = async (atendimentoId) => {
     try {
-      const response = await fetch(`${API_URL}/atendimentos/${atendimentoId}/mensagens`)
+      // Página mais recente do histórico; mensagens antigas ficam em data.next_cursor
+      const response = await fetch(`${API_URL}/atendimentos/${atendimentoId}/mensagens?limit=50`)
       const data = await response.json()
-      setMensagens(data)
+      setMensagens(data.mensagens || [])
     } catch (error) {
       console.error('Erro ao carregar mensagens:', error)
     }
@@ -127,7 +128,9 @@ function App() {
       })
       const data = await response.json()
       if (response.ok) {
-        setMensagens([...mensagens, data])
+        setMensagens((atuais) =>
+          atuais.some((m) => m.id === data.id) ? atuais : [...atuais, data]
+        )
         setNovaMensagem('')
       }
     } catch (error) {
@@ -165,12 +168,60 @@ function App() {
     setMensagens([])
   }
 
-  // Atualizar dados periodicamente
   useEffect(() => {
-    if (agente) {
-      carregarDados()
-      const interval = setInterval(carregarDados, 5000) // A cada 5 segundos
-      return () => clearInterval(interval)
+    atendimentoAtivoRef.current = atendimentoAtivo
+  }, [atendimentoAtivo])
+
+  // Atualizar dados quando o servidor avisar (SSE), com polling lento de segurança
+  useEffect(() => {
+    if (!agente) return
+
+    carregarDados()
+
+    let recarregarTimeout = null
+    const agendarRecarga = () => {
+      // Agrupa rajadas de eventos em uma única recarga
+      clearTimeout(recarregarTimeout)
+      recarregarTimeout = setTimeout(carregarDados, 300)
+    }
+
+    let stream = null
+    let polling = null
+    let reconectarTimeout = null
+
+    const conectar = () => {
+      stream = new EventSource(`${API_URL}/eventos/stream`)
+      stream.addEventListener('open', () => {
+        clearInterval(polling)
+        polling = null
+      })
+      stream.addEventListener('error', () => {
+        // Sem vaga no servidor (503) o EventSource desiste: polling até tentar de novo
+        if (stream.readyState !== EventSource.CLOSED) return
+        if (!polling) polling = setInterval(carregarDados, 5000)
+        reconectarTimeout = setTimeout(conectar, 30000)
+      })
+      stream.addEventListener('fila_atualizada', agendarRecarga)
+      stream.addEventListener('atendimento_atribuido', agendarRecarga)
+      stream.addEventListener('atendimento_finalizado', agendarRecarga)
+      stream.addEventListener('nova_mensagem', (e) => {
+        const { atendimento_id, mensagem } = JSON.parse(e.data)
+        if (atendimentoAtivoRef.current?.id === atendimento_id) {
+          setMensagens((atuais) =>
+            atuais.some((m) => m.id === mensagem.id) ? atuais : [...atuais, mensagem]
+          )
+        }
+      })
+    }
+    conectar()
+
+    const interval = setInterval(carregarDados, 60000)
+    return () => {
+      stream.close()
+      clearInterval(interval)
+      clearInterval(polling)
+      clearTimeout(recarregarTimeout)
+      clearTimeout(reconectarTimeout)
     }
   }, [agente])
 
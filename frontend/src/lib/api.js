@@ -0,0 +1,21 @@
+// Última resposta com ETag de cada URL. O servidor responde 304 sem corpo
+// quando nada mudou, e o objeto guardado é devolvido como está (o React
+// não re-renderiza quando recebe a mesma referência).
+const respostas = new Map()
+
+export async function buscarJson(url) {
+  const anterior = respostas.get(url)
+  const response = await fetch(url, anterior ? { headers: { 'If-None-Match': anterior.etag } } : undefined)
+  if (response.status === 304 && anterior) {
+    return anterior.dados
+  }
+
+  const dados = await response.json()
+  const etag = response.headers.get('ETag')
+  if (response.ok && etag) {
+    respostas.set(url, { etag, dados })
+  } else {
+    respostas.delete(url)
+  }
+  return dados
+}
@@ -1,7 +1,7 @@
 import os
 import sys
 from dotenv import load_dotenv
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
 from src.models.user import db
 from src.routes.user import user_bp
@@ -9,6 +9,9 @@ from src.routes.agente import agente_bp
 from src.routes.cliente import cliente_bp
 from src.routes.atendimento import atendimento_bp
 from src.routes.chatbot import chatbot_bp
+from src.routes.eventos import eventos_bp
+from src.utils.serializacao import ProvedorJSON
+from src.services import banco, instrumentacao, compressao, estaticos, eventos, webhooks, estatisticas_agente, roteador, busca_clientes, tags, indices, ingestao, transcricoes, arquivamento
 
 # Garantir caminho correto dos módulos
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
@@ -18,10 +21,15 @@ load_dotenv()
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 
+# jsonify com orjson quando instalado
+app.json = ProvedorJSON(app)
+
 # Configurações da aplicação
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'chave_default_segura')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Pool de conexões: tamanho, recycle, pre-ping e timeout de consulta vêm do ambiente
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = banco.opcoes_engine(os.getenv('DATABASE_URL'))
 
 # Habilitar CORS
 CORS(app)
@@ -29,21 +37,75 @@ CORS(app)
 # Inicializar banco
 db.init_app(app)
 
+# Métricas do pool de conexões, expostas em /api/health/db
+banco.init_app(app)
+
+# Latência, SQL por requisição e consultas lentas, expostos em /api/metrics
+instrumentacao.init_app(app)
+
+# gzip/brotli nas respostas JSON e de texto; registrado depois da instrumentação para ela medir o tamanho comprimido
+compressao.init_app(app)
+
+# Build do frontend em memória, com cache imutável nos assets com hash: flask comprimir-estaticos pré-comprime
+estaticos.init_app(app)
+
 # Registrar blueprints
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(agente_bp, url_prefix='/api')
 app.register_blueprint(cliente_bp, url_prefix='/api')
 app.register_blueprint(atendimento_bp, url_prefix='/api')
 app.register_blueprint(chatbot_bp, url_prefix='/api')
+app.register_blueprint(eventos_bp, url_prefix='/api')
+
+# Pub/sub do stream de eventos (memoria ou banco)
+eventos.init_app(app)
+
+# Entrega assíncrona de webhooks
+webhooks.init_app(app)
+
+# Comando de backfill: flask recalcular-estatisticas-agentes
+estatisticas_agente.init_app(app)
+
+# Roteamento automático da fila: flask rotear (ou ROTEADOR_ATIVO=1)
+roteador.init_app(app)
+
+# Reconstrução do índice de busca: flask reindexar-busca-clientes
+busca_clientes.init_app(app)
+
+# Conversão das tags antigas em JSON: flask migrar-tags
+tags.init_app(app)
+
+# Checagem dos planos das consultas críticas: flask verificar-indices
+indices.init_app(app)
+
+# Gravação em lote das mensagens do bot (INGESTAO_ATIVA=1)
+ingestao.init_app(app)
+
+# Exportação de mensagens em streaming: flask exportar-transcricoes
+transcricoes.init_app(app)
+
+# Arquivamento de atendimentos finalizados antigos: flask arquivar (ou ARQUIVAMENTO_ATIVO=1)
+arquivamento.init_app(app)
 
 # Criar tabelas e agente demo
 with app.app_context():
     from src.models.atendimento import (
-        Agente, Cliente, Atendimento, Mensagem,
-        ConfiguracaoChatbot, Webhook
+        Agente, AgenteDepartamento, Cliente, ClienteTermoBusca, Tag, ClienteTag, AtendimentoTag,
+        Atendimento, Mensagem, MensagemExterna, AtendimentoArquivado, MensagemArquivada, TotalArquivado,
+        ConfiguracaoChatbot, Webhook, EntregaWebhook, Evento, VersaoRecurso,
+        EstatisticaAgente, EstatisticaAgenteDiaria
     )
     db.create_all()
 
+    # create_all não adiciona índices em tabelas já existentes
+    indices.criar_indices()
+
+    # Tags ainda em JSON são convertidas em lotes; depois da primeira vez não há o que fazer
+    tags.migrar()
+
+    # Clientes cadastrados antes do índice de busca entram nele aqui, em lotes
+    busca_clientes.preencher()
+
     if not Agente.query.first():
         from werkzeug.security import generate_password_hash
         agente_demo = Agente(
@@ -57,25 +119,32 @@ with app.app_context():
         db.session.commit()
         print("✅ Agente demo criado: agente@demo.com / demo123")
 
+    # Workers do gunicorn (com --preload) não herdam conexões abertas aqui
+    db.engine.dispose()
+
 @app.route('/api/health')
 def health():
     return {'status': 'healthy', 'service': 'sistema-atendimento-multiagente'}
 
+@app.route('/api/health/db')
+def health_db():
+    """Testa o banco com SELECT 1 e mostra o estado do pool deste worker"""
+    try:
+        latencia = banco.verificar()
+    except Exception as e:
+        return {'status': 'unhealthy', 'error': str(e), 'pool': banco.estado_pool()}, 503
+    return {'status': 'healthy', 'latencia_ms': latencia, 'pool': banco.estado_pool()}
+
+@app.route('/api/metrics')
+def metrics():
+    """Métricas de todos os workers no formato texto do Prometheus"""
+    return instrumentacao.exportar(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-        return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+    """Build do frontend servido da memória; rotas desconhecidas recebem o index.html do SPA"""
+    return estaticos.servir(path)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
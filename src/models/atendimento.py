@@ -1,4 +1,7 @@
+import json
 from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, noload, selectinload
 from src.models.user import db
 
 class Agente(db.Model):
@@ -31,11 +34,19 @@ class Agente(db.Model):
             'atendimentos_ativos': self.atendimentos_ativos,
             'total_atendimentos': self.total_atendimentos,
             'avaliacao_media': self.avaliacao_media,
-            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
-            'ultimo_acesso': self.ultimo_acesso.isoformat() if self.ultimo_acesso else None
+            'criado_em': self.criado_em,
+            'ultimo_acesso': self.ultimo_acesso
         }
 
 
+class AgenteDepartamento(db.Model):
+    """Departamentos atendidos por cada agente (afinidade no roteamento)"""
+    __tablename__ = 'agentes_departamentos'
+    
+    agente_id = db.Column(db.Integer, db.ForeignKey('agentes.id', ondelete='CASCADE'), primary_key=True)
+    departamento = db.Column(db.String(50), primary_key=True)
+
+
 class Cliente(db.Model):
     """Modelo para clientes/contatos"""
     __tablename__ = 'clientes'
@@ -44,14 +55,24 @@ class Cliente(db.Model):
     nome = db.Column(db.String(100))
     telefone = db.Column(db.String(20), unique=True, nullable=False)
     email = db.Column(db.String(120))
-    tags = db.Column(db.String(500))  # JSON string com tags
+    tags_legado = db.Column('tags', db.String(500))  # JSON string antiga, convertida por tags.migrar()
     notas = db.Column(db.Text)
     criado_em = db.Column(db.DateTime, default=datetime.utcnow)
-    ultima_interacao = db.Column(db.DateTime)
+    ultima_interacao = db.Column(db.DateTime, index=True)  # ordena GET /clientes
     
     # Relacionamentos
     atendimentos = db.relationship('Atendimento', backref='cliente', lazy=True)
     mensagens = db.relationship('Mensagem', backref='cliente', lazy=True)
+    lista_tags = db.relationship('Tag', secondary='clientes_tags', lazy='select', order_by='Tag.nome', viewonly=True)
+    
+    @property
+    def tags(self):
+        """Tags no formato antigo (JSON string), para manter a resposta da API"""
+        if self.lista_tags:
+            return json.dumps([t.nome for t in self.lista_tags])
+        if self.tags_legado is not None:
+            return self.tags_legado
+        return json.dumps([])
     
     def to_dict(self):
         return {
@@ -61,11 +82,58 @@ class Cliente(db.Model):
             'email': self.email,
             'tags': self.tags,
             'notas': self.notas,
-            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
-            'ultima_interacao': self.ultima_interacao.isoformat() if self.ultima_interacao else None
+            'criado_em': self.criado_em,
+            'ultima_interacao': self.ultima_interacao
         }
 
 
+class ClienteTermoBusca(db.Model):
+    """
+    Índice invertido da busca de clientes: cada palavra normalizada do nome
+    e do email (campo 'n'), os dígitos do telefone ('t') e os dígitos
+    invertidos ('r', para buscar pelo final do número).
+    """
+    __tablename__ = 'clientes_termos_busca'
+    
+    campo = db.Column(db.String(1), primary_key=True)
+    termo = db.Column(db.String(64), primary_key=True)
+    cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id', ondelete='CASCADE'), primary_key=True, index=True)
+
+
+class Tag(db.Model):
+    """Tags de clientes e atendimentos"""
+    __tablename__ = 'tags'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(50), unique=True, nullable=False)
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class ClienteTag(db.Model):
+    """Associação cliente-tag; a PK começa por tag_id para filtrar clientes por tag"""
+    __tablename__ = 'clientes_tags'
+    
+    tag_id = db.Column(db.Integer, db.ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True)
+    cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id', ondelete='CASCADE'), primary_key=True, index=True)
+
+
+class AtendimentoTag(db.Model):
+    """Associação atendimento-tag; a PK começa por tag_id para filtrar atendimentos por tag"""
+    __tablename__ = 'atendimentos_tags'
+    
+    tag_id = db.Column(db.Integer, db.ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True)
+    atendimento_id = db.Column(db.Integer, db.ForeignKey('atendimentos.id', ondelete='CASCADE'), primary_key=True, index=True)
+
+
+def _opcoes_relacoes(modelo, campos):
+    """Cliente (com as tags, que vão no to_dict dele) e agente no JOIN, se estiverem em `campos`"""
+    return [
+        joinedload(modelo.cliente).selectinload(Cliente.lista_tags) if campos is None or 'cliente' in campos
+        else noload(modelo.cliente),
+        joinedload(modelo.agente) if campos is None or 'agente' in campos else noload(modelo.agente),
+    ]
+
+
 class Atendimento(db.Model):
     """Modelo para sessões de atendimento"""
     __tablename__ = 'atendimentos'
@@ -84,37 +152,168 @@ class Atendimento(db.Model):
     tempo_atendimento = db.Column(db.Integer)  # segundos
     avaliacao = db.Column(db.Integer)  # 1-5 estrelas
     comentario_avaliacao = db.Column(db.Text)
-    tags = db.Column(db.String(500))  # JSON string com tags
+    tags_legado = db.Column('tags', db.String(500))  # JSON string antiga, convertida por tags.migrar()
+    
+    __table_args__ = (
+        # Fila: WHERE status = 'fila' ORDER BY prioridade DESC, iniciado_em, id
+        db.Index('ix_atendimentos_fila', status, prioridade.desc(), iniciado_em, id),
+        # Listagens por status (ORDER BY iniciado_em DESC) e /estatisticas
+        # (GROUP BY status só com colunas do índice, sem ler a tabela)
+        db.Index('ix_atendimentos_status_iniciado', status, iniciado_em, tempo_espera, tempo_atendimento),
+        # Histórico do agente e do cliente, mais recentes primeiro
+        db.Index('ix_atendimentos_agente_iniciado', agente_id, iniciado_em),
+        db.Index('ix_atendimentos_cliente_iniciado', cliente_id, iniciado_em),
+        # Candidatos ao arquivamento: finalizados há mais de N dias
+        db.Index('ix_atendimentos_status_finalizado', status, finalizado_em),
+        # Ids nunca reaproveitados no SQLite: os arquivados mantêm o id original
+        {'sqlite_autoincrement': True},
+    )
     
     # Relacionamentos
     mensagens = db.relationship('Mensagem', backref='atendimento', lazy=True, order_by='Mensagem.enviada_em')
+    lista_tags = db.relationship('Tag', secondary='atendimentos_tags', lazy='select', order_by='Tag.nome', viewonly=True)
     
-    def to_dict(self):
-        return {
+    @property
+    def tags(self):
+        """Tags no formato antigo (JSON string), para manter a resposta da API"""
+        if self.lista_tags:
+            return json.dumps([t.nome for t in self.lista_tags])
+        if self.tags_legado is not None:
+            return self.tags_legado
+        return json.dumps([])
+    
+    @classmethod
+    def consulta_listagem(cls, campos=None):
+        """
+        Query base para listagens, já trazendo cliente e agente no mesmo JOIN.
+        Com `campos`, só carrega as relações que vão aparecer na resposta.
+        """
+        opcoes = _opcoes_relacoes(cls, campos)
+        if campos is None or 'tags' in campos:
+            opcoes.append(selectinload(cls.lista_tags))
+        return cls.query.options(*opcoes)
+    
+    @staticmethod
+    def contar_mensagens(atendimento_ids):
+        """Conta mensagens de vários atendimentos com um único COUNT agrupado"""
+        if not atendimento_ids:
+            return {}
+        linhas = db.session.query(
+            Mensagem.atendimento_id, func.count(Mensagem.id)
+        ).filter(
+            Mensagem.atendimento_id.in_(atendimento_ids)
+        ).group_by(Mensagem.atendimento_id).all()
+        return dict(linhas)
+    
+    @classmethod
+    def serializar_iter(cls, atendimentos, campos=None):
+        """
+        Serializa atendimentos sem consultas extras por linha; as contagens
+        saem numa consulta só, aqui, e cada dict é montado sob demanda.
+        Arquivados podem vir misturados: eles já trazem a própria contagem.
+        """
+        if campos is None or 'total_mensagens' in campos:
+            contagens = cls.contar_mensagens([a.id for a in atendimentos if isinstance(a, cls)])
+        else:
+            contagens = {}
+        return (
+            a.to_dict(total_mensagens=contagens.get(a.id, 0) if isinstance(a, cls) else None, campos=campos)
+            for a in atendimentos
+        )
+    
+    @classmethod
+    def serializar_lista(cls, atendimentos, campos=None):
+        return list(cls.serializar_iter(atendimentos, campos))
+    
+    def to_dict(self, total_mensagens=None, campos=None):
+        dados = {
             'id': self.id,
             'cliente_id': self.cliente_id,
-            'cliente': self.cliente.to_dict() if self.cliente else None,
             'agente_id': self.agente_id,
-            'agente': self.agente.to_dict() if self.agente else None,
             'status': self.status,
             'prioridade': self.prioridade,
             'departamento': self.departamento,
             'assunto': self.assunto,
-            'iniciado_em': self.iniciado_em.isoformat() if self.iniciado_em else None,
-            'atribuido_em': self.atribuido_em.isoformat() if self.atribuido_em else None,
-            'finalizado_em': self.finalizado_em.isoformat() if self.finalizado_em else None,
+            'iniciado_em': self.iniciado_em,
+            'atribuido_em': self.atribuido_em,
+            'finalizado_em': self.finalizado_em,
             'tempo_espera': self.tempo_espera,
             'tempo_atendimento': self.tempo_atendimento,
             'avaliacao': self.avaliacao,
             'comentario_avaliacao': self.comentario_avaliacao,
-            'tags': self.tags,
-            'total_mensagens': len(self.mensagens) if self.mensagens else 0
+            'arquivado': False
+        }
+        
+        # Com `campos`, relações e contagens fora da seleção nem são carregadas
+        if campos is not None:
+            dados = {campo: valor for campo, valor in dados.items() if campo in campos}
+        if campos is None or 'cliente' in campos:
+            dados['cliente'] = self.cliente.to_dict() if self.cliente else None
+        if campos is None or 'agente' in campos:
+            dados['agente'] = self.agente.to_dict() if self.agente else None
+        if campos is None or 'tags' in campos:
+            dados['tags'] = self.tags
+        if campos is None or 'total_mensagens' in campos:
+            if total_mensagens is None:
+                total_mensagens = self.contar_mensagens([self.id]).get(self.id, 0) if self.id else 0
+            dados['total_mensagens'] = total_mensagens
+        
+        return dados
+
+
+class EstatisticaAgente(db.Model):
+    """Totais acumulados por agente, mantidos ao finalizar atendimentos"""
+    __tablename__ = 'estatisticas_agente'
+    
+    agente_id = db.Column(db.Integer, db.ForeignKey('agentes.id', ondelete='CASCADE'), primary_key=True)
+    atendimentos_finalizados = db.Column(db.Integer, nullable=False, default=0)
+    soma_tempo_atendimento = db.Column(db.BigInteger, nullable=False, default=0)  # segundos
+    total_tempo_atendimento = db.Column(db.Integer, nullable=False, default=0)
+    soma_avaliacoes = db.Column(db.Integer, nullable=False, default=0)
+    total_avaliacoes = db.Column(db.Integer, nullable=False, default=0)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'atendimentos_finalizados': self.atendimentos_finalizados,
+            'tempo_medio_atendimento': int(self.soma_tempo_atendimento / self.total_tempo_atendimento) if self.total_tempo_atendimento else 0,
+            'avaliacao_media': round(self.soma_avaliacoes / self.total_avaliacoes, 2) if self.total_avaliacoes else 0,
+            'total_avaliacoes': self.total_avaliacoes
+        }
+
+
+class EstatisticaAgenteDiaria(db.Model):
+    """Totais por agente e por dia de finalização"""
+    __tablename__ = 'estatisticas_agente_diarias'
+    
+    agente_id = db.Column(db.Integer, db.ForeignKey('agentes.id', ondelete='CASCADE'), primary_key=True)
+    dia = db.Column(db.Date, primary_key=True)
+    atendimentos_finalizados = db.Column(db.Integer, nullable=False, default=0)
+    soma_tempo_atendimento = db.Column(db.BigInteger, nullable=False, default=0)  # segundos
+    total_tempo_atendimento = db.Column(db.Integer, nullable=False, default=0)
+    soma_avaliacoes = db.Column(db.Integer, nullable=False, default=0)
+    total_avaliacoes = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'dia': self.dia,
+            'atendimentos_finalizados': self.atendimentos_finalizados,
+            'tempo_medio_atendimento': int(self.soma_tempo_atendimento / self.total_tempo_atendimento) if self.total_tempo_atendimento else 0,
+            'avaliacao_media': round(self.soma_avaliacoes / self.total_avaliacoes, 2) if self.total_avaliacoes else 0,
+            'total_avaliacoes': self.total_avaliacoes
         }
 
 
 class Mensagem(db.Model):
     """Modelo para mensagens trocadas"""
     __tablename__ = 'mensagens'
+    __table_args__ = (
+        # Paginação por cursor do histórico: (atendimento_id, enviada_em, id)
+        db.Index('ix_mensagens_atendimento_enviada', 'atendimento_id', 'enviada_em', 'id'),
+        # Exportação de transcrições por período, em ordem de envio
+        db.Index('ix_mensagens_enviada', 'enviada_em', 'id'),
+        {'sqlite_autoincrement': True},
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     atendimento_id = db.Column(db.Integer, db.ForeignKey('atendimentos.id'), nullable=False)
@@ -139,11 +338,26 @@ class Mensagem(db.Model):
             'conteudo': self.conteudo,
             'arquivo_url': self.arquivo_url,
             'lida': self.lida,
-            'enviada_em': self.enviada_em.isoformat() if self.enviada_em else None,
-            'lida_em': self.lida_em.isoformat() if self.lida_em else None
+            'enviada_em': self.enviada_em,
+            'lida_em': self.lida_em
         }
 
 
+class MensagemExterna(db.Model):
+    """
+    Mensagens recebidas de canais externos (Twilio), pelo id do provedor.
+    A PK impede processar a mesma mensagem duas vezes e guarda a resposta
+    do bot para reenviá-la quando o provedor repete a entrega.
+    """
+    __tablename__ = 'mensagens_externas'
+    
+    id_externo = db.Column(db.String(64), primary_key=True)  # MessageSid
+    canal = db.Column(db.String(20), nullable=False)  # whatsapp
+    mensagem_id = db.Column(db.Integer, db.ForeignKey('mensagens.id'))
+    resposta = db.Column(db.Text)
+    recebida_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class ConfiguracaoChatbot(db.Model):
     """Configurações do chatbot"""
     __tablename__ = 'configuracao_chatbot'
@@ -179,6 +393,9 @@ class ConfiguracaoChatbot(db.Model):
 class Webhook(db.Model):
     """Registro de webhooks para integrações"""
     __tablename__ = 'webhooks'
+    __table_args__ = (
+        db.Index('ix_webhooks_evento_ativo', 'evento', 'ativo'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), nullable=False)
@@ -198,8 +415,144 @@ class Webhook(db.Model):
             'evento': self.evento,
             'ativo': self.ativo,
             'headers': self.headers,
-            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
-            'ultima_execucao': self.ultima_execucao.isoformat() if self.ultima_execucao else None,
+            'criado_em': self.criado_em,
+            'ultima_execucao': self.ultima_execucao,
             'total_execucoes': self.total_execucoes
         }
 
+
+
+class EntregaWebhook(db.Model):
+    """Fila persistente (outbox) de entregas de webhooks"""
+    __tablename__ = 'entregas_webhook'
+    __table_args__ = (
+        db.Index('ix_entregas_webhook_status_proxima', 'status', 'proxima_tentativa'),
+        db.Index('ix_entregas_webhook_webhook', 'webhook_id', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    webhook_id = db.Column(db.Integer, db.ForeignKey('webhooks.id', ondelete='CASCADE'), nullable=False)
+    evento = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON string
+    status = db.Column(db.String(20), default='pendente')  # pendente, enviando, entregue, falhou
+    tentativas = db.Column(db.Integer, default=0)
+    proxima_tentativa = db.Column(db.DateTime, default=datetime.utcnow)
+    ultimo_erro = db.Column(db.Text)
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    entregue_em = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'webhook_id': self.webhook_id,
+            'evento': self.evento,
+            'status': self.status,
+            'tentativas': self.tentativas,
+            'proxima_tentativa': self.proxima_tentativa,
+            'ultimo_erro': self.ultimo_erro,
+            'criado_em': self.criado_em,
+            'entregue_em': self.entregue_em
+        }
+
+
+class Evento(db.Model):
+    """Eventos publicados para o stream SSE quando há vários workers"""
+    __tablename__ = 'eventos'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)
+    dados = db.Column(db.Text)  # JSON string
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'dados': json.loads(self.dados) if self.dados else {}
+        }
+
+
+class VersaoRecurso(db.Model):
+    """Contador de versão por recurso, usado para invalidar caches entre workers"""
+    __tablename__ = 'versoes_recurso'
+    
+    recurso = db.Column(db.String(50), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class AtendimentoArquivado(db.Model):
+    """
+    Atendimentos finalizados movidos para fora da tabela quente por
+    arquivamento.arquivar(). Mantém o id original; as tags ficam
+    congeladas em JSON e a contagem de mensagens é gravada no arquivamento.
+    """
+    __tablename__ = 'atendimentos_arquivados'
+    __table_args__ = (
+        db.Index('ix_atendimentos_arquivados_cliente_iniciado', 'cliente_id', 'iniciado_em'),
+        db.Index('ix_atendimentos_arquivados_agente_iniciado', 'agente_id', 'iniciado_em'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id'), nullable=False)
+    agente_id = db.Column(db.Integer, db.ForeignKey('agentes.id'))
+    status = db.Column(db.String(20))
+    prioridade = db.Column(db.Integer)
+    departamento = db.Column(db.String(50))
+    assunto = db.Column(db.String(200))
+    iniciado_em = db.Column(db.DateTime)
+    atribuido_em = db.Column(db.DateTime)
+    finalizado_em = db.Column(db.DateTime)
+    tempo_espera = db.Column(db.Integer)
+    tempo_atendimento = db.Column(db.Integer)
+    avaliacao = db.Column(db.Integer)
+    comentario_avaliacao = db.Column(db.Text)
+    tags = db.Column(db.Text)  # JSON string, no formato da API
+    total_mensagens = db.Column(db.Integer, nullable=False, default=0)
+    arquivado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    cliente = db.relationship('Cliente')
+    agente = db.relationship('Agente')
+    
+    @classmethod
+    def consulta_listagem(cls, campos=None):
+        """Mesma query base de Atendimento.consulta_listagem, sobre o arquivo"""
+        return cls.query.options(*_opcoes_relacoes(cls, campos))
+    
+    def to_dict(self, total_mensagens=None, campos=None):
+        """Mesmo formato de Atendimento.to_dict, com `arquivado` verdadeiro"""
+        dados = Atendimento.to_dict(self, self.total_mensagens if total_mensagens is None else total_mensagens, campos)
+        if 'arquivado' in dados:
+            dados['arquivado'] = True
+        return dados
+
+
+class MensagemArquivada(db.Model):
+    """Mensagens dos atendimentos arquivados, com o id original"""
+    __tablename__ = 'mensagens_arquivadas'
+    __table_args__ = (
+        db.Index('ix_mensagens_arquivadas_atendimento_enviada', 'atendimento_id', 'enviada_em', 'id'),
+        db.Index('ix_mensagens_arquivadas_enviada', 'enviada_em', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    atendimento_id = db.Column(db.Integer, db.ForeignKey('atendimentos_arquivados.id'), nullable=False)
+    cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id'), nullable=False)
+    agente_id = db.Column(db.Integer, db.ForeignKey('agentes.id'))
+    tipo = db.Column(db.String(20))
+    remetente = db.Column(db.String(20), nullable=False)
+    conteudo = db.Column(db.Text, nullable=False)
+    arquivo_url = db.Column(db.String(500))
+    lida = db.Column(db.Boolean)
+    enviada_em = db.Column(db.DateTime)
+    lida_em = db.Column(db.DateTime)
+    
+    to_dict = Mensagem.to_dict
+
+
+class TotalArquivado(db.Model):
+    """Atendimentos arquivados por status, para /estatisticas não contar o arquivo"""
+    __tablename__ = 'totais_arquivados'
+    
+    status = db.Column(db.String(20), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
@@ -1,17 +1,26 @@
 from flask import Blueprint, request, jsonify
-from datetime import datetime
+from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash, check_password_hash
 from src.models.user import db
-from src.models.atendimento import Agente, Atendimento
+from src.models.atendimento import Agente, Atendimento, AgenteDepartamento
+from src.services import arquivamento, estatisticas_agente
+from src.services.versoes import AGENTES, CLIENTES, atendimentos_do_agente, com_etag, incrementar_versao
+from src.utils.paginacao import ParametroInvalido, ParametrosListagem, paginar, paginar_uniao
 
 agente_bp = Blueprint('agente', __name__)
 
 @agente_bp.route('/agentes', methods=['GET'])
+@com_etag(AGENTES)
 def listar_agentes():
-    """Lista todos os agentes"""
+    """Lista agentes em ordem de cadastro, paginando por cursor"""
     try:
-        agentes = Agente.query.all()
-        return jsonify([a.to_dict() for a in agentes])
+        try:
+            parametros = ParametrosListagem.da_requisicao(request.args)
+        except ParametroInvalido as e:
+            return jsonify({'error': str(e)}), 400
+        
+        pagina = paginar(Agente.query, parametros, coluna_id=Agente.id, decrescente=False)
+        return jsonify(pagina.to_dict('agentes', [parametros.filtrar(a.to_dict()) for a in pagina.registros]))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -44,6 +53,7 @@ def criar_agente():
         )
         
         db.session.add(agente)
+        incrementar_versao(AGENTES)
         db.session.commit()
         
         return jsonify(agente.to_dict()), 201
@@ -70,6 +80,7 @@ def atualizar_agente(agente_id):
         if 'status' in data:
             agente.status = data['status']
         
+        incrementar_versao(AGENTES)
         db.session.commit()
         
         return jsonify(agente.to_dict())
@@ -84,6 +95,7 @@ def deletar_agente(agente_id):
     try:
         agente = Agente.query.get_or_404(agente_id)
         db.session.delete(agente)
+        incrementar_versao(AGENTES)
         db.session.commit()
         return '', 204
     except Exception as e:
@@ -105,6 +117,7 @@ def login_agente():
         # Atualizar status e último acesso
         agente.status = 'online'
         agente.ultimo_acesso = datetime.utcnow()
+        incrementar_versao(AGENTES)
         db.session.commit()
         
         return jsonify({
@@ -122,6 +135,7 @@ def logout_agente(agente_id):
     try:
         agente = Agente.query.get_or_404(agente_id)
         agente.status = 'offline'
+        incrementar_versao(AGENTES)
         db.session.commit()
         
         return jsonify({'message': 'Logout realizado com sucesso'})
@@ -139,6 +153,7 @@ def atualizar_status_agente(agente_id):
         
         agente.status = data['status']
         agente.ultimo_acesso = datetime.utcnow()
+        incrementar_versao(AGENTES)
         db.session.commit()
         
         return jsonify(agente.to_dict())
@@ -148,24 +163,28 @@ def atualizar_status_agente(agente_id):
 
 
 @agente_bp.route('/agentes/<int:agente_id>/atendimentos', methods=['GET'])
+@com_etag(atendimentos_do_agente, AGENTES, CLIENTES)
 def listar_atendimentos_agente(agente_id):
-    """Lista atendimentos de um agente específico"""
+    """Lista atendimentos de um agente específico, paginando por cursor"""
     try:
         agente = Agente.query.get_or_404(agente_id)
+        try:
+            parametros = ParametrosListagem.da_requisicao(request.args)
+        except ParametroInvalido as e:
+            return jsonify({'error': str(e)}), 400
         
         status = request.args.get('status')
         
-        query = Atendimento.query.filter_by(agente_id=agente_id)
-        
+        filtros = {'agente_id': agente_id}
         if status:
-            query = query.filter_by(status=status)
+            filtros['status'] = status
         
-        atendimentos = query.order_by(Atendimento.iniciado_em.desc()).all()
+        # Atendimentos arquivados entram intercalados no histórico
+        pagina = paginar_uniao(arquivamento.consultas_historico(parametros.campos, **filtros), parametros)
         
-        return jsonify({
-            'agente': agente.to_dict(),
-            'atendimentos': [a.to_dict() for a in atendimentos]
-        })
+        resposta = pagina.to_dict('atendimentos', Atendimento.serializar_lista(pagina.registros, parametros.campos))
+        resposta['agente'] = agente.to_dict()
+        return jsonify(resposta)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -176,37 +195,27 @@ def obter_estatisticas_agente(agente_id):
     try:
         agente = Agente.query.get_or_404(agente_id)
         
-        # Atendimentos finalizados
-        atendimentos_finalizados = Atendimento.query.filter_by(
-            agente_id=agente_id,
-            status='finalizado'
-        ).all()
-        
-        # Tempo médio de atendimento
-        tempo_medio = 0
-        if atendimentos_finalizados:
-            tempos = [a.tempo_atendimento for a in atendimentos_finalizados if a.tempo_atendimento]
-            if tempos:
-                tempo_medio = sum(tempos) / len(tempos)
-        
-        # Avaliação média
-        avaliacoes = [a.avaliacao for a in atendimentos_finalizados if a.avaliacao]
-        avaliacao_media = sum(avaliacoes) / len(avaliacoes) if avaliacoes else 0
-        
-        return jsonify({
+        # Totais mantidos em estatisticas_agente ao finalizar cada atendimento
+        resultado = {
             'agente': agente.to_dict(),
             'total_atendimentos': agente.total_atendimentos,
             'atendimentos_ativos': agente.atendimentos_ativos,
-            'atendimentos_finalizados': len(atendimentos_finalizados),
-            'tempo_medio_atendimento': int(tempo_medio),
-            'avaliacao_media': round(avaliacao_media, 2),
-            'total_avaliacoes': len(avaliacoes)
-        })
+            **estatisticas_agente.obter(agente_id).to_dict()
+        }
+        
+        # Série diária opcional: ?dias=30
+        dias = request.args.get('dias', type=int)
+        if dias:
+            desde = datetime.utcnow().date() - timedelta(days=dias - 1)
+            resultado['diario'] = [d.to_dict() for d in estatisticas_agente.obter_diarias(agente_id, desde)]
+        
+        return jsonify(resultado)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @agente_bp.route('/agentes/disponiveis', methods=['GET'])
+@com_etag(AGENTES)
 def listar_agentes_disponiveis():
     """Lista agentes disponíveis para receber atendimentos"""
     try:
@@ -219,3 +228,34 @@ def listar_agentes_disponiveis():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+
+@agente_bp.route('/agentes/<int:agente_id>/departamentos', methods=['GET'])
+def listar_departamentos_agente(agente_id):
+    """Lista os departamentos atendidos por um agente"""
+    try:
+        Agente.query.get_or_404(agente_id)
+        departamentos = AgenteDepartamento.query.filter_by(agente_id=agente_id).all()
+        return jsonify([d.departamento for d in departamentos])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@agente_bp.route('/agentes/<int:agente_id>/departamentos', methods=['PUT'])
+def atualizar_departamentos_agente(agente_id):
+    """Define os departamentos atendidos por um agente (afinidade no roteamento)"""
+    try:
+        Agente.query.get_or_404(agente_id)
+        data = request.json
+        
+        departamentos = sorted(set(data.get('departamentos', [])))
+        AgenteDepartamento.query.filter_by(agente_id=agente_id).delete()
+        db.session.add_all([
+            AgenteDepartamento(agente_id=agente_id, departamento=d) for d in departamentos
+        ])
+        db.session.commit()
+        
+        return jsonify(departamentos)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -1,20 +1,40 @@
-from flask import Blueprint, request, jsonify
-from datetime import datetime, timedelta
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from datetime import datetime
 from src.models.user import db
 from src.models.atendimento import Atendimento, Cliente, Agente, Mensagem
-import json
+from src.utils.paginacao import (
+    LIMITE_MAXIMO, CursorInvalido, ParametroInvalido, ParametrosListagem, codificar_cursor, decodificar_cursor,
+    ler_data, obter_limite, filtro_antes, filtro_depois, paginar
+)
+from src.utils.serializacao import resposta_streaming
+from src.services import arquivamento, estatisticas, estatisticas_agente, fila, tags, transcricoes
+from src.services.versoes import (
+    AGENTES, CLIENTES, FILA, com_etag, incrementar_versao, incrementar_versoes, recursos_do_atendimento
+)
+from src.services.eventos import (
+    publicar_evento, FILA_ATUALIZADA, NOVA_MENSAGEM,
+    ATENDIMENTO_ATRIBUIDO, ATENDIMENTO_FINALIZADO
+)
 
 atendimento_bp = Blueprint('atendimento', __name__)
 
 @atendimento_bp.route('/atendimentos', methods=['GET'])
 def listar_atendimentos():
-    """Lista todos os atendimentos com filtros opcionais"""
+    """
+    Lista atendimentos com filtros opcionais (status, agente_id, cliente_id,
+    desde/ate sobre iniciado_em), paginando por cursor
+    """
     try:
+        try:
+            parametros = ParametrosListagem.da_requisicao(request.args)
+        except ParametroInvalido as e:
+            return jsonify({'error': str(e)}), 400
+        
         status = request.args.get('status')
         agente_id = request.args.get('agente_id')
         cliente_id = request.args.get('cliente_id')
         
-        query = Atendimento.query
+        query = Atendimento.consulta_listagem(parametros.campos)
         
         if status:
             query = query.filter_by(status=status)
@@ -23,8 +43,39 @@ def listar_atendimentos():
         if cliente_id:
             query = query.filter_by(cliente_id=cliente_id)
         
-        atendimentos = query.order_by(Atendimento.iniciado_em.desc()).all()
-        return jsonify([a.to_dict() for a in atendimentos])
+        pagina = paginar(query, parametros, Atendimento.iniciado_em, Atendimento.id)
+        # Os registros já estão carregados; só a serialização acontece durante o envio
+        return resposta_streaming(pagina.to_dict(
+            'atendimentos', Atendimento.serializar_iter(pagina.registros, parametros.campos)
+        ))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@atendimento_bp.route('/atendimentos/tag/<tag>', methods=['GET'])
+def listar_atendimentos_por_tag(tag):
+    """Lista atendimentos com a tag, dos mais novos para os mais antigos, paginando por cursor"""
+    try:
+        try:
+            limite = obter_limite(request.args.get('limit'))
+            cursor = request.args.get('cursor')
+            antes_de = decodificar_cursor(cursor)[1] if cursor else None
+        except CursorInvalido as e:
+            return jsonify({'error': str(e)}), 400
+        
+        ids = tags.filtrar(Atendimento, tag, limite, antes_de)
+        has_more = len(ids) > limite
+        ids = ids[:limite]
+        
+        atendimentos = {}
+        if ids:
+            atendimentos = {a.id: a for a in Atendimento.consulta_listagem().filter(Atendimento.id.in_(ids))}
+        
+        return jsonify({
+            'atendimentos': Atendimento.serializar_lista([atendimentos[i] for i in ids if i in atendimentos]),
+            'next_cursor': codificar_cursor(None, ids[-1]) if has_more else None,
+            'has_more': has_more
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -33,7 +84,9 @@ def listar_atendimentos():
 def obter_atendimento(atendimento_id):
     """Obtém detalhes de um atendimento específico"""
     try:
-        atendimento = Atendimento.query.get_or_404(atendimento_id)
+        atendimento = arquivamento.obter_atendimento(atendimento_id)
+        if atendimento is None:
+            return jsonify({'error': 'Atendimento não encontrado'}), 404
         return jsonify(atendimento.to_dict())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -66,8 +119,11 @@ def criar_atendimento():
         )
         
         db.session.add(atendimento)
+        incrementar_versao(FILA)
         db.session.commit()
         
+        publicar_evento(FILA_ATUALIZADA, {'atendimento_id': atendimento.id})
+        
         return jsonify(atendimento.to_dict()), 201
     except Exception as e:
         db.session.rollback()
@@ -81,26 +137,21 @@ def atribuir_atendimento(atendimento_id):
         data = request.json
         agente_id = data.get('agente_id')
         
-        atendimento = Atendimento.query.get_or_404(atendimento_id)
-        agente = Agente.query.get_or_404(agente_id)
+        Atendimento.query.get_or_404(atendimento_id)
+        Agente.query.get_or_404(agente_id)
         
-        # Verificar se agente pode receber mais atendimentos
-        if agente.atendimentos_ativos >= agente.max_atendimentos:
+        # Capacidade do agente e status do atendimento verificados atomicamente
+        try:
+            atendimento = fila.atribuir(atendimento_id, agente_id)
+        except fila.CapacidadeEsgotada:
             return jsonify({'error': 'Agente com capacidade máxima'}), 400
+        except fila.AtendimentoIndisponivel:
+            return jsonify({'error': 'Atendimento já atribuído ou finalizado'}), 409
         
-        # Atribuir atendimento
-        atendimento.agente_id = agente_id
-        atendimento.status = 'em_atendimento'
-        atendimento.atribuido_em = datetime.utcnow()
-        
-        if atendimento.iniciado_em:
-            atendimento.tempo_espera = int((atendimento.atribuido_em - atendimento.iniciado_em).total_seconds())
-        
-        # Atualizar contador do agente
-        agente.atendimentos_ativos += 1
-        agente.total_atendimentos += 1
-        
-        db.session.commit()
+        publicar_evento(ATENDIMENTO_ATRIBUIDO, {
+            'atendimento_id': atendimento.id,
+            'agente_id': atendimento.agente_id
+        })
         
         return jsonify(atendimento.to_dict())
     except Exception as e:
@@ -115,27 +166,43 @@ def finalizar_atendimento(atendimento_id):
         data = request.json
         
         atendimento = Atendimento.query.get_or_404(atendimento_id)
-        atendimento.status = 'finalizado'
-        atendimento.finalizado_em = datetime.utcnow()
+        if atendimento.status == 'finalizado':
+            return jsonify({'error': 'Atendimento já finalizado'}), 409
+        status_anterior = atendimento.status
         
+        finalizado_em = datetime.utcnow()
+        valores = {'finalizado_em': finalizado_em}
         if atendimento.atribuido_em:
-            atendimento.tempo_atendimento = int((atendimento.finalizado_em - atendimento.atribuido_em).total_seconds())
+            valores['tempo_atendimento'] = int((finalizado_em - atendimento.atribuido_em).total_seconds())
         
         # Avaliação opcional
         if 'avaliacao' in data:
-            atendimento.avaliacao = data['avaliacao']
-            atendimento.comentario_avaliacao = data.get('comentario')
+            valores['avaliacao'] = data['avaliacao']
+            valores['comentario_avaliacao'] = data.get('comentario')
+        
+        # Compare-and-set: só um pedido finaliza e libera a vaga do agente
+        try:
+            fila.finalizar(atendimento, valores)
+        except fila.AtendimentoIndisponivel:
+            db.session.rollback()
+            return jsonify({'error': 'Atendimento já foi finalizado ou alterado por outra requisição'}), 409
         
         # Tags opcionais
         if 'tags' in data:
-            atendimento.tags = json.dumps(data['tags'])
+            tags.definir(atendimento, data['tags'])
         
-        # Atualizar contador do agente
-        if atendimento.agente:
-            atendimento.agente.atendimentos_ativos = max(0, atendimento.agente.atendimentos_ativos - 1)
+        # Totais do agente atualizados na mesma transação
+        estatisticas_agente.aplicar(None, estatisticas_agente.contribuicao(atendimento))
         
+        # Sai da fila ou da lista do agente; o agente tem vaga e avaliação novas
+        incrementar_versoes(AGENTES, *recursos_do_atendimento(status_anterior, atendimento.agente_id))
         db.session.commit()
         
+        publicar_evento(ATENDIMENTO_FINALIZADO, {
+            'atendimento_id': atendimento.id,
+            'agente_id': atendimento.agente_id
+        })
+        
         return jsonify(atendimento.to_dict())
     except Exception as e:
         db.session.rollback()
@@ -144,15 +211,102 @@ def finalizar_atendimento(atendimento_id):
 
 @atendimento_bp.route('/atendimentos/<int:atendimento_id>/mensagens', methods=['GET'])
 def listar_mensagens(atendimento_id):
-    """Lista todas as mensagens de um atendimento"""
+    """
+    Lista as mensagens de um atendimento com paginação por cursor.
+    Sem cursor retorna a página mais recente; `before` pagina para mensagens
+    mais antigas e `after` busca apenas as mensagens novas; com `after`,
+    next_cursor é sempre a posição para a próxima consulta, mesmo sem
+    mensagens novas. Sem limit, before nem after, responde uma lista
+    simples, como antes da paginação, com as LIMITE_MAXIMO mais recentes.
+    """
     try:
-        atendimento = Atendimento.query.get_or_404(atendimento_id)
-        mensagens = Mensagem.query.filter_by(atendimento_id=atendimento_id).order_by(Mensagem.enviada_em).all()
-        return jsonify([m.to_dict() for m in mensagens])
+        atendimento = arquivamento.obter_atendimento(atendimento_id)
+        if atendimento is None:
+            return jsonify({'error': 'Atendimento não encontrado'}), 404
+        # Atendimentos arquivados leem as mensagens do arquivo, com o mesmo cursor
+        modelo = arquivamento.modelo_mensagens(atendimento)
+
+        if not any(parametro in request.args for parametro in ('limit', 'before', 'after')):
+            # Formato antigo (lista simples), ainda usado pelo bundle publicado; limitado como as páginas
+            mensagens = modelo.query.filter_by(atendimento_id=atendimento_id).order_by(
+                modelo.enviada_em.desc(), modelo.id.desc()
+            ).limit(LIMITE_MAXIMO).all()
+            return jsonify([m.to_dict() for m in reversed(mensagens)])
+
+        try:
+            limite = obter_limite(request.args.get('limit'))
+            before = request.args.get('before')
+            after = request.args.get('after')
+            if before and after:
+                return jsonify({'error': 'Use apenas before ou after'}), 400
+            cursor = decodificar_cursor(before or after) if (before or after) else None
+        except CursorInvalido as e:
+            return jsonify({'error': str(e)}), 400
+
+        query = modelo.query.filter_by(atendimento_id=atendimento_id)
+
+        if after:
+            query = query.filter(filtro_depois(modelo.enviada_em, modelo.id, *cursor))
+            query = query.order_by(modelo.enviada_em, modelo.id)
+        else:
+            if cursor:
+                query = query.filter(filtro_antes(modelo.enviada_em, modelo.id, *cursor))
+            query = query.order_by(modelo.enviada_em.desc(), modelo.id.desc())
+
+        # Busca um registro a mais para saber se existe próxima página
+        mensagens = query.limit(limite + 1).all()
+        has_more = len(mensagens) > limite
+        mensagens = mensagens[:limite]
+
+        next_cursor = None
+        if (has_more or after) and mensagens:
+            ultima = mensagens[-1]
+            next_cursor = codificar_cursor(ultima.enviada_em, ultima.id)
+        elif after:
+            # Nada novo: quem consulta continua da mesma posição
+            next_cursor = after
+
+        # A resposta sempre vem em ordem cronológica
+        if not after:
+            mensagens.reverse()
+
+        return jsonify({
+            'mensagens': [m.to_dict() for m in mensagens],
+            'next_cursor': next_cursor,
+            'has_more': has_more
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@atendimento_bp.route('/mensagens/exportar', methods=['GET'])
+def exportar_mensagens():
+    """
+    Exporta as mensagens com os dados do atendimento, cliente e agente, em
+    streaming. Filtros: desde/ate (data de envio) e departamento. formato=
+    ndjson (padrão) ou csv; gzip=1/0 muda a compactação (padrão: só CSV).
+    """
+    formato = request.args.get('formato', 'ndjson')
+    if formato not in transcricoes.FORMATOS:
+        return jsonify({'error': f'Formato inválido: {formato} (use ndjson ou csv)'}), 400
+    try:
+        desde = ler_data(request.args.get('desde'))
+        ate = ler_data(request.args.get('ate'), fim_do_dia=True)
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    compactar = request.args.get('gzip', '1' if formato == 'csv' else '0').lower() not in ('0', 'false', 'nao', 'não')
+    
+    gerador = transcricoes.exportar(formato, desde, ate, request.args.get('departamento'), compactar)
+    if compactar:
+        mimetype = 'application/gzip'
+    else:
+        mimetype = 'text/csv' if formato == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(gerador), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={transcricoes.nome_arquivo(formato, compactar)}',
+        'X-Accel-Buffering': 'no'
+    })
+
+
 @atendimento_bp.route('/atendimentos/<int:atendimento_id>/mensagens', methods=['POST'])
 def enviar_mensagem(atendimento_id):
     """Envia uma nova mensagem em um atendimento"""
@@ -176,8 +330,16 @@ def enviar_mensagem(atendimento_id):
         # Atualizar última interação do cliente
         atendimento.cliente.ultima_interacao = datetime.utcnow()
         
+        # total_mensagens muda nas listagens onde o atendimento aparece
+        incrementar_versoes(*recursos_do_atendimento(atendimento.status, atendimento.agente_id))
         db.session.commit()
         
+        publicar_evento(NOVA_MENSAGEM, {
+            'atendimento_id': atendimento_id,
+            'agente_id': atendimento.agente_id,
+            'mensagem': mensagem.to_dict()
+        })
+        
         return jsonify(mensagem.to_dict()), 201
     except Exception as e:
         db.session.rollback()
@@ -185,17 +347,18 @@ def enviar_mensagem(atendimento_id):
 
 
 @atendimento_bp.route('/fila', methods=['GET'])
+@com_etag(FILA, CLIENTES)
 def obter_fila():
     """Obtém atendimentos na fila ordenados por prioridade e tempo de espera"""
     try:
-        atendimentos = Atendimento.query.filter_by(status='fila').order_by(
+        atendimentos = Atendimento.consulta_listagem().filter_by(status='fila').order_by(
             Atendimento.prioridade.desc(),
             Atendimento.iniciado_em
         ).all()
         
         return jsonify({
             'total': len(atendimentos),
-            'atendimentos': [a.to_dict() for a in atendimentos]
+            'atendimentos': Atendimento.serializar_lista(atendimentos)
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -208,33 +371,21 @@ def pegar_proximo_fila():
         data = request.json
         agente_id = data.get('agente_id')
         
-        agente = Agente.query.get_or_404(agente_id)
+        Agente.query.get_or_404(agente_id)
         
-        # Verificar capacidade do agente
-        if agente.atendimentos_ativos >= agente.max_atendimentos:
+        # Reserva a vaga do agente e reivindica o próximo da fila na mesma transação
+        try:
+            atendimento = fila.reivindicar_proximo(agente_id)
+        except fila.CapacidadeEsgotada:
             return jsonify({'error': 'Agente com capacidade máxima'}), 400
         
-        # Buscar próximo atendimento na fila
-        atendimento = Atendimento.query.filter_by(status='fila').order_by(
-            Atendimento.prioridade.desc(),
-            Atendimento.iniciado_em
-        ).first()
-        
         if not atendimento:
             return jsonify({'message': 'Nenhum atendimento na fila'}), 404
         
-        # Atribuir atendimento
-        atendimento.agente_id = agente_id
-        atendimento.status = 'em_atendimento'
-        atendimento.atribuido_em = datetime.utcnow()
-        
-        if atendimento.iniciado_em:
-            atendimento.tempo_espera = int((atendimento.atribuido_em - atendimento.iniciado_em).total_seconds())
-        
-        agente.atendimentos_ativos += 1
-        agente.total_atendimentos += 1
-        
-        db.session.commit()
+        publicar_evento(ATENDIMENTO_ATRIBUIDO, {
+            'atendimento_id': atendimento.id,
+            'agente_id': atendimento.agente_id
+        })
         
         return jsonify(atendimento.to_dict())
     except Exception as e:
@@ -246,45 +397,6 @@ def pegar_proximo_fila():
 def obter_estatisticas():
     """Obtém estatísticas gerais do sistema"""
     try:
-        total_atendimentos = Atendimento.query.count()
-        em_fila = Atendimento.query.filter_by(status='fila').count()
-        em_atendimento = Atendimento.query.filter_by(status='em_atendimento').count()
-        finalizados = Atendimento.query.filter_by(status='finalizado').count()
-        
-        agentes_online = Agente.query.filter_by(status='online').count()
-        agentes_total = Agente.query.count()
-        
-        # Tempo médio de espera (últimas 24h)
-        ontem = datetime.utcnow() - timedelta(days=1)
-        atendimentos_recentes = Atendimento.query.filter(
-            Atendimento.iniciado_em >= ontem,
-            Atendimento.tempo_espera.isnot(None)
-        ).all()
-        
-        tempo_medio_espera = 0
-        if atendimentos_recentes:
-            tempo_medio_espera = sum(a.tempo_espera for a in atendimentos_recentes) / len(atendimentos_recentes)
-        
-        # Tempo médio de atendimento
-        atendimentos_finalizados = Atendimento.query.filter(
-            Atendimento.iniciado_em >= ontem,
-            Atendimento.tempo_atendimento.isnot(None)
-        ).all()
-        
-        tempo_medio_atendimento = 0
-        if atendimentos_finalizados:
-            tempo_medio_atendimento = sum(a.tempo_atendimento for a in atendimentos_finalizados) / len(atendimentos_finalizados)
-        
-        return jsonify({
-            'total_atendimentos': total_atendimentos,
-            'em_fila': em_fila,
-            'em_atendimento': em_atendimento,
-            'finalizados': finalizados,
-            'agentes_online': agentes_online,
-            'agentes_total': agentes_total,
-            'tempo_medio_espera': int(tempo_medio_espera),
-            'tempo_medio_atendimento': int(tempo_medio_atendimento)
-        })
+        return jsonify(estatisticas.obter_estatisticas())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-
@@ -1,9 +1,14 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime
 from src.models.user import db
-from src.models.atendimento import ConfiguracaoChatbot, Webhook, Atendimento, Cliente, Mensagem
+from src.models.atendimento import ConfiguracaoChatbot, Webhook, EntregaWebhook
+from src.services.webhooks import enfileirar_webhooks
+from src.services.config_chatbot import obter_config, cache_config, RECURSO as RECURSO_CONFIG
+from src.services.bot import registrar_mensagem, MensagemDuplicada
+from src.services.ingestao import ingestor, FilaCheia
+from src.utils.twiml import gerar_twiml
+from src.services.versoes import incrementar_versao
 import json
-import requests
 
 chatbot_bp = Blueprint('chatbot', __name__)
 
@@ -11,7 +16,7 @@ chatbot_bp = Blueprint('chatbot', __name__)
 def obter_config_chatbot():
     """Obtém configuração do chatbot"""
     try:
-        config = ConfiguracaoChatbot.query.first()
+        config = obter_config()
         if not config:
             # Criar configuração padrão
             config = ConfiguracaoChatbot(
@@ -34,7 +39,9 @@ def obter_config_chatbot():
                 ])
             )
             db.session.add(config)
+            incrementar_versao(RECURSO_CONFIG)
             db.session.commit()
+            cache_config.invalidar()
         
         return jsonify(config.to_dict())
     except Exception as e:
@@ -72,7 +79,10 @@ def atualizar_config_chatbot():
         if 'perguntas_frequentes' in data:
             config.perguntas_frequentes = json.dumps(data['perguntas_frequentes'])
         
+        # A nova versão faz os demais workers recarregarem a configuração
+        incrementar_versao(RECURSO_CONFIG)
         db.session.commit()
+        cache_config.invalidar()
         
         return jsonify(config.to_dict())
     except Exception as e:
@@ -85,64 +95,25 @@ def processar_mensagem_bot():
     """Processa uma mensagem recebida pelo chatbot"""
     try:
         data = request.json
-        telefone = data['telefone']
-        mensagem = data['mensagem'].lower().strip()
-        
-        # Buscar ou criar cliente
-        cliente = Cliente.query.filter_by(telefone=telefone).first()
-        if not cliente:
-            cliente = Cliente(
-                nome=data.get('nome', 'Cliente'),
-                telefone=telefone
-            )
-            db.session.add(cliente)
-            db.session.flush()
-        
-        # Buscar atendimento ativo ou criar novo
-        atendimento = Atendimento.query.filter_by(
-            cliente_id=cliente.id,
-            status='bot'
-        ).first()
         
-        if not atendimento:
-            atendimento = Atendimento(
-                cliente_id=cliente.id,
-                status='bot'
+        if ingestor.ativo:
+            # Gravação em lote; atendimento_id só é conhecido com durabilidade 'commit'
+            try:
+                item, resposta = ingestor.receber(data['telefone'], data['mensagem'], nome=data.get('nome', 'Cliente'))
+            except FilaCheia:
+                return jsonify({'error': 'Sistema ocupado, tente novamente'}), 503, {'Retry-After': '1'}
+            atendimento_id = item.atendimento_id
+        else:
+            atendimento, resposta = registrar_mensagem(
+                data['telefone'],
+                data['mensagem'],
+                nome=data.get('nome', 'Cliente')
             )
-            db.session.add(atendimento)
-            db.session.flush()
-        
-        # Salvar mensagem do cliente
-        msg_cliente = Mensagem(
-            atendimento_id=atendimento.id,
-            cliente_id=cliente.id,
-            remetente='cliente',
-            conteudo=data['mensagem']
-        )
-        db.session.add(msg_cliente)
-        
-        # Processar resposta do bot
-        resposta = processar_intencao(mensagem, atendimento)
-        
-        # Salvar resposta do bot
-        msg_bot = Mensagem(
-            atendimento_id=atendimento.id,
-            cliente_id=cliente.id,
-            remetente='bot',
-            conteudo=resposta['mensagem']
-        )
-        db.session.add(msg_bot)
-        
-        # Se solicitou atendente, mover para fila
-        if resposta.get('transferir_atendente'):
-            atendimento.status = 'fila'
-            atendimento.departamento = resposta.get('departamento')
-        
-        db.session.commit()
+            atendimento_id = atendimento.id
         
         return jsonify({
             'mensagem': resposta['mensagem'],
-            'atendimento_id': atendimento.id,
+            'atendimento_id': atendimento_id,
             'transferir_atendente': resposta.get('transferir_atendente', False),
             'opcoes': resposta.get('opcoes', [])
         })
@@ -151,61 +122,6 @@ def processar_mensagem_bot():
         return jsonify({'error': str(e)}), 500
 
 
-def processar_intencao(mensagem, atendimento):
-    """Processa a intenção da mensagem e retorna resposta apropriada"""
-    config = ConfiguracaoChatbot.query.first()
-    
-    # Palavras-chave para transferir para atendente
-    palavras_atendente = ['atendente', 'humano', 'pessoa', 'falar com alguém', 'operador']
-    if any(palavra in mensagem for palavra in palavras_atendente):
-        return {
-            'mensagem': 'Vou transferir você para um de nossos atendentes. Por favor, aguarde um momento.',
-            'transferir_atendente': True
-        }
-    
-    # Saudações
-    saudacoes = ['oi', 'olá', 'ola', 'bom dia', 'boa tarde', 'boa noite', 'hey', 'alo']
-    if any(saudacao in mensagem for saudacao in saudacoes):
-        return {
-            'mensagem': config.mensagem_boas_vindas if config else 'Olá! Como posso ajudá-lo?',
-            'opcoes': ['Falar com atendente', 'Ver horário de atendimento', 'Dúvidas frequentes']
-        }
-    
-    # Horário de atendimento
-    if 'horário' in mensagem or 'horario' in mensagem or 'funciona' in mensagem:
-        return {
-            'mensagem': f'Nosso horário de atendimento é de {config.horario_inicio} às {config.horario_fim}, de segunda a sexta-feira.'
-        }
-    
-    # Departamentos
-    if 'vendas' in mensagem or 'comprar' in mensagem or 'produto' in mensagem:
-        return {
-            'mensagem': 'Vou transferir você para o departamento de Vendas.',
-            'transferir_atendente': True,
-            'departamento': 'vendas'
-        }
-    
-    if 'suporte' in mensagem or 'problema' in mensagem or 'ajuda' in mensagem or 'erro' in mensagem:
-        return {
-            'mensagem': 'Vou transferir você para o Suporte Técnico.',
-            'transferir_atendente': True,
-            'departamento': 'suporte'
-        }
-    
-    if 'financeiro' in mensagem or 'boleto' in mensagem or 'pagamento' in mensagem or 'fatura' in mensagem:
-        return {
-            'mensagem': 'Vou transferir você para o departamento Financeiro.',
-            'transferir_atendente': True,
-            'departamento': 'financeiro'
-        }
-    
-    # Resposta padrão
-    return {
-        'mensagem': 'Desculpe, não entendi sua solicitação. Você pode:\n1. Falar com um atendente\n2. Ver nosso horário de atendimento\n3. Escolher um departamento: Vendas, Suporte ou Financeiro',
-        'opcoes': ['Atendente', 'Horário', 'Vendas', 'Suporte', 'Financeiro']
-    }
-
-
 # Webhooks
 
 @chatbot_bp.route('/webhooks', methods=['GET'])
@@ -280,71 +196,68 @@ def deletar_webhook(webhook_id):
         return jsonify({'error': str(e)}), 500
 
 
-def disparar_webhook(evento, dados):
-    """Dispara webhooks cadastrados para um evento específico"""
+@chatbot_bp.route('/webhooks/<int:webhook_id>/entregas', methods=['GET'])
+def listar_entregas_webhook(webhook_id):
+    """Lista as últimas entregas de um webhook"""
     try:
-        webhooks = Webhook.query.filter_by(evento=evento, ativo=True).all()
+        Webhook.query.get_or_404(webhook_id)
+        status = request.args.get('status')
         
-        for webhook in webhooks:
-            try:
-                headers = json.loads(webhook.headers) if webhook.headers else {}
-                headers['Content-Type'] = 'application/json'
-                
-                response = requests.post(
-                    webhook.url,
-                    json=dados,
-                    headers=headers,
-                    timeout=10
-                )
-                
-                webhook.ultima_execucao = datetime.utcnow()
-                webhook.total_execucoes += 1
-                db.session.commit()
-                
-            except Exception as e:
-                print(f"Erro ao disparar webhook {webhook.id}: {str(e)}")
-                continue
+        query = EntregaWebhook.query.filter_by(webhook_id=webhook_id)
+        if status:
+            query = query.filter_by(status=status)
+        
+        entregas = query.order_by(EntregaWebhook.id.desc()).limit(100).all()
+        return jsonify([e.to_dict() for e in entregas])
     except Exception as e:
-        print(f"Erro ao processar webhooks: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+def disparar_webhook(evento, dados):
+    """
+    Enfileira os webhooks cadastrados para um evento específico, na
+    transação de quem chama: o commit da mudança grava as entregas junto,
+    e um erro aqui deve desfazer as duas. O envio acontece em segundo
+    plano, com retentativas, depois do commit.
+    """
+    return enfileirar_webhooks(evento, dados)
 
 
 @chatbot_bp.route('/webhook', methods=['POST'])
 def receber_webhook_whatsapp():
     """
-    Endpoint para receber mensagens do WhatsApp (Twilio) localmente.
-    Permite testes com curl sem precisar do ngrok.
+    Endpoint para receber mensagens do WhatsApp (Twilio).
+    A mensagem passa pelo mesmo pipeline do /chatbot/processar; entregas
+    repetidas do mesmo MessageSid recebem a resposta original sem
+    reprocessar. Permite testes com curl sem precisar do ngrok.
     """
     try:
         # Twilio envia os dados como form-urlencoded
         from_number = request.form.get('From')
-        to_number = request.form.get('To')
-        body = request.form.get('Body')
-
-        print(f"📩 Mensagem recebida de {from_number} -> {to_number}: {body}")
+        body = request.form.get('Body') or ''
 
         # Normaliza número para formato simples
         telefone = from_number.replace("whatsapp:", "") if from_number else "desconhecido"
 
-        # Monta payload para o processador interno do bot
-        data = {
-            'telefone': telefone,
-            'mensagem': body or '',
-            'nome': 'Cliente WhatsApp'
-        }
-
-        # Processa usando a função existente
-        resposta = processar_intencao(body.lower().strip(), None)
-
-        print(f"🤖 Resposta do bot: {resposta['mensagem']}")
-
-        # Monta resposta Twilio (XML)
-        twiml = f"""<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Message>{resposta['mensagem']}</Message>
-</Response>"""
+        receber = ingestor.receber if ingestor.ativo else registrar_mensagem
+        try:
+            _, resposta = receber(
+                telefone,
+                body,
+                nome=request.form.get('ProfileName') or 'Cliente WhatsApp',
+                id_externo=request.form.get('MessageSid'),
+                canal='whatsapp'
+            )
+            texto = resposta['mensagem']
+        except MensagemDuplicada as e:
+            texto = e.resposta
+        except FilaCheia:
+            # O Twilio repete a entrega mais tarde
+            return gerar_twiml(), 503, {'Content-Type': 'application/xml', 'Retry-After': '1'}
 
-        return twiml, 200, {'Content-Type': 'application/xml'}
+        return gerar_twiml(texto), 200, {'Content-Type': 'application/xml'}
 
     except Exception as e:
+        db.session.rollback()
         print(f"❌ Erro no webhook: {str(e)}")
         return jsonify({'error': str(e)}), 500
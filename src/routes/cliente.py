@@ -1,17 +1,33 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from sqlalchemy.orm import selectinload
 from datetime import datetime
 from src.models.user import db
-from src.models.atendimento import Cliente, Atendimento
-import json
+from src.models.atendimento import Cliente, Atendimento, Tag, ClienteTag, AtendimentoTag
+from src.services import arquivamento, busca_clientes, clientes_lote, tags
+from src.services.versoes import CLIENTES, incrementar_versao
+from src.utils.paginacao import (
+    CursorInvalido, ParametroInvalido, ParametrosListagem, codificar_cursor, decodificar_cursor,
+    obter_limite, paginar, paginar_uniao
+)
+from src.utils.serializacao import resposta_streaming
 
 cliente_bp = Blueprint('cliente', __name__)
 
 @cliente_bp.route('/clientes', methods=['GET'])
 def listar_clientes():
-    """Lista todos os clientes"""
+    """Lista clientes pela última interação (desde/ate), paginando por cursor"""
     try:
-        clientes = Cliente.query.order_by(Cliente.ultima_interacao.desc()).all()
-        return jsonify([c.to_dict() for c in clientes])
+        try:
+            parametros = ParametrosListagem.da_requisicao(request.args)
+        except ParametroInvalido as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = Cliente.query
+        if parametros.inclui('tags'):
+            query = query.options(selectinload(Cliente.lista_tags))
+        
+        pagina = paginar(query, parametros, Cliente.ultima_interacao, Cliente.id)
+        return resposta_streaming(pagina.to_dict('clientes', (parametros.filtrar(c.to_dict()) for c in pagina.registros)))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -52,11 +68,13 @@ def criar_cliente():
             nome=data.get('nome', 'Cliente'),
             telefone=data['telefone'],
             email=data.get('email'),
-            tags=json.dumps(data.get('tags', [])) if 'tags' in data else None,
             notas=data.get('notas')
         )
         
         db.session.add(cliente)
+        db.session.flush()
+        if data.get('tags'):
+            tags.adicionar(cliente, data['tags'])
         db.session.commit()
         
         return jsonify(cliente.to_dict()), 201
@@ -77,10 +95,12 @@ def atualizar_cliente(cliente_id):
         if 'email' in data:
             cliente.email = data['email']
         if 'tags' in data:
-            cliente.tags = json.dumps(data['tags'])
+            tags.definir(cliente, data['tags'])
         if 'notas' in data:
             cliente.notas = data['notas']
         
+        # Os dados do cliente aparecem nas listagens de atendimentos
+        incrementar_versao(CLIENTES)
         db.session.commit()
         
         return jsonify(cliente.to_dict())
@@ -95,6 +115,7 @@ def deletar_cliente(cliente_id):
     try:
         cliente = Cliente.query.get_or_404(cliente_id)
         db.session.delete(cliente)
+        incrementar_versao(CLIENTES)
         db.session.commit()
         return '', 204
     except Exception as e:
@@ -104,16 +125,22 @@ def deletar_cliente(cliente_id):
 
 @cliente_bp.route('/clientes/<int:cliente_id>/atendimentos', methods=['GET'])
 def listar_atendimentos_cliente(cliente_id):
-    """Lista histórico de atendimentos de um cliente"""
+    """Lista histórico de atendimentos de um cliente, inclusive arquivados, paginando por cursor"""
     try:
         cliente = Cliente.query.get_or_404(cliente_id)
-        atendimentos = Atendimento.query.filter_by(cliente_id=cliente_id).order_by(Atendimento.iniciado_em.desc()).all()
+        try:
+            parametros = ParametrosListagem.da_requisicao(request.args)
+        except ParametroInvalido as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify({
-            'cliente': cliente.to_dict(),
-            'total_atendimentos': len(atendimentos),
-            'atendimentos': [a.to_dict() for a in atendimentos]
-        })
+        # Histórico completo: atendimentos arquivados entram intercalados
+        pagina = paginar_uniao(arquivamento.consultas_historico(parametros.campos, cliente_id=cliente_id), parametros)
+        
+        resposta = pagina.to_dict('atendimentos', Atendimento.serializar_lista(pagina.registros, parametros.campos))
+        resposta['cliente'] = cliente.to_dict()
+        if pagina.total is not None:
+            resposta['total_atendimentos'] = pagina.total
+        return jsonify(resposta)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -125,13 +152,9 @@ def adicionar_tag_cliente(cliente_id):
         cliente = Cliente.query.get_or_404(cliente_id)
         data = request.json
         
-        tags = json.loads(cliente.tags) if cliente.tags else []
-        nova_tag = data['tag']
-        
-        if nova_tag not in tags:
-            tags.append(nova_tag)
-            cliente.tags = json.dumps(tags)
-            db.session.commit()
+        tags.adicionar(cliente, data['tag'])
+        incrementar_versao(CLIENTES)
+        db.session.commit()
         
         return jsonify(cliente.to_dict())
     except Exception as e:
@@ -145,12 +168,9 @@ def remover_tag_cliente(cliente_id, tag):
     try:
         cliente = Cliente.query.get_or_404(cliente_id)
         
-        tags = json.loads(cliente.tags) if cliente.tags else []
-        
-        if tag in tags:
-            tags.remove(tag)
-            cliente.tags = json.dumps(tags)
-            db.session.commit()
+        tags.remover(cliente, tag)
+        incrementar_versao(CLIENTES)
+        db.session.commit()
         
         return jsonify(cliente.to_dict())
     except Exception as e:
@@ -158,19 +178,111 @@ def remover_tag_cliente(cliente_id, tag):
         return jsonify({'error': str(e)}), 500
 
 
+@cliente_bp.route('/clientes/tag/<tag>', methods=['GET'])
+def listar_clientes_por_tag(tag):
+    """Lista clientes com a tag, dos mais novos para os mais antigos, paginando por cursor"""
+    try:
+        try:
+            limite = obter_limite(request.args.get('limit'))
+            cursor = request.args.get('cursor')
+            antes_de = decodificar_cursor(cursor)[1] if cursor else None
+        except CursorInvalido as e:
+            return jsonify({'error': str(e)}), 400
+        
+        ids = tags.filtrar(Cliente, tag, limite, antes_de)
+        has_more = len(ids) > limite
+        ids = ids[:limite]
+        
+        clientes = {c.id: c for c in Cliente.query.options(selectinload(Cliente.lista_tags)).filter(Cliente.id.in_(ids))} if ids else {}
+        
+        return jsonify({
+            'clientes': [clientes[i].to_dict() for i in ids if i in clientes],
+            'next_cursor': codificar_cursor(None, ids[-1]) if has_more else None,
+            'has_more': has_more
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@cliente_bp.route('/tags', methods=['GET'])
+def listar_tags():
+    """Lista as tags com a quantidade de clientes e atendimentos de cada uma"""
+    try:
+        clientes = dict(db.session.query(ClienteTag.tag_id, db.func.count()).group_by(ClienteTag.tag_id).all())
+        atendimentos = dict(db.session.query(AtendimentoTag.tag_id, db.func.count()).group_by(AtendimentoTag.tag_id).all())
+        
+        return jsonify([{
+            'id': t.id,
+            'nome': t.nome,
+            'total_clientes': clientes.get(t.id, 0),
+            'total_atendimentos': atendimentos.get(t.id, 0)
+        } for t in Tag.query.order_by(Tag.nome).all()])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @cliente_bp.route('/clientes/buscar', methods=['GET'])
 def buscar_clientes():
     """Busca clientes por nome, telefone ou email"""
     try:
         termo = request.args.get('q', '')
+        limite = request.args.get('limit', busca_clientes.LIMITE_PADRAO, type=int)
         
-        clientes = Cliente.query.filter(
-            (Cliente.nome.ilike(f'%{termo}%')) |
-            (Cliente.telefone.ilike(f'%{termo}%')) |
-            (Cliente.email.ilike(f'%{termo}%'))
-        ).all()
+        clientes = busca_clientes.buscar(termo, limite)
         
         return jsonify([c.to_dict() for c in clientes])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+def _formato_arquivo(nome_arquivo=None):
+    formato = request.args.get('formato')
+    if not formato and nome_arquivo and '.' in nome_arquivo:
+        formato = nome_arquivo.rsplit('.', 1)[1].lower()
+    if not formato:
+        formato = 'ndjson' if 'ndjson' in (request.mimetype or '') else 'csv'
+    return formato
+
+
+@cliente_bp.route('/clientes/importar', methods=['POST'])
+def importar_clientes():
+    """
+    Importa clientes de um CSV ou NDJSON (arquivo multipart `arquivo` ou
+    corpo da requisição). Telefone é a chave: clientes existentes são
+    atualizados, ou ignorados com ?atualizar=false. Responde com os totais
+    e os erros por linha.
+    """
+    try:
+        if 'arquivo' in request.files:
+            arquivo = request.files['arquivo']
+            formato = _formato_arquivo(arquivo.filename)
+            entrada = arquivo.stream
+        else:
+            formato = _formato_arquivo()
+            entrada = request.stream
+        if formato not in clientes_lote.FORMATOS:
+            return jsonify({'error': f'Formato inválido: {formato} (use csv ou ndjson)'}), 400
+        atualizar = request.args.get('atualizar', 'true').lower() not in ('0', 'false', 'nao', 'não')
+        
+        resultado = clientes_lote.importar(clientes_lote.LEITORES[formato](entrada), atualizar=atualizar)
+        return jsonify(resultado.to_dict())
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({'error': 'Arquivo deve estar em UTF-8'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@cliente_bp.route('/clientes/exportar', methods=['GET'])
+def exportar_clientes():
+    """Exporta todos os clientes com as tags em CSV ou NDJSON, em streaming"""
+    formato = request.args.get('formato', 'csv')
+    if formato not in clientes_lote.FORMATOS:
+        return jsonify({'error': f'Formato inválido: {formato} (use csv ou ndjson)'}), 400
+    
+    mimetype = 'text/csv' if formato == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(clientes_lote.exportar(formato)), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=clientes.{formato}',
+        'X-Accel-Buffering': 'no'
+    })
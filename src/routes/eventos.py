@@ -0,0 +1,49 @@
+from flask import Blueprint, Response, jsonify, request
+import queue
+from src.services.eventos import LimiteAssinantes, obter_barramento, formatar_sse
+
+eventos_bp = Blueprint('eventos', __name__)
+
+INTERVALO_HEARTBEAT = 15  # segundos
+RETRY_SEM_VAGA = 30  # segundos até o navegador tentar o stream de novo
+
+
+@eventos_bp.route('/eventos/stream', methods=['GET'])
+def stream_eventos():
+    """
+    Stream SSE com mudanças na fila, novas mensagens e atribuições. Cada
+    conexão prende uma thread do worker; sem vaga (EVENTOS_MAX_CONEXOES),
+    responde 503 e o frontend volta ao polling até o Retry-After.
+    """
+    ultimo_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        ultimo_id = int(ultimo_id) if ultimo_id else None
+    except ValueError:
+        ultimo_id = None
+
+    barramento = obter_barramento()
+    try:
+        fila = barramento.assinar(ultimo_id)
+    except LimiteAssinantes:
+        return jsonify({'error': 'Limite de conexões de eventos atingido'}), 503, {
+            'Retry-After': str(RETRY_SEM_VAGA)
+        }
+
+    def gerar():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    evento = fila.get(timeout=INTERVALO_HEARTBEAT)
+                except queue.Empty:
+                    # Mantém a conexão viva através de proxies
+                    yield ': ping\n\n'
+                    continue
+                yield formatar_sse(evento)
+        finally:
+            barramento.cancelar(fila)
+
+    return Response(gerar(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import func, select
+from src.models.user import db
+from src.models.atendimento import (
+    Atendimento, AtendimentoArquivado, AtendimentoTag, Mensagem, MensagemArquivada, MensagemExterna, Tag,
+    TotalArquivado
+)
+from src.services.versoes import atendimentos_do_agente, incrementar_versoes
+
+COLUNAS_ATENDIMENTO = [
+    'id', 'cliente_id', 'agente_id', 'status', 'prioridade', 'departamento', 'assunto', 'iniciado_em',
+    'atribuido_em', 'finalizado_em', 'tempo_espera', 'tempo_atendimento', 'avaliacao', 'comentario_avaliacao'
+]
+COLUNAS_MENSAGEM = [
+    'id', 'atendimento_id', 'cliente_id', 'agente_id', 'tipo', 'remetente', 'conteudo', 'arquivo_url',
+    'lida', 'enviada_em', 'lida_em'
+]
+
+
+def _tags(atendimento_ids, legado):
+    nomes = {}
+    for atendimento_id, nome in db.session.execute(
+        select(AtendimentoTag.atendimento_id, Tag.nome).join(Tag, Tag.id == AtendimentoTag.tag_id)
+        .where(AtendimentoTag.atendimento_id.in_(atendimento_ids)).order_by(Tag.nome)
+    ):
+        nomes.setdefault(atendimento_id, []).append(nome)
+    return {i: json.dumps(nomes[i]) if i in nomes else legado.get(i) for i in atendimento_ids}
+
+
+def arquivar_lote(dias, lote=500):
+    """
+    Move até `lote` atendimentos finalizados há mais de `dias` dias, com as
+    mensagens, para as tabelas de arquivo, em uma transação. Retorna
+    (atendimentos, mensagens) arquivados; (0, 0) quando não há mais nada.
+    """
+    if dias < 1:
+        # Com menos de um dia, as médias de 24h de /estatisticas perderiam atendimentos
+        raise ValueError('O arquivamento exige pelo menos 1 dia desde a finalização')
+    limite = datetime.utcnow() - timedelta(days=dias)
+    linhas = db.session.execute(
+        select(*[Atendimento.__table__.c[c] for c in COLUNAS_ATENDIMENTO], Atendimento.tags_legado)
+        .where(Atendimento.status == 'finalizado', Atendimento.finalizado_em < limite)
+        .order_by(Atendimento.finalizado_em).limit(lote)
+    ).all()
+    if not linhas:
+        return 0, 0
+
+    ids = [l.id for l in linhas]
+    tags = _tags(ids, {l.id: l.tags_legado for l in linhas})
+    contagens = Atendimento.contar_mensagens(ids)
+    agora = datetime.utcnow()
+    db.session.execute(AtendimentoArquivado.__table__.insert(), [
+        {
+            **{c: getattr(l, c) for c in COLUNAS_ATENDIMENTO},
+            'tags': tags[l.id],
+            'total_mensagens': contagens.get(l.id, 0),
+            'arquivado_em': agora
+        }
+        for l in linhas
+    ])
+
+    # INSERT ... SELECT: as mensagens não passam pelo Python. Só saem da
+    # tabela quente as que foram copiadas; uma mensagem gravada entre a
+    # cópia e o DELETE é copiada na volta seguinte, em vez de apagada
+    mensagens = Mensagem.__table__
+    arquivadas = select(MensagemArquivada.id).where(MensagemArquivada.atendimento_id.in_(ids))
+    total_mensagens = 0
+    while True:
+        db.session.execute(MensagemArquivada.__table__.insert().from_select(
+            COLUNAS_MENSAGEM,
+            select(*[mensagens.c[c] for c in COLUNAS_MENSAGEM]).where(
+                mensagens.c.atendimento_id.in_(ids), mensagens.c.id.not_in(arquivadas)
+            )
+        ))
+        # O id externo continua deduplicando; só perde o vínculo com a linha quente
+        db.session.execute(MensagemExterna.__table__.update().where(
+            MensagemExterna.mensagem_id.in_(arquivadas)
+        ).values(mensagem_id=None))
+        total_mensagens += db.session.execute(mensagens.delete().where(mensagens.c.id.in_(arquivadas))).rowcount
+        restantes = db.session.execute(
+            select(mensagens.c.id).where(mensagens.c.atendimento_id.in_(ids)).limit(1)
+        ).first()
+        if restantes is None:
+            break
+
+    if total_mensagens != sum(contagens.values()):
+        contagem = select(func.count()).where(MensagemArquivada.atendimento_id == AtendimentoArquivado.id)
+        db.session.execute(AtendimentoArquivado.__table__.update().where(
+            AtendimentoArquivado.id.in_(ids)
+        ).values(total_mensagens=contagem.scalar_subquery()))
+    db.session.execute(AtendimentoTag.__table__.delete().where(AtendimentoTag.atendimento_id.in_(ids)))
+    db.session.execute(Atendimento.__table__.delete().where(Atendimento.id.in_(ids)))
+
+    atualizados = TotalArquivado.query.filter_by(status='finalizado').update(
+        {TotalArquivado.total: TotalArquivado.total + len(ids)}, synchronize_session=False
+    )
+    if not atualizados:
+        db.session.add(TotalArquivado(status='finalizado', total=len(ids)))
+    # No histórico dos agentes, os atendimentos passam a vir como arquivados
+    incrementar_versoes(*(atendimentos_do_agente(l.agente_id) for l in linhas if l.agente_id))
+    db.session.commit()
+    return len(ids), total_mensagens
+
+
+def arquivar(dias, lote=500, pausa=0.5, maximo=None):
+    """
+    Arquiva em lotes até não sobrar candidato (ou até `maximo` atendimentos),
+    dormindo `pausa` segundos entre lotes para não disputar o banco com o
+    tráfego. Retorna os totais (atendimentos, mensagens).
+    """
+    total_atendimentos = total_mensagens = 0
+    while maximo is None or total_atendimentos < maximo:
+        tamanho = lote if maximo is None else min(lote, maximo - total_atendimentos)
+        atendimentos, mensagens = arquivar_lote(dias, tamanho)
+        total_atendimentos += atendimentos
+        total_mensagens += mensagens
+        if atendimentos < tamanho:
+            break
+        time.sleep(pausa)
+    return total_atendimentos, total_mensagens
+
+
+def obter_atendimento(atendimento_id):
+    """Atendimento quente ou, se já foi arquivado, o arquivado; None se não existe"""
+    return db.session.get(Atendimento, atendimento_id) or db.session.get(AtendimentoArquivado, atendimento_id)
+
+
+def consultas_historico(campos=None, **filtros):
+    """Listagens da tabela quente e do arquivo com os mesmos filtros, para paginar_uniao()"""
+    return [
+        (modelo.consulta_listagem(campos).filter_by(**filtros), modelo.iniciado_em, modelo.id)
+        for modelo in (Atendimento, AtendimentoArquivado)
+    ]
+
+
+def modelo_mensagens(atendimento):
+    """Tabela de mensagens correspondente ao atendimento (quente ou arquivo)"""
+    return MensagemArquivada if isinstance(atendimento, AtendimentoArquivado) else Mensagem
+
+
+class ArquivadorPeriodico:
+    """Roda arquivar() a cada `intervalo` segundos numa thread do processo"""
+
+    def __init__(self, app, dias, lote, pausa, intervalo):
+        self.app = app
+        self.dias = dias
+        self.lote = lote
+        self.pausa = pausa
+        self.intervalo = intervalo
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self.executar, daemon=True)
+            self._thread.start()
+
+    def executar(self):
+        with self.app.app_context():
+            while True:
+                try:
+                    arquivar(self.dias, self.lote, self.pausa)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Erro no arquivamento: {str(e)}")
+                finally:
+                    db.session.remove()
+                time.sleep(self.intervalo)
+
+
+def criar_arquivador(app):
+    return ArquivadorPeriodico(
+        app,
+        dias=int(os.getenv('ARQUIVAMENTO_DIAS', '90')),
+        lote=int(os.getenv('ARQUIVAMENTO_LOTE', '500')),
+        pausa=float(os.getenv('ARQUIVAMENTO_PAUSA', '0.5')),
+        intervalo=float(os.getenv('ARQUIVAMENTO_INTERVALO', '3600'))
+    )
+
+
+def init_app(app):
+    """
+    Registra o comando `flask arquivar`. Com ARQUIVAMENTO_ATIVO=1 o
+    arquivamento também roda periodicamente dentro do processo web
+    (indicado apenas com um único worker).
+    """
+    @app.cli.command('arquivar')
+    @click.option('--dias', type=click.IntRange(min=1), default=lambda: int(os.getenv('ARQUIVAMENTO_DIAS', '90')),
+                  help='idade mínima, em dias desde a finalização')
+    @click.option('--lote', type=int, default=lambda: int(os.getenv('ARQUIVAMENTO_LOTE', '500')))
+    @click.option('--pausa', type=float, default=lambda: float(os.getenv('ARQUIVAMENTO_PAUSA', '0.5')),
+                  help='segundos entre lotes')
+    @click.option('--maximo', type=int, help='para depois de arquivar este número de atendimentos')
+    @click.option('--continuo', is_flag=True, help='repete a cada ARQUIVAMENTO_INTERVALO segundos')
+    def arquivar_comando(dias, lote, pausa, maximo, continuo):
+        """Move atendimentos finalizados antigos e suas mensagens para o arquivo"""
+        if continuo:
+            arquivador = criar_arquivador(app)
+            arquivador.dias, arquivador.lote, arquivador.pausa = dias, lote, pausa
+            click.echo(f'Arquivador iniciado (finalizados há mais de {dias} dias)')
+            arquivador.executar()
+            return
+        atendimentos, mensagens = arquivar(dias, lote, pausa, maximo)
+        click.echo(f'{atendimentos} atendimento(s) e {mensagens} mensagem(ns) arquivados')
+
+    if os.getenv('ARQUIVAMENTO_ATIVO') == '1':
+        app.before_request(criar_arquivador(app).iniciar)
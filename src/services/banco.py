@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from src.models.user import db
+
+
+class MetricasPool:
+    """Contadores do pool de conexões deste processo (cada worker tem os seus)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.zerar()
+
+    def zerar(self):
+        with self._lock:
+            self.checkouts = 0
+            self.espera_total = 0.0
+            self.espera_maxima = 0.0
+            self.timeouts = 0
+            self.conexoes_abertas = 0
+            self.invalidadas = 0
+
+    def registrar_checkout(self, espera):
+        with self._lock:
+            self.checkouts += 1
+            self.espera_total += espera
+            self.espera_maxima = max(self.espera_maxima, espera)
+
+    def registrar_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def registrar_conexao(self):
+        with self._lock:
+            self.conexoes_abertas += 1
+
+    def registrar_invalidacao(self):
+        with self._lock:
+            self.invalidadas += 1
+
+    def totais(self):
+        """Contadores brutos (espera em segundos), para o /api/metrics"""
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'espera_segundos': self.espera_total,
+                'timeouts': self.timeouts,
+                'conexoes_abertas': self.conexoes_abertas,
+                'conexoes_invalidadas': self.invalidadas
+            }
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'espera_media_ms': round(self.espera_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'espera_maxima_ms': round(self.espera_maxima * 1000, 3),
+                'timeouts': self.timeouts,
+                'conexoes_abertas': self.conexoes_abertas,
+                'conexoes_invalidadas': self.invalidadas
+            }
+
+
+metricas = MetricasPool()
+
+
+class QueuePoolMedido(QueuePool):
+    """QueuePool que mede quanto cada checkout esperou por uma conexão"""
+
+    def connect(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = super().connect()
+        except exc.TimeoutError:
+            metricas.registrar_timeout()
+            raise
+        metricas.registrar_checkout(time.perf_counter() - inicio)
+        return conexao
+
+
+def opcoes_engine(url):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS a partir do ambiente. O padrão acompanha o
+    Procfile (gthread com 32 threads): até 30 conexões por worker. Conexões
+    são testadas antes do uso (pre-ping) e recicladas antes do wait_timeout
+    do MySQL ou de proxies derrubarem conexões ociosas.
+
+    BANCO_POOL_TAMANHO (10), BANCO_POOL_EXCEDENTE (20), BANCO_POOL_TIMEOUT
+    (10 s de espera por conexão), BANCO_POOL_RECICLAR (280 s),
+    BANCO_PRE_PING (1) e BANCO_TIMEOUT_CONSULTA_MS (0 = sem limite).
+    """
+    if not url:
+        return {}
+    url = make_url(url)
+    dialeto = url.get_backend_name()
+    if dialeto == 'sqlite' and url.database in (None, '', ':memory:'):
+        # Banco em memória usa um pool próprio, sem tamanho configurável
+        return {}
+
+    opcoes = {
+        'poolclass': QueuePoolMedido,
+        'pool_size': int(os.getenv('BANCO_POOL_TAMANHO', '10')),
+        'max_overflow': int(os.getenv('BANCO_POOL_EXCEDENTE', '20')),
+        'pool_timeout': float(os.getenv('BANCO_POOL_TIMEOUT', '10')),
+        'pool_recycle': int(os.getenv('BANCO_POOL_RECICLAR', '280')),
+        'pool_pre_ping': os.getenv('BANCO_PRE_PING', '1') == '1',
+    }
+
+    timeout_consulta = int(os.getenv('BANCO_TIMEOUT_CONSULTA_MS', '0'))
+    if timeout_consulta:
+        if dialeto == 'mysql':
+            # Vale para SELECTs; escritas seguem limitadas pelos locks do InnoDB
+            opcoes['connect_args'] = {'init_command': f'SET SESSION max_execution_time={timeout_consulta}'}
+        elif dialeto == 'postgresql':
+            opcoes['connect_args'] = {'options': f'-c statement_timeout={timeout_consulta}'}
+    return opcoes
+
+
+def estado_pool():
+    """Ocupação atual do pool e os contadores acumulados deste processo"""
+    pool = db.engine.pool
+    estado = {'pid': os.getpid(), 'classe': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        estado.update({
+            'tamanho': pool.size(),
+            'em_uso': pool.checkedout(),
+            'ociosas': pool.checkedin(),
+            'excedente': max(pool.overflow(), 0),
+        })
+    estado.update(metricas.to_dict())
+    return estado
+
+
+def verificar():
+    """SELECT 1 com o tempo de resposta; lança a exceção do banco se falhar"""
+    inicio = time.perf_counter()
+    with db.engine.connect() as conexao:
+        conexao.execute(text('SELECT 1'))
+    return round((time.perf_counter() - inicio) * 1000, 3)
+
+
+def init_app(app):
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'connect')
+    def ao_conectar(conexao_dbapi, registro):
+        metricas.registrar_conexao()
+
+    @event.listens_for(engine, 'invalidate')
+    def ao_invalidar(conexao_dbapi, registro, excecao):
+        # Conexões derrubadas pelo servidor, detectadas pelo pre-ping ou por erro
+        metricas.registrar_invalidacao()
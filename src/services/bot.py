@@ -0,0 +1,180 @@
+import os
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.atendimento import Atendimento, Cliente, Mensagem, MensagemExterna
+from src.services.eventos import publicar_evento, FILA_ATUALIZADA, NOVA_MENSAGEM
+from src.services.intencoes import motor_padrao
+from src.services.config_chatbot import obter_config
+from src.services.versoes import FILA, incrementar_versao
+from src.utils.cache import CacheLRU
+
+# MessageSid já processados -> resposta enviada, para responder retentativas sem ir ao banco
+ids_processados = CacheLRU(int(os.getenv('BOT_DEDUP_TAMANHO', '100000')))
+
+
+def processar_intencao(mensagem, atendimento):
+    """Processa a intenção da mensagem e retorna resposta apropriada"""
+    config = obter_config()
+    motor = config.motor if config else motor_padrao()
+    intencao = motor.identificar(mensagem)
+    tipo = intencao.tipo if intencao else None
+
+    # Palavras-chave para transferir para atendente
+    if tipo == 'atendente':
+        return {
+            'mensagem': 'Vou transferir você para um de nossos atendentes. Por favor, aguarde um momento.',
+            'transferir_atendente': True
+        }
+
+    # Perguntas frequentes cadastradas na configuração
+    if tipo == 'faq':
+        return {
+            'mensagem': intencao.valor
+        }
+
+    # Saudações
+    if tipo == 'saudacao':
+        return {
+            'mensagem': config.mensagem_boas_vindas if config else 'Olá! Como posso ajudá-lo?',
+            'opcoes': ['Falar com atendente', 'Ver horário de atendimento', 'Dúvidas frequentes']
+        }
+
+    # Horário de atendimento
+    if tipo == 'horario':
+        horario_inicio = config.horario_inicio if config else '09:00'
+        horario_fim = config.horario_fim if config else '18:00'
+        return {
+            'mensagem': f'Nosso horário de atendimento é de {horario_inicio} às {horario_fim}, de segunda a sexta-feira.'
+        }
+
+    # Departamentos
+    if tipo == 'departamento':
+        return {
+            'mensagem': intencao.valor['mensagem'],
+            'transferir_atendente': True,
+            'departamento': intencao.valor['id']
+        }
+
+    # Resposta padrão
+    return {
+        'mensagem': 'Desculpe, não entendi sua solicitação. Você pode:\n1. Falar com um atendente\n2. Ver nosso horário de atendimento\n3. Escolher um departamento: Vendas, Suporte ou Financeiro',
+        'opcoes': ['Atendente', 'Horário', 'Vendas', 'Suporte', 'Financeiro']
+    }
+
+
+class MensagemDuplicada(Exception):
+    """A mensagem externa já foi processada; `resposta` é o que o bot respondeu na primeira vez"""
+
+    def __init__(self, resposta):
+        super().__init__('Mensagem já processada')
+        self.resposta = resposta
+
+
+def _reservar_id_externo(id_externo, canal):
+    """
+    Grava o id externo antes de qualquer outro trabalho da transação. Se
+    outra requisição (ou outro worker) já o gravou, a PK rejeita o INSERT
+    e a mensagem é tratada como duplicada.
+    """
+    registro = MensagemExterna(id_externo=id_externo, canal=canal)
+    db.session.add(registro)
+    try:
+        db.session.flush()
+        return registro
+    except IntegrityError:
+        db.session.rollback()
+        existente = db.session.get(MensagemExterna, id_externo)
+        resposta = existente.resposta if existente else None
+        if resposta is not None:
+            ids_processados.guardar(id_externo, resposta)
+        raise MensagemDuplicada(resposta)
+
+
+def registrar_mensagem(telefone, conteudo, nome='Cliente', id_externo=None, canal=None):
+    """
+    Pipeline de uma mensagem recebida pelo bot: busca ou cria o cliente e o
+    atendimento em modo bot, grava a mensagem e a resposta, transfere para
+    a fila quando pedido e publica os eventos depois do commit.
+
+    Com `id_externo`, a mensagem é processada uma única vez: repetições
+    lançam MensagemDuplicada com a resposta original, vinda do LRU em
+    memória ou, se o LRU não a conhece, da tabela mensagens_externas.
+    Retorna (atendimento, resposta).
+    """
+    if id_externo:
+        resposta_anterior = ids_processados.obter(id_externo)
+        if resposta_anterior is not None:
+            raise MensagemDuplicada(resposta_anterior)
+        registro_externo = _reservar_id_externo(id_externo, canal)
+
+    # Buscar ou criar cliente
+    cliente = Cliente.query.filter_by(telefone=telefone).first()
+    if not cliente:
+        cliente = Cliente(
+            nome=nome,
+            telefone=telefone
+        )
+        db.session.add(cliente)
+        db.session.flush()
+
+    # Buscar atendimento ativo ou criar novo
+    atendimento = Atendimento.query.filter_by(
+        cliente_id=cliente.id,
+        status='bot'
+    ).first()
+
+    if not atendimento:
+        atendimento = Atendimento(
+            cliente_id=cliente.id,
+            status='bot'
+        )
+        db.session.add(atendimento)
+        db.session.flush()
+
+    # Salvar mensagem do cliente
+    msg_cliente = Mensagem(
+        atendimento_id=atendimento.id,
+        cliente_id=cliente.id,
+        remetente='cliente',
+        conteudo=conteudo
+    )
+    db.session.add(msg_cliente)
+
+    # Processar resposta do bot
+    resposta = processar_intencao(conteudo.lower().strip(), atendimento)
+
+    # Salvar resposta do bot
+    msg_bot = Mensagem(
+        atendimento_id=atendimento.id,
+        cliente_id=cliente.id,
+        remetente='bot',
+        conteudo=resposta['mensagem']
+    )
+    db.session.add(msg_bot)
+
+    # Se solicitou atendente, mover para fila
+    if resposta.get('transferir_atendente'):
+        atendimento.status = 'fila'
+        atendimento.departamento = resposta.get('departamento')
+        incrementar_versao(FILA)
+
+    if id_externo:
+        db.session.flush()
+        registro_externo.mensagem_id = msg_cliente.id
+        registro_externo.resposta = resposta['mensagem']
+
+    db.session.commit()
+
+    if id_externo:
+        ids_processados.guardar(id_externo, resposta['mensagem'])
+
+    for msg in (msg_cliente, msg_bot):
+        publicar_evento(NOVA_MENSAGEM, {
+            'atendimento_id': atendimento.id,
+            'agente_id': atendimento.agente_id,
+            'mensagem': msg.to_dict()
+        })
+    if resposta.get('transferir_atendente'):
+        publicar_evento(FILA_ATUALIZADA, {'atendimento_id': atendimento.id})
+
+    return atendimento, resposta
@@ -0,0 +1,205 @@
+import click
+from sqlalchemy import and_, case, event, func, inspect, select, union_all
+from sqlalchemy.orm import selectinload
+from src.models.user import db
+from src.models.atendimento import Cliente, ClienteTermoBusca
+from src.utils.texto import termos_busca, somente_digitos
+from src.utils.upsert import inserir_ignorando
+
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 50
+MAX_CANDIDATOS = 200
+# Termos mais curtos só casam palavras inteiras: o prefixo 'a' varreria boa parte do índice
+PREFIXO_MINIMO = 3
+TAMANHO_TERMO = ClienteTermoBusca.termo.type.length
+CAMPOS_INDEXADOS = ('nome', 'telefone', 'email')
+
+_tabela = ClienteTermoBusca.__table__
+
+
+def termos_cliente(nome, telefone, email):
+    """Termos indexados de um cliente, como tuplas (campo, termo)"""
+    termos = {('n', t[:TAMANHO_TERMO]) for t in termos_busca(nome) + termos_busca(email)}
+    digitos = somente_digitos(telefone)
+    if digitos:
+        termos.add(('t', digitos[:TAMANHO_TERMO]))
+        termos.add(('r', digitos[::-1][:TAMANHO_TERMO]))
+    return termos
+
+
+def _linhas(cliente_id, nome, telefone, email):
+    return [
+        {'campo': campo, 'termo': termo, 'cliente_id': cliente_id}
+        for campo, termo in termos_cliente(nome, telefone, email)
+    ]
+
+
+# O índice acompanha toda escrita de Cliente feita pelo ORM, na mesma transação
+
+@event.listens_for(Cliente, 'after_insert')
+def _indexar_inserido(mapper, connection, cliente):
+    linhas = _linhas(cliente.id, cliente.nome, cliente.telefone, cliente.email)
+    if linhas:
+        connection.execute(_tabela.insert(), linhas)
+
+
+@event.listens_for(Cliente, 'after_update')
+def _indexar_atualizado(mapper, connection, cliente):
+    estado = inspect(cliente)
+    if not any(estado.attrs[campo].history.has_changes() for campo in CAMPOS_INDEXADOS):
+        return
+    connection.execute(_tabela.delete().where(_tabela.c.cliente_id == cliente.id))
+    linhas = _linhas(cliente.id, cliente.nome, cliente.telefone, cliente.email)
+    if linhas:
+        connection.execute(_tabela.insert(), linhas)
+
+
+@event.listens_for(Cliente, 'after_delete')
+def _remover_do_indice(mapper, connection, cliente):
+    connection.execute(_tabela.delete().where(_tabela.c.cliente_id == cliente.id))
+
+
+def indexar(clientes):
+    """Indexa clientes inseridos fora do ORM (bulk inserts); recebe linhas com id/nome/telefone/email"""
+    linhas = []
+    for cliente in clientes:
+        linhas.extend(_linhas(cliente.id, cliente.nome, cliente.telefone, cliente.email))
+    if linhas:
+        db.session.execute(_tabela.insert(), linhas)
+
+
+def _filtro_faixa(campo, prefixo):
+    """
+    Termos do campo começando por `prefixo`. Os termos só têm [a-z0-9],
+    então a faixa [prefixo, prefixo + 'zzz...'] equivale a um
+    LIKE 'prefixo%' e usa o índice em qualquer banco e collation.
+    """
+    limite_superior = prefixo + 'z' * (TAMANHO_TERMO - len(prefixo))
+    return and_(
+        ClienteTermoBusca.campo == campo,
+        ClienteTermoBusca.termo >= prefixo,
+        ClienteTermoBusca.termo <= limite_superior
+    )
+
+
+def _filtro_termo(campo, termo):
+    if len(termo) < PREFIXO_MINIMO:
+        return and_(ClienteTermoBusca.campo == campo, ClienteTermoBusca.termo == termo)
+    return _filtro_faixa(campo, termo)
+
+
+def _faixa(campo, prefixo, limite):
+    """Ids de clientes com algum termo começando por `prefixo`"""
+    return db.session.query(ClienteTermoBusca.cliente_id, ClienteTermoBusca.termo).filter(
+        _filtro_faixa(campo, prefixo)
+    ).order_by(ClienteTermoBusca.termo).limit(limite).all()
+
+
+def _buscar_telefone(digitos, limite):
+    pontos = {}
+    for cliente_id, termo in _faixa('t', digitos, MAX_CANDIDATOS):
+        pontos[cliente_id] = max(pontos.get(cliente_id, 0), 3 if termo == digitos else 2)
+    for cliente_id, termo in _faixa('r', digitos[::-1], MAX_CANDIDATOS):
+        pontos[cliente_id] = max(pontos.get(cliente_id, 0), 1)
+
+    melhores = sorted(pontos, key=lambda cliente_id: (-pontos[cliente_id], cliente_id))[:limite]
+    if not melhores:
+        return []
+    clientes = {c.id: c for c in Cliente.query.options(selectinload(Cliente.lista_tags)).filter(Cliente.id.in_(melhores))}
+    return [clientes[cliente_id] for cliente_id in melhores if cliente_id in clientes]
+
+
+def _buscar_texto(termos, limite):
+    # Uma faixa do índice por termo, cada uma agrupada por cliente (2 pontos
+    # se o termo é uma palavra inteira, 1 se é só prefixo); a interseção e
+    # a ordenação ficam no banco, e só os clientes do resultado são carregados.
+    # Termos curtos viram uma busca exata, sem varrer a faixa inteira
+    termos = list(dict.fromkeys(termos))
+    ramos = [
+        select(
+            ClienteTermoBusca.cliente_id,
+            func.max(case((ClienteTermoBusca.termo == termo, 2), else_=1)).label('pontos')
+        ).where(_filtro_termo('n', termo)).group_by(ClienteTermoBusca.cliente_id)
+        for termo in termos
+    ]
+    uniao = union_all(*ramos).subquery()
+    melhores = db.session.execute(
+        select(uniao.c.cliente_id).group_by(uniao.c.cliente_id).having(
+            func.count() == len(termos)
+        ).order_by(func.sum(uniao.c.pontos).desc(), uniao.c.cliente_id).limit(limite)
+    ).scalars().all()
+    if not melhores:
+        return []
+    clientes = {c.id: c for c in Cliente.query.options(selectinload(Cliente.lista_tags)).filter(Cliente.id.in_(melhores))}
+    return [clientes[cliente_id] for cliente_id in melhores if cliente_id in clientes]
+
+
+def buscar(texto, limite=LIMITE_PADRAO):
+    """
+    Busca clientes por nome, email ou telefone, ordenados por relevância.
+    Consultas só com dígitos (e pontuação de telefone) procuram pelo
+    começo ou pelo final do número; as demais casam prefixos de palavras
+    do nome e do email, sem diferenciar acentos. Termos com menos de
+    PREFIXO_MINIMO caracteres precisam ser a palavra inteira.
+    """
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+    termos = termos_busca(texto)
+    if not termos:
+        return []
+
+    digitos = somente_digitos(texto)
+    if digitos and termos == [t for t in termos if t.isdigit()]:
+        return _buscar_telefone(digitos, limite)
+    return _buscar_texto(termos, limite)
+
+
+def reindexar(lote=5000):
+    """Reconstrói o índice de busca a partir da tabela clientes"""
+    db.session.execute(_tabela.delete())
+    ultimo_id = 0
+    total = 0
+    while True:
+        clientes = db.session.query(Cliente.id, Cliente.nome, Cliente.telefone, Cliente.email).filter(
+            Cliente.id > ultimo_id
+        ).order_by(Cliente.id).limit(lote).all()
+        if not clientes:
+            break
+        indexar(clientes)
+        ultimo_id = clientes[-1].id
+        total += len(clientes)
+    db.session.commit()
+    return total
+
+
+def preencher(lote=5000):
+    """
+    Indexa os clientes que ainda não têm termos no índice (a base que já
+    existia quando a busca indexada entrou), em lotes com um commit por
+    lote. Pode ser interrompido e rodado de novo, inclusive por vários
+    processos ao mesmo tempo: termos já gravados são ignorados.
+    """
+    sem_termos = ~select(_tabela.c.cliente_id).where(_tabela.c.cliente_id == Cliente.id).exists()
+    ultimo_id = 0
+    total = 0
+    while True:
+        clientes = db.session.query(Cliente.id, Cliente.nome, Cliente.telefone, Cliente.email).filter(
+            Cliente.id > ultimo_id, sem_termos
+        ).order_by(Cliente.id).limit(lote).all()
+        if not clientes:
+            break
+        linhas = []
+        for cliente in clientes:
+            linhas.extend(_linhas(cliente.id, cliente.nome, cliente.telefone, cliente.email))
+        inserir_ignorando(_tabela, linhas, ['campo', 'termo', 'cliente_id'])
+        db.session.commit()
+        ultimo_id = clientes[-1].id
+        total += len(clientes)
+    return total
+
+
+def init_app(app):
+    @app.cli.command('reindexar-busca-clientes')
+    def reindexar_comando():
+        """Reconstrói clientes_termos_busca a partir de clientes"""
+        total = reindexar()
+        click.echo(f'{total} cliente(s) indexado(s)')
@@ -0,0 +1,232 @@
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import select
+from src.models.user import db
+from src.models.atendimento import Cliente, ClienteTag, ClienteTermoBusca, Tag
+from src.services import busca_clientes, tags
+from src.services.versoes import CLIENTES, incrementar_versao
+from src.utils.upsert import inserir_ignorando, upsert
+
+FORMATOS = ('csv', 'ndjson')
+COLUNAS_EXPORTACAO = ['id', 'nome', 'telefone', 'email', 'notas', 'tags', 'criado_em', 'ultima_interacao']
+CAMPOS_ATUALIZAVEIS = ['nome', 'email', 'notas']
+LIMITES = {
+    'telefone': Cliente.telefone.type.length,
+    'nome': Cliente.nome.type.length,
+    'email': Cliente.email.type.length,
+}
+MAX_ERROS = 1000
+SEPARADOR_TAGS = ';'
+
+
+class ResultadoImportacao:
+    """Totais de uma importação e os erros por linha (os primeiros MAX_ERROS)"""
+
+    def __init__(self):
+        self.processados = 0
+        self.inseridos = 0
+        self.atualizados = 0
+        self.ignorados = 0
+        self.total_erros = 0
+        self.erros = []
+
+    def erro(self, linha, mensagem):
+        self.total_erros += 1
+        if len(self.erros) < MAX_ERROS:
+            self.erros.append({'linha': linha, 'erro': mensagem})
+
+    def to_dict(self):
+        return {
+            'processados': self.processados,
+            'inseridos': self.inseridos,
+            'atualizados': self.atualizados,
+            'ignorados': self.ignorados,
+            'total_erros': self.total_erros,
+            'erros': self.erros
+        }
+
+
+def ler_csv(arquivo):
+    """Lê um CSV com cabeçalho, linha a linha; gera (número da linha, dict)"""
+    leitor = csv.DictReader(io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline=''))
+    for registro in leitor:
+        tags_texto = registro.get('tags')
+        if tags_texto is not None:
+            registro['tags'] = [t for t in tags_texto.split(SEPARADOR_TAGS) if t.strip()]
+        yield leitor.line_num, registro
+
+
+def ler_ndjson(arquivo):
+    """Lê um objeto JSON por linha; linhas inválidas viram erro em vez de abortar"""
+    for numero, linha in enumerate(io.TextIOWrapper(arquivo, encoding='utf-8-sig'), start=1):
+        if not linha.strip():
+            continue
+        try:
+            registro = json.loads(linha)
+        except ValueError as e:
+            yield numero, ValueError(f'JSON inválido: {e}')
+            continue
+        if not isinstance(registro, dict):
+            yield numero, ValueError('Cada linha deve ser um objeto JSON')
+            continue
+        yield numero, registro
+
+
+LEITORES = {'csv': ler_csv, 'ndjson': ler_ndjson}
+
+
+def _validar(registro):
+    """Normaliza um registro importado; lança ValueError com a mensagem do erro"""
+    if isinstance(registro, Exception):
+        raise registro
+    telefone = str(registro.get('telefone') or '').strip()
+    if not telefone:
+        raise ValueError('telefone é obrigatório')
+
+    linha = {'telefone': telefone}
+    for campo in CAMPOS_ATUALIZAVEIS:
+        valor = registro.get(campo)
+        linha[campo] = (str(valor).strip() or None) if valor is not None else None
+    for campo, limite in LIMITES.items():
+        if linha.get(campo) and len(linha[campo]) > limite:
+            raise ValueError(f'{campo} maior que {limite} caracteres')
+
+    nomes_tags = registro.get('tags') or []
+    if not isinstance(nomes_tags, list):
+        raise ValueError('tags deve ser uma lista')
+    return linha, tags.normalizar_nomes(nomes_tags)
+
+
+def _gravar_lote(lote, atualizar, resultado):
+    # A última ocorrência de cada telefone no lote prevalece
+    por_telefone = {}
+    for linha, nomes_tags in lote:
+        por_telefone[linha['telefone']] = (linha, nomes_tags)
+    telefones = list(por_telefone)
+
+    existentes = set(db.session.execute(
+        select(Cliente.telefone).where(Cliente.telefone.in_(telefones))
+    ).scalars())
+
+    agora = datetime.utcnow()
+    linhas = [dict(linha, criado_em=agora) for linha, _ in por_telefone.values()]
+    if atualizar:
+        upsert(Cliente.__table__, linhas, ['telefone'], CAMPOS_ATUALIZAVEIS)
+        resultado.atualizados += len(existentes)
+    else:
+        inserir_ignorando(Cliente.__table__, linhas, ['telefone'])
+        resultado.ignorados += len(existentes)
+    resultado.inseridos += len(telefones) - len(existentes)
+
+    # Upserts em lote não passam pelos eventos do ORM: reindexa a busca do lote
+    clientes = db.session.execute(
+        select(Cliente.id, Cliente.nome, Cliente.telefone, Cliente.email).where(Cliente.telefone.in_(telefones))
+    ).all()
+    ids = {c.telefone: c.id for c in clientes}
+    reindexar = [c for c in clientes if atualizar or c.telefone not in existentes]
+    if reindexar:
+        db.session.execute(ClienteTermoBusca.__table__.delete().where(
+            ClienteTermoBusca.cliente_id.in_([c.id for c in reindexar])
+        ))
+        busca_clientes.indexar(reindexar)
+
+    nomes = {nome for _, nomes_tags in por_telefone.values() for nome in nomes_tags}
+    if nomes:
+        tag_ids = tags.obter_ids(nomes)
+        inserir_ignorando(ClienteTag.__table__, [
+            {'tag_id': tag_ids[nome], 'cliente_id': ids[telefone]}
+            for telefone, (_, nomes_tags) in por_telefone.items()
+            for nome in nomes_tags
+            if atualizar or telefone not in existentes
+        ], ['tag_id', 'cliente_id'])
+
+    if atualizar and existentes:
+        # Clientes já cadastrados podem estar nas listagens de atendimentos
+        incrementar_versao(CLIENTES)
+    db.session.commit()
+
+
+def importar(registros, lote=1000, atualizar=True):
+    """
+    Importa clientes de um iterável de (número da linha, registro), em
+    lotes com um commit por lote. Telefones existentes são atualizados
+    (só os campos informados) ou ignorados, conforme `atualizar`; as tags
+    informadas são somadas às do cliente. Linhas inválidas entram nos
+    erros do resultado sem interromper a importação.
+    """
+    resultado = ResultadoImportacao()
+    pendentes = []
+    for numero, registro in registros:
+        resultado.processados += 1
+        try:
+            pendentes.append(_validar(registro))
+        except ValueError as e:
+            resultado.erro(numero, str(e))
+            continue
+        if len(pendentes) >= lote:
+            _gravar_lote(pendentes, atualizar, resultado)
+            pendentes = []
+    if pendentes:
+        _gravar_lote(pendentes, atualizar, resultado)
+    return resultado
+
+
+def _tags_por_cliente(cliente_ids):
+    por_cliente = {}
+    for cliente_id, nome in db.session.execute(
+        select(ClienteTag.cliente_id, Tag.nome).join(Tag, Tag.id == ClienteTag.tag_id)
+        .where(ClienteTag.cliente_id.in_(cliente_ids)).order_by(Tag.nome)
+    ):
+        por_cliente.setdefault(cliente_id, []).append(nome)
+    return por_cliente
+
+
+def exportar(formato, lote=1000):
+    """
+    Gera o export de clientes em pedaços de texto (CSV ou NDJSON). Pagina
+    por id (id > último, LIMIT lote) com consultas comuns, sem cursor no
+    servidor: com PyMySQL, a consulta das tags descartaria um resultado
+    não bufferizado aberto na mesma conexão. A memória é a de um lote.
+    """
+    consulta = select(
+        Cliente.id, Cliente.nome, Cliente.telefone, Cliente.email, Cliente.notas,
+        Cliente.criado_em, Cliente.ultima_interacao
+    ).order_by(Cliente.id).limit(lote)
+
+    saida = io.StringIO()
+    escritor = csv.writer(saida)
+    if formato == 'csv':
+        escritor.writerow(COLUNAS_EXPORTACAO)
+
+    ultimo_id = 0
+    while True:
+        linhas = db.session.execute(consulta.where(Cliente.id > ultimo_id)).all()
+        if not linhas:
+            break
+        ultimo_id = linhas[-1].id
+        tags_lote = _tags_por_cliente([l.id for l in linhas])
+        for l in linhas:
+            registro = {
+                'id': l.id,
+                'nome': l.nome,
+                'telefone': l.telefone,
+                'email': l.email,
+                'notas': l.notas,
+                'tags': tags_lote.get(l.id, []),
+                'criado_em': l.criado_em.isoformat() if l.criado_em else None,
+                'ultima_interacao': l.ultima_interacao.isoformat() if l.ultima_interacao else None
+            }
+            if formato == 'csv':
+                registro['tags'] = SEPARADOR_TAGS.join(registro['tags'])
+                escritor.writerow([registro[c] for c in COLUNAS_EXPORTACAO])
+            else:
+                saida.write(json.dumps(registro, ensure_ascii=False))
+                saida.write('\n')
+        yield saida.getvalue()
+        saida.seek(0)
+        saida.truncate()
+
+    if saida.tell():
+        yield saida.getvalue()
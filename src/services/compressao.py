@@ -0,0 +1,92 @@
+import os
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele, só gzip
+    brotli = None
+
+TIPOS_COMPRIMIVEIS = {
+    'application/json', 'application/x-ndjson', 'application/javascript', 'text/javascript',
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'image/svg+xml'
+}
+
+
+def _comprimir_partes(partes, codificacao, nivel_gzip, nivel_brotli):
+    """Comprime um iterável de partes (bytes ou str), devolvendo as partes comprimidas"""
+    if codificacao == 'br':
+        compressor = brotli.Compressor(quality=nivel_brotli)
+        comprimir, finalizar = compressor.process, compressor.finish
+    else:
+        # wbits=31: formato gzip (cabeçalho e CRC), não zlib cru
+        compressor = zlib.compressobj(nivel_gzip, zlib.DEFLATED, 31)
+        comprimir, finalizar = compressor.compress, compressor.flush
+    try:
+        for parte in partes:
+            dados = comprimir(parte.encode('utf-8') if isinstance(parte, str) else parte)
+            if dados:
+                yield dados
+        yield finalizar()
+    finally:
+        # Repassa o fechamento ao iterável original (stream_with_context libera o contexto)
+        if hasattr(partes, 'close'):
+            partes.close()
+
+
+class Compressao:
+    """
+    Comprime respostas de texto/JSON com brotli (se instalado) ou gzip,
+    conforme o Accept-Encoding. Respostas com corpo conhecido só são
+    comprimidas a partir de `minimo` bytes; respostas em streaming são
+    comprimidas parte a parte. SSE (text/event-stream) e arquivos
+    enviados com send_file ficam de fora.
+    """
+
+    def __init__(self, minimo=1024, nivel_gzip=6, nivel_brotli=5):
+        self.minimo = minimo
+        self.nivel_gzip = nivel_gzip
+        self.nivel_brotli = nivel_brotli
+        self.codificacoes = (['br'] if brotli is not None else []) + ['gzip']
+
+    def escolher(self, resposta):
+        """Codificação a usar nesta resposta, ou None"""
+        if resposta.status_code < 200 or resposta.status_code in (204, 206, 304) or resposta.direct_passthrough:
+            return None
+        if resposta.mimetype not in TIPOS_COMPRIMIVEIS or 'Content-Encoding' in resposta.headers:
+            return None
+        resposta.vary.add('Accept-Encoding')
+        return request.accept_encodings.best_match(self.codificacoes)
+
+    def aplicar(self, resposta):
+        codificacao = self.escolher(resposta)
+        if codificacao is None:
+            return resposta
+
+        if resposta.is_streamed:
+            resposta.response = _comprimir_partes(resposta.response, codificacao, self.nivel_gzip, self.nivel_brotli)
+            resposta.headers.pop('Content-Length', None)
+        else:
+            corpo = resposta.get_data()
+            if len(corpo) < self.minimo:
+                return resposta
+            resposta.set_data(b''.join(_comprimir_partes([corpo], codificacao, self.nivel_gzip, self.nivel_brotli)))
+
+        resposta.headers['Content-Encoding'] = codificacao
+        # O corpo mudou byte a byte: um ETag forte deixaria de valer
+        etag, fraco = resposta.get_etag()
+        if etag and not fraco:
+            resposta.set_etag(etag, weak=True)
+        return resposta
+
+
+def init_app(app):
+    """COMPRESSAO_ATIVA (1), COMPRESSAO_MINIMO (1024 bytes), COMPRESSAO_NIVEL_GZIP (6) e COMPRESSAO_NIVEL_BROTLI (5)"""
+    if os.getenv('COMPRESSAO_ATIVA', '1') != '1':
+        return
+    compressao = Compressao(
+        minimo=int(os.getenv('COMPRESSAO_MINIMO', '1024')),
+        nivel_gzip=int(os.getenv('COMPRESSAO_NIVEL_GZIP', '6')),
+        nivel_brotli=int(os.getenv('COMPRESSAO_NIVEL_BROTLI', '5'))
+    )
+    app.after_request(compressao.aplicar)
@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+from src.models.atendimento import ConfiguracaoChatbot
+from src.services.intencoes import MotorIntencoes, carregar_json
+from src.services.versoes import obter_versao
+
+RECURSO = 'chatbot_config'
+
+
+class ConfigChatbot:
+    """Cópia somente leitura da configuração do chatbot, com os JSON já convertidos"""
+
+    def __init__(self, config, versao):
+        self.versao = versao
+        self._dados = config.to_dict()
+
+        self.id = config.id
+        self.ativo = config.ativo
+        self.mensagem_boas_vindas = config.mensagem_boas_vindas
+        self.mensagem_fora_horario = config.mensagem_fora_horario
+        self.horario_inicio = config.horario_inicio
+        self.horario_fim = config.horario_fim
+        self.timeout_inatividade = config.timeout_inatividade
+        self.max_tentativas_bot = config.max_tentativas_bot
+        self.dias_semana = carregar_json(config.dias_semana)
+        self.departamentos = carregar_json(config.departamentos)
+        self.perguntas_frequentes = carregar_json(config.perguntas_frequentes)
+
+        self._motor = None
+        self._lock = threading.Lock()
+
+    @property
+    def motor(self):
+        """Motor de intenções compilado uma única vez por versão da configuração"""
+        if self._motor is None:
+            with self._lock:
+                if self._motor is None:
+                    self._motor = MotorIntencoes(self.departamentos, self.perguntas_frequentes)
+        return self._motor
+
+    def to_dict(self):
+        return dict(self._dados)
+
+
+class CacheConfigChatbot:
+    """
+    Mantém a configuração do chatbot em memória. A cada `ttl` segundos
+    confere a versão em `versoes_recurso` (uma consulta pequena) e só relê
+    a configuração quando outro worker a alterou.
+    """
+
+    def __init__(self, ttl=5.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._config = None
+        self._carregada = False
+        self._versao = None
+        self._validade = 0.0
+
+    def obter(self):
+        """Retorna o ConfigChatbot atual, ou None se ainda não existe configuração"""
+        if self._carregada and time.monotonic() < self._validade:
+            return self._config
+
+        with self._lock:
+            if self._carregada and time.monotonic() < self._validade:
+                return self._config
+
+            versao = obter_versao(RECURSO)
+            if not self._carregada or versao != self._versao:
+                config = ConfiguracaoChatbot.query.first()
+                self._config = ConfigChatbot(config, versao) if config else None
+                self._versao = versao
+                self._carregada = True
+
+            self._validade = time.monotonic() + self.ttl
+            return self._config
+
+    def invalidar(self):
+        with self._lock:
+            self._carregada = False
+            self._validade = 0.0
+
+
+cache_config = CacheConfigChatbot(ttl=float(os.getenv('CHATBOT_CONFIG_TTL', '5')))
+
+
+def obter_config():
+    return cache_config.obter()
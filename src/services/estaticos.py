@@ -0,0 +1,184 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import click
+from flask import Response, request, send_file
+from werkzeug.utils import get_content_type
+from src.services.compressao import TIPOS_COMPRIMIVEIS, brotli
+
+# Saída do Vite: assets/<nome>-<hash>.<ext>; o nome muda a cada build, então o conteúdo nunca muda
+ASSET_COM_HASH = re.compile(r'^assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$')
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+CACHE_REVALIDAR = 'no-cache'
+EXTENSOES_VARIANTES = {'.br': 'br', '.gz': 'gzip'}
+MINIMO_COMPRESSAO = 1024
+LIMITE_MEMORIA = 4 * 1024 * 1024
+
+
+class Variante:
+    """Uma representação do arquivo (original, gzip ou brotli), pronta para responder"""
+
+    def __init__(self, corpo, etag, cabecalhos):
+        self.corpo = corpo
+        self.etag = etag
+        self.cabecalhos = cabecalhos
+
+
+class Arquivo:
+    def __init__(self, caminho, relativo, corpo, variantes_disco):
+        self.caminho = caminho
+        self.tamanho = len(corpo) if corpo is not None else os.path.getsize(caminho)
+        mimetype = mimetypes.guess_type(relativo)[0] or 'application/octet-stream'
+        self.tipo = get_content_type(mimetype, 'utf-8')
+        self.imutavel = bool(ASSET_COM_HASH.match(relativo))
+        self.em_memoria = corpo is not None
+        self.variantes = {}
+
+        if not self.em_memoria:
+            return
+        resumo = hashlib.blake2b(corpo, digest_size=10).hexdigest()
+        comprimivel = mimetype in TIPOS_COMPRIMIVEIS and self.tamanho >= MINIMO_COMPRESSAO
+        cabecalhos = {
+            'Content-Type': self.tipo,
+            'Cache-Control': CACHE_IMUTAVEL if self.imutavel else CACHE_REVALIDAR,
+        }
+        if comprimivel:
+            cabecalhos['Vary'] = 'Accept-Encoding'
+        self.variantes[None] = Variante(corpo, resumo, cabecalhos)
+        if not comprimivel:
+            return
+
+        comprimidos = dict(variantes_disco)
+        if 'gzip' not in comprimidos:
+            # Sem o .gz do build, comprime uma vez aqui; o .br só vem de `flask comprimir-estaticos`
+            comprimidos['gzip'] = gzip.compress(corpo, compresslevel=9, mtime=0)
+        for codificacao, dados in comprimidos.items():
+            # Compressão que não ganha nada não vale o Content-Encoding
+            if len(dados) < self.tamanho:
+                self.variantes[codificacao] = Variante(
+                    dados, f'{resumo}-{codificacao}', dict(cabecalhos, **{'Content-Encoding': codificacao})
+                )
+
+    def responder(self):
+        if not self.em_memoria:
+            resposta = send_file(self.caminho, mimetype=self.tipo, conditional=True, etag=True)
+            resposta.headers['Cache-Control'] = CACHE_IMUTAVEL if self.imutavel else CACHE_REVALIDAR
+            return resposta
+
+        codificacao = None
+        if len(self.variantes) > 1:
+            codificacao = request.accept_encodings.best_match([c for c in ('br', 'gzip') if c in self.variantes])
+        variante = self.variantes[codificacao]
+
+        if request.if_none_match.contains(variante.etag):
+            resposta = Response(status=304, headers=variante.cabecalhos)
+            # 304 não leva corpo: tipo e codificação ficam com a resposta que o navegador já tem
+            resposta.headers.pop('Content-Type', None)
+            resposta.headers.pop('Content-Encoding', None)
+        else:
+            resposta = Response(variante.corpo, headers=variante.cabecalhos)
+        resposta.set_etag(variante.etag)
+        return resposta
+
+
+class Manifesto:
+    """
+    Índice em memória da pasta estática, montado uma vez na inicialização:
+    nenhuma requisição consulta o disco. Arquivos até LIMITE_MEMORIA ficam
+    em memória com as variantes comprimidas (.gz/.br do build ou gzip feito
+    aqui). Um build novo só aparece depois de reiniciar os workers.
+    """
+
+    def __init__(self):
+        self.arquivos = {}
+        self.diretorio = None
+
+    def carregar(self, diretorio):
+        self.diretorio = diretorio
+        arquivos = {}
+        if diretorio and os.path.isdir(diretorio):
+            for relativo, caminho in _listar(diretorio):
+                raiz, extensao = os.path.splitext(relativo)
+                if extensao in EXTENSOES_VARIANTES and os.path.isfile(os.path.join(diretorio, raiz)):
+                    continue
+                arquivos[relativo] = _ler(caminho, relativo)
+        self.arquivos = arquivos
+
+    def obter(self, caminho):
+        return self.arquivos.get(caminho)
+
+
+def _listar(diretorio):
+    for pasta, _, nomes in os.walk(diretorio):
+        for nome in nomes:
+            caminho = os.path.join(pasta, nome)
+            yield os.path.relpath(caminho, diretorio).replace(os.sep, '/'), caminho
+
+
+def _ler(caminho, relativo):
+    if os.path.getsize(caminho) > LIMITE_MEMORIA:
+        return Arquivo(caminho, relativo, None, {})
+    with open(caminho, 'rb') as arquivo:
+        corpo = arquivo.read()
+    variantes = {}
+    for extensao, codificacao in EXTENSOES_VARIANTES.items():
+        if os.path.isfile(caminho + extensao):
+            with open(caminho + extensao, 'rb') as arquivo:
+                variantes[codificacao] = arquivo.read()
+    return Arquivo(caminho, relativo, corpo, variantes)
+
+
+manifesto = Manifesto()
+
+
+def servir(caminho):
+    """
+    Responde um arquivo do build. Caminhos desconhecidos recebem o
+    index.html (rotas do SPA), exceto dentro de assets/: um bundle que
+    não existe é 404, e não HTML guardado no lugar do JS.
+    """
+    if manifesto.diretorio is None:
+        return "Static folder not configured", 404
+
+    arquivo = manifesto.obter(caminho) if caminho else None
+    if arquivo is None:
+        if caminho.startswith('assets/'):
+            return "Arquivo não encontrado", 404
+        arquivo = manifesto.obter('index.html')
+        if arquivo is None:
+            return "index.html not found", 404
+    return arquivo.responder()
+
+
+def comprimir(diretorio, minimo=MINIMO_COMPRESSAO):
+    """Grava .gz (e .br, se brotli estiver instalado) ao lado dos arquivos comprimíveis"""
+    gravados = 0
+    for relativo, caminho in list(_listar(diretorio)):
+        if os.path.splitext(relativo)[1] in EXTENSOES_VARIANTES:
+            continue
+        if mimetypes.guess_type(relativo)[0] not in TIPOS_COMPRIMIVEIS or os.path.getsize(caminho) < minimo:
+            continue
+        with open(caminho, 'rb') as arquivo:
+            corpo = arquivo.read()
+        saidas = {'.gz': gzip.compress(corpo, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            saidas['.br'] = brotli.compress(corpo, quality=11)
+        for extensao, dados in saidas.items():
+            with open(caminho + extensao, 'wb') as arquivo:
+                arquivo.write(dados)
+            gravados += 1
+    return gravados
+
+
+def init_app(app):
+    manifesto.carregar(app.static_folder)
+
+    @app.cli.command('comprimir-estaticos')
+    def comprimir_estaticos_comando():
+        """Pré-comprime o build do frontend (.gz e, com brotli, .br) para os workers servirem direto"""
+        if not app.static_folder or not os.path.isdir(app.static_folder):
+            raise click.ClickException('Pasta estática não encontrada')
+        gravados = comprimir(app.static_folder)
+        click.echo(f'{gravados} arquivo(s) comprimido(s) em {app.static_folder}')
@@ -0,0 +1,70 @@
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import func, case
+from src.models.user import db
+from src.models.atendimento import Atendimento, Agente, TotalArquivado
+from src.utils.cache import CacheTTL
+
+cache_estatisticas = CacheTTL(ttl=float(os.getenv('ESTATISTICAS_TTL', '5')))
+
+
+def consulta_por_status():
+    """Contagem por status e somas condicionais das últimas 24h, agrupadas por status"""
+    ontem = datetime.utcnow() - timedelta(days=1)
+    recente = Atendimento.iniciado_em >= ontem
+    espera_recente = case((recente, Atendimento.tempo_espera))
+    duracao_recente = case((recente, Atendimento.tempo_atendimento))
+
+    return db.session.query(
+        Atendimento.status,
+        func.count(Atendimento.id),
+        func.sum(espera_recente),
+        func.count(espera_recente),
+        func.sum(duracao_recente),
+        func.count(duracao_recente)
+    ).group_by(Atendimento.status)
+
+
+def calcular_estatisticas():
+    """
+    Calcula as estatísticas gerais com uma única varredura de atendimentos
+    (só a tabela quente; o arquivo entra pelos totais arquivados):
+    contagem por status via GROUP BY e somas condicionais para as médias
+    das últimas 24h, combinadas aqui por grupo.
+    """
+    linhas = consulta_por_status().all()
+
+    contagens = {}
+    soma_espera = total_espera = soma_duracao = total_duracao = 0
+    for status, total, s_espera, n_espera, s_duracao, n_duracao in linhas:
+        contagens[status] = total
+        soma_espera += s_espera or 0
+        total_espera += n_espera or 0
+        soma_duracao += s_duracao or 0
+        total_duracao += n_duracao or 0
+
+    # Arquivados contam nos totais por um contador, sem varrer o arquivo;
+    # as médias das últimas 24h nunca incluem atendimentos arquivados
+    for status, total in db.session.query(TotalArquivado.status, TotalArquivado.total):
+        contagens[status] = contagens.get(status, 0) + total
+
+    agentes_total, agentes_online = db.session.query(
+        func.count(Agente.id),
+        func.sum(case((Agente.status == 'online', 1), else_=0))
+    ).one()
+
+    return {
+        'total_atendimentos': sum(contagens.values()),
+        'em_fila': contagens.get('fila', 0),
+        'em_atendimento': contagens.get('em_atendimento', 0),
+        'finalizados': contagens.get('finalizado', 0),
+        'agentes_online': int(agentes_online or 0),
+        'agentes_total': agentes_total,
+        'tempo_medio_espera': int(soma_espera / total_espera) if total_espera else 0,
+        'tempo_medio_atendimento': int(soma_duracao / total_duracao) if total_duracao else 0
+    }
+
+
+def obter_estatisticas():
+    """Estatísticas compartilhadas por todos os chamadores durante o TTL"""
+    return cache_estatisticas.obter('geral', calcular_estatisticas)
@@ -0,0 +1,160 @@
+from datetime import date
+import click
+from sqlalchemy import func, case
+from src.models.user import db
+from src.models.atendimento import Agente, Atendimento, AtendimentoArquivado, EstatisticaAgente, EstatisticaAgenteDiaria
+from src.services.versoes import AGENTES, incrementar_versao
+from src.utils.upsert import inserir_ignorando
+
+CONTADORES = (
+    'atendimentos_finalizados',
+    'soma_tempo_atendimento',
+    'total_tempo_atendimento',
+    'soma_avaliacoes',
+    'total_avaliacoes'
+)
+
+
+def contribuicao(atendimento):
+    """
+    Quanto um atendimento soma nos totais do agente, ou None se ele não
+    conta (não finalizado ou sem agente). Tempos e avaliações vazios ou
+    zerados ficam fora das médias, como no cálculo original.
+    """
+    if atendimento.status != 'finalizado' or not atendimento.agente_id or not atendimento.finalizado_em:
+        return None
+    return {
+        'agente_id': atendimento.agente_id,
+        'dia': atendimento.finalizado_em.date(),
+        'valores': {
+            'atendimentos_finalizados': 1,
+            'soma_tempo_atendimento': atendimento.tempo_atendimento or 0,
+            'total_tempo_atendimento': 1 if atendimento.tempo_atendimento else 0,
+            'soma_avaliacoes': atendimento.avaliacao or 0,
+            'total_avaliacoes': 1 if atendimento.avaliacao else 0
+        }
+    }
+
+
+def _incrementar(modelo, chave, valores, sinal):
+    incrementos = {
+        getattr(modelo, campo): getattr(modelo, campo) + sinal * valor
+        for campo, valor in valores.items()
+    }
+    atualizados = modelo.query.filter_by(**chave).update(incrementos, synchronize_session=False)
+    if not atualizados:
+        # Primeira finalização do agente (ou do dia): duas transações podem chegar
+        # aqui juntas, então a linha zerada é criada sem conflito e o UPDATE repete
+        inserir_ignorando(modelo.__table__, [{**chave, **{campo: 0 for campo in CONTADORES}}], list(chave))
+        modelo.query.filter_by(**chave).update(incrementos, synchronize_session=False)
+
+
+def aplicar(anterior, atual):
+    """
+    Atualiza os totais na transação atual, trocando a contribuição anterior
+    do atendimento pela atual. Deve ser chamado antes do commit.
+    """
+    agentes = set()
+    for item, sinal in ((anterior, -1), (atual, 1)):
+        if item is None:
+            continue
+        _incrementar(EstatisticaAgente, {'agente_id': item['agente_id']}, item['valores'], sinal)
+        _incrementar(EstatisticaAgenteDiaria, {'agente_id': item['agente_id'], 'dia': item['dia']}, item['valores'], sinal)
+        agentes.add(item['agente_id'])
+
+    for agente_id in agentes:
+        _atualizar_avaliacao_media(agente_id)
+
+
+def _atualizar_avaliacao_media(agente_id):
+    soma, total = db.session.query(
+        EstatisticaAgente.soma_avaliacoes, EstatisticaAgente.total_avaliacoes
+    ).filter_by(agente_id=agente_id).one()
+    Agente.query.filter_by(id=agente_id).update({
+        Agente.avaliacao_media: round(soma / total, 2) if total else 0.0
+    }, synchronize_session=False)
+
+
+def obter(agente_id):
+    """Totais do agente em O(1); agentes sem finalizações retornam zeros"""
+    estatistica = db.session.get(EstatisticaAgente, agente_id)
+    return estatistica or EstatisticaAgente(agente_id=agente_id, **{campo: 0 for campo in CONTADORES})
+
+
+def obter_diarias(agente_id, desde):
+    return EstatisticaAgenteDiaria.query.filter(
+        EstatisticaAgenteDiaria.agente_id == agente_id,
+        EstatisticaAgenteDiaria.dia >= desde
+    ).order_by(EstatisticaAgenteDiaria.dia).all()
+
+
+def _consulta_historico(modelo, agente_id=None):
+    dia = func.date(modelo.finalizado_em)
+    query = db.session.query(
+        modelo.agente_id,
+        dia,
+        func.count(modelo.id),
+        func.coalesce(func.sum(modelo.tempo_atendimento), 0),
+        func.count(case((modelo.tempo_atendimento > 0, 1))),
+        func.coalesce(func.sum(modelo.avaliacao), 0),
+        func.count(case((modelo.avaliacao > 0, 1)))
+    ).filter(
+        modelo.status == 'finalizado',
+        modelo.agente_id.isnot(None),
+        modelo.finalizado_em.isnot(None)
+    ).group_by(modelo.agente_id, dia)
+    if agente_id is not None:
+        query = query.filter(modelo.agente_id == agente_id)
+    return query
+
+
+def recalcular(agente_id=None):
+    """Reconstrói os totais a partir do histórico de atendimentos finalizados, inclusive os arquivados"""
+    if agente_id is not None:
+        EstatisticaAgente.query.filter_by(agente_id=agente_id).delete()
+        EstatisticaAgenteDiaria.query.filter_by(agente_id=agente_id).delete()
+    else:
+        EstatisticaAgente.query.delete()
+        EstatisticaAgenteDiaria.query.delete()
+
+    totais = {}
+    diarias = {}
+    for modelo in (Atendimento, AtendimentoArquivado):
+        for linha in _consulta_historico(modelo, agente_id).yield_per(1000):
+            agente, dia_valor, *valores = linha
+            valores = dict(zip(CONTADORES, (int(v) for v in valores)))
+            if isinstance(dia_valor, str):
+                # SQLite devolve date() como texto
+                dia_valor = date.fromisoformat(dia_valor)
+            # Um mesmo dia pode ter atendimentos quentes e arquivados
+            diaria = diarias.setdefault((agente, dia_valor), {'agente_id': agente, 'dia': dia_valor, **dict.fromkeys(CONTADORES, 0)})
+            acumulado = totais.setdefault(agente, dict.fromkeys(CONTADORES, 0))
+            for campo, valor in valores.items():
+                diaria[campo] += valor
+                acumulado[campo] += valor
+
+    if diarias:
+        db.session.execute(EstatisticaAgenteDiaria.__table__.insert(), list(diarias.values()))
+    if totais:
+        db.session.execute(EstatisticaAgente.__table__.insert(), [
+            {'agente_id': agente, **valores} for agente, valores in totais.items()
+        ])
+
+    agentes = [agente_id] if agente_id is not None else [a.id for a in db.session.query(Agente.id)]
+    for agente in agentes:
+        valores = totais.get(agente)
+        media = round(valores['soma_avaliacoes'] / valores['total_avaliacoes'], 2) if valores and valores['total_avaliacoes'] else 0.0
+        Agente.query.filter_by(id=agente).update({Agente.avaliacao_media: media}, synchronize_session=False)
+
+    incrementar_versao(AGENTES)
+    db.session.commit()
+    return len(totais)
+
+
+def init_app(app):
+    @app.cli.command('recalcular-estatisticas-agentes')
+    @click.option('--agente-id', type=int, default=None, help='Recalcula apenas um agente')
+    def recalcular_comando(agente_id):
+        """Reconstrói estatisticas_agente a partir do histórico"""
+        total = recalcular(agente_id)
+        click.echo(f'Estatísticas recalculadas para {total} agente(s)')
@@ -0,0 +1,207 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_
+from src.models.user import db
+from src.models.atendimento import Evento
+from src.utils.serializacao import dumps
+
+# Tipos de evento publicados pelas rotas
+FILA_ATUALIZADA = 'fila_atualizada'
+NOVA_MENSAGEM = 'nova_mensagem'
+ATENDIMENTO_ATRIBUIDO = 'atendimento_atribuido'
+ATENDIMENTO_FINALIZADO = 'atendimento_finalizado'
+
+# Ids pulados acompanhados por evento lido (BarramentoBanco)
+MAX_LACUNAS = 1000
+
+
+class LimiteAssinantes(Exception):
+    """Todas as vagas de stream deste worker estão ocupadas"""
+
+
+class BarramentoMemoria:
+    """
+    Pub/sub em memória. Entrega os eventos a todas as conexões SSE abertas
+    neste processo e guarda um pequeno histórico para reconexões.
+    Cada conexão SSE ocupa uma thread do worker enquanto estiver aberta,
+    então no máximo `max_assinantes` são aceitas; as demais recebem
+    LimiteAssinantes e o navegador cai para o polling.
+    """
+
+    def __init__(self, historico=256, tamanho_fila=100, max_assinantes=16):
+        self._lock = threading.Lock()
+        self._assinantes = set()
+        self._historico = deque(maxlen=historico)
+        self._tamanho_fila = tamanho_fila
+        self.max_assinantes = max_assinantes
+        self._proximo_id = 1
+
+    def publicar(self, tipo, dados):
+        with self._lock:
+            evento = {'id': self._proximo_id, 'tipo': tipo, 'dados': dados}
+            self._proximo_id += 1
+        self._distribuir(evento)
+
+    def _distribuir(self, evento):
+        with self._lock:
+            self._historico.append(evento)
+            assinantes = list(self._assinantes)
+
+        for fila in assinantes:
+            try:
+                fila.put_nowait(evento)
+            except queue.Full:
+                # Cliente lento: descarta em vez de travar quem publica
+                pass
+
+    def assinar(self, ultimo_id=None):
+        """Registra uma nova conexão e retorna a fila que receberá os eventos"""
+        fila = queue.Queue(maxsize=self._tamanho_fila)
+        with self._lock:
+            if len(self._assinantes) >= self.max_assinantes:
+                raise LimiteAssinantes()
+            if ultimo_id is not None:
+                pendentes = [e for e in self._historico if e['id'] > ultimo_id]
+                for evento in pendentes[-self._tamanho_fila:]:
+                    fila.put_nowait(evento)
+            self._assinantes.add(fila)
+        return fila
+
+    def cancelar(self, fila):
+        with self._lock:
+            self._assinantes.discard(fila)
+
+
+class BarramentoBanco(BarramentoMemoria):
+    """
+    Pub/sub compartilhado entre workers do gunicorn usando a tabela `eventos`.
+    Cada worker mantém uma única thread que lê os eventos novos e os repassa
+    às conexões locais, independente de quantos navegadores estão abertos.
+
+    Com escritores concorrentes, um id menor pode ser commitado depois de
+    um maior já lido. Os ids pulados ficam como lacunas e são procurados
+    de novo em cada leitura por até `espera_lacuna` segundos, em vez de
+    ficarem para trás do id mais alto já lido.
+    """
+
+    def __init__(self, app, intervalo=1.0, retencao=600, espera_lacuna=30, **kwargs):
+        super().__init__(**kwargs)
+        self.app = app
+        self.intervalo = intervalo
+        self.retencao = retencao
+        self.espera_lacuna = espera_lacuna
+        self._ultimo_lido = None
+        self._lacunas = {}
+        self._thread = None
+        self._pid = None
+
+    def publicar(self, tipo, dados):
+        # Conexão própria para não interferir na sessão da requisição
+        with db.engine.begin() as conn:
+            conn.execute(Evento.__table__.insert().values(
+                tipo=tipo,
+                dados=dumps(dados),
+                criado_em=datetime.utcnow()
+            ))
+
+    def assinar(self, ultimo_id=None):
+        self._iniciar()
+        return super().assinar(ultimo_id)
+
+    def _iniciar(self):
+        # A thread é criada sob demanda para sobreviver ao fork do gunicorn
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._consumir, daemon=True)
+            self._thread.start()
+
+    def _consumir(self):
+        ultima_limpeza = 0
+        with self.app.app_context():
+            while True:
+                try:
+                    if self._ultimo_lido is None:
+                        self._ultimo_lido = db.session.query(func.max(Evento.id)).scalar() or 0
+
+                    self._ler_novos()
+
+                    if time.time() - ultima_limpeza > 60:
+                        limite = datetime.utcnow() - timedelta(seconds=self.retencao)
+                        Evento.query.filter(Evento.criado_em < limite).delete()
+                        db.session.commit()
+                        ultima_limpeza = time.time()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Erro ao ler eventos: {str(e)}")
+                finally:
+                    db.session.remove()
+
+                time.sleep(self.intervalo)
+
+    def _ler_novos(self):
+        condicao = Evento.id > self._ultimo_lido
+        if self._lacunas:
+            condicao = or_(condicao, Evento.id.in_(list(self._lacunas)))
+        novos = Evento.query.filter(condicao).order_by(Evento.id).limit(500).all()
+
+        agora = time.monotonic()
+        for evento in novos:
+            if evento.id > self._ultimo_lido:
+                # Ids pulados podem ser transações ainda abertas (ou desfeitas)
+                inicio = max(self._ultimo_lido + 1, evento.id - MAX_LACUNAS)
+                for faltante in range(inicio, evento.id):
+                    self._lacunas[faltante] = agora
+                self._ultimo_lido = evento.id
+            else:
+                self._lacunas.pop(evento.id, None)
+            self._distribuir(evento.to_dict())
+
+        self._lacunas = {
+            evento_id: desde for evento_id, desde in self._lacunas.items()
+            if agora - desde < self.espera_lacuna
+        }
+
+
+_barramento = BarramentoMemoria()
+
+
+def init_app(app):
+    """
+    Escolhe o backend pelo EVENTOS_BACKEND (memoria ou banco).
+    EVENTOS_MAX_CONEXOES (16) limita os streams SSE por worker; deve ficar
+    abaixo do --threads do gunicorn (32 no Procfile) para sobrar threads
+    para a API. Com N agentes simultâneos, use workers x max_conexoes >= N.
+    """
+    global _barramento
+    backend = os.getenv('EVENTOS_BACKEND', 'memoria')
+    max_assinantes = int(os.getenv('EVENTOS_MAX_CONEXOES', '16'))
+    if backend == 'banco':
+        _barramento = BarramentoBanco(
+            app,
+            intervalo=float(os.getenv('EVENTOS_INTERVALO', '1.0')),
+            max_assinantes=max_assinantes
+        )
+    else:
+        _barramento = BarramentoMemoria(max_assinantes=max_assinantes)
+
+
+def obter_barramento():
+    return _barramento
+
+
+def publicar_evento(tipo, dados):
+    """Publica um evento sem nunca derrubar a requisição que o gerou"""
+    try:
+        _barramento.publicar(tipo, dados)
+    except Exception as e:
+        print(f"Erro ao publicar evento {tipo}: {str(e)}")
+
+
+def formatar_sse(evento):
+    return f"id: {evento['id']}\nevent: {evento['tipo']}\ndata: {dumps(evento['dados'])}\n\n"
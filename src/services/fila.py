@@ -0,0 +1,181 @@
+import time
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.exc import OperationalError
+from src.models.user import db
+from src.models.atendimento import Agente, Atendimento
+from src.services.versoes import AGENTES, FILA, atendimentos_do_agente, incrementar_versoes
+
+STATUS_ATRIBUIVEIS = ('fila', 'bot')
+
+
+class CapacidadeEsgotada(Exception):
+    """Agente já está no limite de max_atendimentos"""
+
+
+class AtendimentoIndisponivel(Exception):
+    """Atendimento já foi atribuído ou finalizado por outra requisição"""
+
+
+def _suporta_skip_locked():
+    return db.engine.dialect.name in ('mysql', 'postgresql')
+
+
+def _reservar_vaga(agente_id):
+    """
+    Incrementa os contadores do agente somente se ainda houver capacidade.
+    O UPDATE condicional é atômico, então dois pedidos simultâneos nunca
+    passam do max_atendimentos.
+    """
+    resultado = db.session.execute(
+        update(Agente).where(
+            Agente.id == agente_id,
+            Agente.atendimentos_ativos < Agente.max_atendimentos
+        ).values(
+            atendimentos_ativos=Agente.atendimentos_ativos + 1,
+            total_atendimentos=Agente.total_atendimentos + 1
+        ).execution_options(synchronize_session=False)
+    )
+    if resultado.rowcount != 1:
+        raise CapacidadeEsgotada()
+
+
+def _marcar_atribuido(atendimento_id, agente_id, status_esperados):
+    """Compare-and-set: só atribui se o atendimento ainda está no status esperado"""
+    resultado = db.session.execute(
+        update(Atendimento).where(
+            Atendimento.id == atendimento_id,
+            Atendimento.status.in_(status_esperados)
+        ).values(
+            agente_id=agente_id,
+            status='em_atendimento',
+            atribuido_em=datetime.utcnow()
+        ).execution_options(synchronize_session=False)
+    )
+    return resultado.rowcount == 1
+
+
+def _registrar_espera(atendimento_id):
+    atendimento = db.session.get(Atendimento, atendimento_id, populate_existing=True)
+    if atendimento.iniciado_em and atendimento.atribuido_em:
+        atendimento.tempo_espera = int((atendimento.atribuido_em - atendimento.iniciado_em).total_seconds())
+    return atendimento
+
+
+def _proximo_da_fila(agente_id):
+    ordem = (Atendimento.prioridade.desc(), Atendimento.iniciado_em, Atendimento.id)
+
+    if _suporta_skip_locked():
+        # Linhas travadas por outro worker são puladas em vez de esperadas
+        atendimento_id = db.session.execute(
+            select(Atendimento.id).where(Atendimento.status == 'fila')
+            .order_by(*ordem).limit(1).with_for_update(skip_locked=True)
+        ).scalar()
+        if atendimento_id is None:
+            return None
+        _marcar_atribuido(atendimento_id, agente_id, ('fila',))
+        return atendimento_id
+
+    # SQLite: tenta os primeiros da fila até um compare-and-set vencer
+    candidatos = db.session.execute(
+        select(Atendimento.id).where(Atendimento.status == 'fila').order_by(*ordem).limit(10)
+    ).scalars().all()
+    for atendimento_id in candidatos:
+        if _marcar_atribuido(atendimento_id, agente_id, ('fila',)):
+            return atendimento_id
+    return None
+
+
+def _com_retentativas(operacao, tentativas):
+    for tentativa in range(tentativas):
+        try:
+            return operacao()
+        except OperationalError:
+            # Banco ocupado/deadlock: desfaz e tenta de novo
+            db.session.rollback()
+            if tentativa == tentativas - 1:
+                raise
+            time.sleep(0.01 * (tentativa + 1))
+
+
+def reivindicar_proximo(agente_id, tentativas=5):
+    """
+    Atribui ao agente o próximo atendimento da fila de forma atômica.
+    Retorna o Atendimento atribuído ou None se a fila está vazia; lança
+    CapacidadeEsgotada se o agente não tem vaga.
+    """
+    def operacao():
+        _reservar_vaga(agente_id)
+        atendimento_id = _proximo_da_fila(agente_id)
+        if atendimento_id is None:
+            # Fila vazia (ou todos reivindicados agora): libera a vaga reservada
+            db.session.rollback()
+            return None
+        atendimento = _registrar_espera(atendimento_id)
+        # Por último, para segurar o lock das versões o mínimo possível
+        incrementar_versoes(FILA, AGENTES, atendimentos_do_agente(agente_id))
+        db.session.commit()
+        return atendimento
+
+    try:
+        return _com_retentativas(operacao, tentativas)
+    except CapacidadeEsgotada:
+        db.session.rollback()
+        raise
+
+
+def atribuir(atendimento_id, agente_id, tentativas=5, status_esperados=STATUS_ATRIBUIVEIS):
+    """Atribui um atendimento específico ao agente com as mesmas garantias"""
+    def operacao():
+        _reservar_vaga(agente_id)
+        if not _marcar_atribuido(atendimento_id, agente_id, status_esperados):
+            db.session.rollback()
+            raise AtendimentoIndisponivel()
+        atendimento = _registrar_espera(atendimento_id)
+        # Por último, para segurar o lock das versões o mínimo possível
+        incrementar_versoes(FILA, AGENTES, atendimentos_do_agente(agente_id))
+        db.session.commit()
+        return atendimento
+
+    try:
+        return _com_retentativas(operacao, tentativas)
+    except (CapacidadeEsgotada, AtendimentoIndisponivel):
+        db.session.rollback()
+        raise
+
+
+def _liberar_vaga(agente_id):
+    """Decremento atômico; nunca fica negativo nem sobrescreve reservas concorrentes"""
+    db.session.execute(
+        update(Agente).where(
+            Agente.id == agente_id,
+            Agente.atendimentos_ativos > 0
+        ).values(
+            atendimentos_ativos=Agente.atendimentos_ativos - 1
+        ).execution_options(synchronize_session=False)
+    )
+
+
+def finalizar(atendimento, valores):
+    """
+    Finaliza o atendimento com compare-and-set sobre o status e o agente
+    lidos: se outra requisição o finalizou ou atribuiu antes, lança
+    AtendimentoIndisponivel e a vaga do agente não é liberada duas vezes.
+    Não faz commit; o objeto é recarregado com os valores gravados.
+    """
+    status_anterior, agente_id = atendimento.status, atendimento.agente_id
+    resultado = db.session.execute(
+        update(Atendimento).where(
+            Atendimento.id == atendimento.id,
+            Atendimento.status == status_anterior,
+            Atendimento.status != 'finalizado',
+            Atendimento.agente_id == agente_id
+        ).values(
+            status='finalizado', **valores
+        ).execution_options(synchronize_session=False)
+    )
+    if resultado.rowcount != 1:
+        raise AtendimentoIndisponivel()
+    if status_anterior == 'em_atendimento' and agente_id:
+        _liberar_vaga(agente_id)
+    db.session.refresh(atendimento)
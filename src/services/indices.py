@@ -0,0 +1,132 @@
+import re
+import sys
+import click
+from datetime import datetime
+from sqlalchemy import inspect, select
+from src.models.user import db
+from src.models.atendimento import Atendimento, Cliente, Mensagem, Webhook, EntregaWebhook
+from src.services.estatisticas import consulta_por_status
+from src.services.transcricoes import consulta as consulta_transcricoes
+
+
+def criar_indices():
+    """
+    Cria os índices declarados nos modelos que ainda não existem no banco.
+    O create_all só cria índices junto com tabelas novas; aqui tabelas já
+    existentes também recebem os índices, e rodar de novo não faz nada.
+    Retorna os nomes dos índices criados.
+    """
+    inspetor = inspect(db.engine)
+    existentes = set(inspetor.get_table_names())
+    criados = []
+    for tabela in db.metadata.sorted_tables:
+        if tabela.name not in existentes:
+            continue
+        nomes = {i['name'] for i in inspetor.get_indexes(tabela.name)}
+        for indice in tabela.indexes:
+            if indice.name not in nomes:
+                indice.create(bind=db.engine, checkfirst=True)
+                criados.append(indice.name)
+    return criados
+
+
+def consultas_criticas():
+    """As consultas dos caminhos quentes, no mesmo formato usado pelas rotas"""
+    return {
+        'fila': select(Atendimento.id).where(Atendimento.status == 'fila').order_by(
+            Atendimento.prioridade.desc(), Atendimento.iniciado_em, Atendimento.id
+        ).limit(10),
+        'atendimentos_por_status': select(Atendimento.id).where(
+            Atendimento.status == 'em_atendimento'
+        ).order_by(Atendimento.iniciado_em.desc()),
+        'atendimentos_do_agente': select(Atendimento.id).where(
+            Atendimento.agente_id == 1
+        ).order_by(Atendimento.iniciado_em.desc()),
+        'atendimentos_do_cliente': select(Atendimento.id).where(
+            Atendimento.cliente_id == 1
+        ).order_by(Atendimento.iniciado_em.desc()),
+        'candidatos_arquivamento': select(Atendimento.id).where(
+            Atendimento.status == 'finalizado', Atendimento.finalizado_em < datetime(2024, 1, 1)
+        ).order_by(Atendimento.finalizado_em).limit(500),
+        'atendimento_do_bot': select(Atendimento.id).where(
+            Atendimento.cliente_id == 1, Atendimento.status == 'bot'
+        ).limit(1),
+        'estatisticas': consulta_por_status().statement,
+        'historico_mensagens': select(Mensagem.id).where(Mensagem.atendimento_id == 1).order_by(
+            Mensagem.enviada_em.desc(), Mensagem.id.desc()
+        ).limit(50),
+        'exportacao_transcricoes': consulta_transcricoes(desde=datetime(2024, 1, 1), ate=datetime(2024, 2, 1)),
+        'clientes_recentes': select(Cliente.id).order_by(Cliente.ultima_interacao.desc()).limit(50),
+        'webhooks_do_evento': select(Webhook.id).where(Webhook.evento == 'nova_mensagem', Webhook.ativo.is_(True)),
+        'entregas_do_webhook': select(EntregaWebhook.id).where(
+            EntregaWebhook.webhook_id == 1
+        ).order_by(EntregaWebhook.id.desc()).limit(100),
+    }
+
+
+def _executar_explain(conexao, prefixo, consulta):
+    compilada = consulta.compile(dialect=conexao.dialect)
+    parametros = compilada.params
+    if compilada.positional:
+        parametros = tuple(parametros[nome] for nome in compilada.positiontup)
+    return conexao.exec_driver_sql(f'{prefixo} {compilada}', parametros).all()
+
+
+def _plano_sqlite(conexao, consulta):
+    linhas = [linha[-1] for linha in _executar_explain(conexao, 'EXPLAIN QUERY PLAN', consulta)]
+    # 'SCAN tabela' sem 'USING ... INDEX' é leitura da tabela inteira
+    varreduras = [l for l in linhas if re.match(r'^SCAN \w+$', l)]
+    return linhas, varreduras
+
+
+def _plano_postgresql(conexao, consulta):
+    # Em tabelas pequenas o planejador prefere Seq Scan mesmo com índice;
+    # desligar seqscan mostra se existe um índice capaz de atender a consulta
+    conexao.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    linhas = [linha[0] for linha in _executar_explain(conexao, 'EXPLAIN', consulta)]
+    return linhas, [l for l in linhas if 'Seq Scan' in l]
+
+
+def _plano_mysql(conexao, consulta):
+    resultado = _executar_explain(conexao, 'EXPLAIN', consulta)
+    linhas = [f"{linha._mapping['table']}: type={linha._mapping['type']} key={linha._mapping['key']}" for linha in resultado]
+    return linhas, [l for l in linhas if 'type=ALL' in l]
+
+
+PLANOS = {
+    'sqlite': _plano_sqlite,
+    'postgresql': _plano_postgresql,
+    'mysql': _plano_mysql,
+}
+
+
+def verificar_planos():
+    """
+    Roda EXPLAIN em cada consulta crítica e retorna
+    {nome: (plano, linhas com varredura completa)}.
+    """
+    explicar = PLANOS.get(db.engine.dialect.name)
+    if explicar is None:
+        raise RuntimeError(f'EXPLAIN não suportado para {db.engine.dialect.name}')
+
+    resultado = {}
+    with db.engine.connect() as conexao:
+        for nome, consulta in consultas_criticas().items():
+            with conexao.begin():
+                resultado[nome] = explicar(conexao, consulta)
+    return resultado
+
+
+def init_app(app):
+    @app.cli.command('verificar-indices')
+    def verificar_indices_comando():
+        """Confere com EXPLAIN que as consultas críticas usam índice; sai com erro se não"""
+        falhas = 0
+        for nome, (plano, varreduras) in verificar_planos().items():
+            click.echo(f"{'FALHOU' if varreduras else 'ok':<7}{nome}")
+            for linha in plano:
+                click.echo(f'         {linha}')
+            falhas += bool(varreduras)
+        if falhas:
+            click.echo(f'{falhas} consulta(s) com varredura completa')
+            sys.exit(1)
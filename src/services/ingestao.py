@@ -0,0 +1,386 @@
+import atexit
+import os
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from datetime import datetime
+from sqlalchemy import bindparam, select, update
+from src.models.user import db
+from src.models.atendimento import Atendimento, Cliente, ClienteTermoBusca, Mensagem, MensagemExterna
+from src.services import busca_clientes
+from src.services.bot import processar_intencao, ids_processados, MensagemDuplicada
+from src.services.eventos import publicar_evento, FILA_ATUALIZADA, NOVA_MENSAGEM
+from src.services.versoes import FILA, incrementar_versao
+from src.utils.upsert import inserir_ignorando
+
+DURABILIDADES = ('commit', 'memoria')
+
+
+class FilaCheia(Exception):
+    """O buffer de ingestão está no limite; o chamador deve pedir nova tentativa"""
+
+
+class MensagemRecebida:
+    """Mensagem aceita pelo ingestor, com a resposta do bot já decidida"""
+
+    def __init__(self, telefone, conteudo, nome, resposta, id_externo=None, canal=None):
+        self.telefone = telefone
+        self.conteudo = conteudo
+        self.nome = nome
+        self.resposta = resposta
+        self.id_externo = id_externo
+        self.canal = canal
+        self.recebida_em = datetime.utcnow()
+        self.atendimento_id = None
+        # Id externo já gravado: a mensagem não é regravada e o chamador recebe a resposta original
+        self.duplicada = False
+        self.resposta_original = None
+        self.futuro = Future()
+
+
+class IngestorMensagens:
+    """
+    Grava as mensagens recebidas pelo bot em lotes (group commit).
+
+    A resposta do bot depende só do texto e da configuração, então é
+    calculada na hora e a gravação fica para um escritor em segundo plano.
+    Cada escritor junta até `lote` mensagens ou espera até `latencia`
+    segundos e grava tudo numa transação: upsert dos clientes por telefone,
+    atendimentos em modo bot, mensagens e transferências para a fila.
+
+    Mensagens do mesmo telefone sempre caem no mesmo escritor e são
+    gravadas na ordem de chegada. Com durabilidade 'commit' o chamador só
+    recebe a resposta depois que o lote foi gravado; com 'memoria' responde
+    na hora e um crash perde o que ainda estava no buffer.
+    """
+
+    def __init__(self, app=None, lote=200, latencia=0.05, tamanho_fila=10000,
+                 escritores=1, durabilidade='commit', espera_fila=1.0):
+        self.app = app
+        self.ativo = False
+        self.lote = lote
+        self.latencia = latencia
+        self.tamanho_fila = tamanho_fila
+        self.escritores = escritores
+        self.durabilidade = durabilidade
+        self.espera_fila = espera_fila
+
+        self._lock = threading.Lock()
+        self._filas = []
+        self._threads = []
+        self._pid = None
+
+    def iniciar(self):
+        # Criado sob demanda em cada processo, depois do fork do gunicorn
+        if self._threads and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._threads and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._filas = [queue.Queue(maxsize=self.tamanho_fila) for _ in range(self.escritores)]
+            self._threads = [
+                threading.Thread(target=self._executar, args=(fila,), daemon=True)
+                for fila in self._filas
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def parar(self, timeout=10):
+        """Grava o que restou no buffer; chamado na saída do processo"""
+        if not self._threads or self._pid != os.getpid():
+            return
+        for fila in self._filas:
+            fila.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def receber(self, telefone, conteudo, nome='Cliente', id_externo=None, canal=None):
+        """
+        Aceita uma mensagem e retorna (MensagemRecebida, resposta do bot).
+        Lança MensagemDuplicada para ids externos já vistos e FilaCheia
+        quando o buffer não abre espaço dentro de `espera_fila` segundos.
+        """
+        self.iniciar()
+        if id_externo:
+            resposta_anterior = ids_processados.obter(id_externo)
+            if resposta_anterior is not None:
+                raise MensagemDuplicada(resposta_anterior)
+            # O LRU não conhece o id: confere a tabela, como o caminho síncrono
+            existente = db.session.get(MensagemExterna, id_externo)
+            if existente is not None:
+                if existente.resposta is not None:
+                    ids_processados.guardar(id_externo, existente.resposta)
+                raise MensagemDuplicada(existente.resposta)
+
+        resposta = processar_intencao(conteudo.lower().strip(), None)
+        item = MensagemRecebida(telefone, conteudo, nome, resposta, id_externo, canal)
+
+        # O mesmo telefone vai sempre para o mesmo escritor, preservando a ordem
+        fila = self._filas[zlib.crc32(telefone.encode()) % len(self._filas)]
+        try:
+            fila.put(item, timeout=self.espera_fila)
+        except queue.Full:
+            raise FilaCheia()
+
+        if self.durabilidade == 'commit':
+            # Propaga o erro do lote, se houver, antes de confirmar a mensagem
+            item.futuro.result()
+            if item.duplicada:
+                raise MensagemDuplicada(item.resposta_original)
+        if id_externo:
+            ids_processados.guardar(id_externo, resposta['mensagem'])
+        return item, resposta
+
+    def _executar(self, fila):
+        with self.app.app_context():
+            while True:
+                item = fila.get()
+                if item is None:
+                    return
+                itens = [item]
+                prazo = time.monotonic() + self.latencia
+                encerrar = False
+                while len(itens) < self.lote:
+                    restante = prazo - time.monotonic()
+                    try:
+                        item = fila.get(timeout=restante) if restante > 0 else fila.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        encerrar = True
+                        break
+                    itens.append(item)
+
+                try:
+                    self._gravar_lote(itens)
+                finally:
+                    db.session.remove()
+
+                if encerrar:
+                    return
+
+    def _gravar_lote(self, itens):
+        """
+        Grava o lote e resolve o futuro de cada item. Se o lote falha (por
+        exemplo, um MessageSid gravado agora por outro processo), regrava
+        item a item para que um item ruim não derrube os demais.
+        """
+        try:
+            eventos = self.gravar(itens)
+        except Exception as e:
+            db.session.rollback()
+            if len(itens) == 1:
+                print(f"Erro ao gravar mensagem de {itens[0].telefone}: {str(e)}")
+                itens[0].futuro.set_exception(e)
+                return
+            print(f"Erro ao gravar lote de mensagens, regravando uma a uma: {str(e)}")
+            for item in itens:
+                self._gravar_lote([item])
+            return
+
+        for item in itens:
+            item.futuro.set_result(item)
+        for tipo, dados in eventos:
+            publicar_evento(tipo, dados)
+
+    def gravar(self, itens):
+        """Grava um lote numa única transação e retorna os eventos a publicar"""
+        itens = self._sem_duplicados(itens)
+        if not itens:
+            return []
+
+        clientes = self._upsert_clientes(itens)
+        atendimentos = self._atendimentos_em_bot(clientes.values())
+
+        mensagens = []
+        transferidos = {}
+        for item in itens:
+            cliente_id = clientes[item.telefone]
+            atendimento_id = atendimentos.get(cliente_id)
+            if atendimento_id is None:
+                # O atendimento anterior foi para a fila neste mesmo lote
+                atendimento_id = self._criar_atendimento(cliente_id)
+                atendimentos[cliente_id] = atendimento_id
+            item.atendimento_id = atendimento_id
+
+            mensagens.append(self._linha_mensagem(item, cliente_id, 'cliente', item.conteudo))
+            mensagens.append(self._linha_mensagem(item, cliente_id, 'bot', item.resposta['mensagem']))
+
+            if item.resposta.get('transferir_atendente'):
+                transferidos[atendimento_id] = item.resposta.get('departamento')
+                del atendimentos[cliente_id]
+
+        ids = self._inserir_mensagens(mensagens)
+        for linha, mensagem_id in zip(mensagens, ids):
+            linha['id'] = mensagem_id
+
+        if transferidos:
+            db.session.execute(
+                update(Atendimento.__table__).where(
+                    Atendimento.__table__.c.id == bindparam('atendimento')
+                ).values(status='fila', departamento=bindparam('dep')),
+                [{'atendimento': a, 'dep': d} for a, d in transferidos.items()]
+            )
+            incrementar_versao(FILA)
+
+        externas = [
+            {
+                'id_externo': item.id_externo,
+                'canal': item.canal,
+                'mensagem_id': mensagens[2 * i]['id'],
+                'resposta': item.resposta['mensagem'],
+                'recebida_em': item.recebida_em
+            }
+            for i, item in enumerate(itens) if item.id_externo
+        ]
+        if externas:
+            db.session.execute(MensagemExterna.__table__.insert(), externas)
+
+        db.session.commit()
+
+        eventos = []
+        for linha in mensagens:
+            eventos.append((NOVA_MENSAGEM, {
+                'atendimento_id': linha['atendimento_id'],
+                'agente_id': None,
+                'mensagem': Mensagem(**linha).to_dict()
+            }))
+        for atendimento_id in transferidos:
+            eventos.append((FILA_ATUALIZADA, {'atendimento_id': atendimento_id}))
+        return eventos
+
+    def _sem_duplicados(self, itens):
+        """
+        Descarta ids externos repetidos no lote ou já gravados por outro
+        processo, marcando-os com a resposta enviada da primeira vez
+        """
+        externos = [item.id_externo for item in itens if item.id_externo]
+        vistos = {}
+        if externos:
+            vistos = dict(db.session.execute(
+                select(MensagemExterna.id_externo, MensagemExterna.resposta).where(
+                    MensagemExterna.id_externo.in_(externos)
+                )
+            ).all())
+
+        resultado = []
+        for item in itens:
+            # Um lote que falhou é reavaliado item a item, do zero
+            item.duplicada, item.resposta_original = False, None
+            if item.id_externo:
+                if item.id_externo in vistos:
+                    item.duplicada = True
+                    item.resposta_original = vistos[item.id_externo]
+                    continue
+                vistos[item.id_externo] = item.resposta['mensagem']
+            resultado.append(item)
+        return resultado
+
+    def _upsert_clientes(self, itens):
+        """Cria os clientes que faltam com um INSERT em lote; retorna {telefone: id}"""
+        nomes = {}
+        for item in itens:
+            nomes.setdefault(item.telefone, item.nome)
+
+        def existentes():
+            return dict(db.session.execute(
+                select(Cliente.telefone, Cliente.id).where(Cliente.telefone.in_(list(nomes)))
+            ).all())
+
+        clientes = existentes()
+        faltando = [t for t in nomes if t not in clientes]
+        if faltando:
+            agora = datetime.utcnow()
+            inserir_ignorando(Cliente.__table__, [
+                {'telefone': t, 'nome': nomes[t], 'criado_em': agora} for t in faltando
+            ], ['telefone'])
+            clientes = existentes()
+
+            # Inserções em lote não passam pelos eventos do ORM da busca
+            novos = [clientes[t] for t in faltando if t in clientes]
+            ja_indexados = set(db.session.execute(
+                select(ClienteTermoBusca.cliente_id).where(ClienteTermoBusca.cliente_id.in_(novos))
+            ).scalars())
+            busca_clientes.indexar([
+                linha for linha in db.session.execute(
+                    select(Cliente.id, Cliente.nome, Cliente.telefone, Cliente.email).where(Cliente.id.in_(novos))
+                ) if linha.id not in ja_indexados
+            ])
+        return clientes
+
+    def _atendimentos_em_bot(self, cliente_ids):
+        """Atendimento em modo bot de cada cliente, criando em lote os que faltam"""
+        cliente_ids = list(set(cliente_ids))
+
+        def existentes():
+            return dict(db.session.execute(
+                select(Atendimento.cliente_id, Atendimento.id).where(
+                    Atendimento.cliente_id.in_(cliente_ids), Atendimento.status == 'bot'
+                ).order_by(Atendimento.id)
+            ).all())
+
+        atendimentos = existentes()
+        faltando = [c for c in cliente_ids if c not in atendimentos]
+        if faltando:
+            agora = datetime.utcnow()
+            db.session.execute(Atendimento.__table__.insert(), [
+                {'cliente_id': c, 'status': 'bot', 'prioridade': 0, 'iniciado_em': agora} for c in faltando
+            ])
+            atendimentos = existentes()
+        return atendimentos
+
+    def _criar_atendimento(self, cliente_id):
+        resultado = db.session.execute(Atendimento.__table__.insert().values(
+            cliente_id=cliente_id, status='bot', prioridade=0, iniciado_em=datetime.utcnow()
+        ))
+        return resultado.inserted_primary_key[0]
+
+    def _linha_mensagem(self, item, cliente_id, remetente, conteudo):
+        return {
+            'atendimento_id': item.atendimento_id,
+            'cliente_id': cliente_id,
+            'remetente': remetente,
+            'conteudo': conteudo,
+            'tipo': 'texto',
+            'lida': False,
+            'enviada_em': item.recebida_em
+        }
+
+    def _inserir_mensagens(self, linhas):
+        """
+        INSERT em lote das mensagens, na ordem do lote, devolvendo os ids.
+        Bancos sem RETURNING em executemany (MySQL) inserem uma a uma,
+        ainda dentro da mesma transação.
+        """
+        tabela = Mensagem.__table__
+        if db.engine.dialect.insert_executemany_returning_sort_by_parameter_order:
+            return list(db.session.execute(
+                tabela.insert().returning(tabela.c.id, sort_by_parameter_order=True), linhas
+            ).scalars())
+        return [db.session.execute(tabela.insert().values(**linha)).inserted_primary_key[0] for linha in linhas]
+
+
+ingestor = IngestorMensagens()
+
+
+def init_app(app):
+    """
+    Com INGESTAO_ATIVA=1 as mensagens do bot passam pelo ingestor em lote.
+    INGESTAO_LOTE, INGESTAO_LATENCIA_MS, INGESTAO_FILA_MAX e
+    INGESTAO_ESCRITORES ajustam o group commit; INGESTAO_DURABILIDADE
+    escolhe entre 'commit' (padrão) e 'memoria'.
+    """
+    ingestor.app = app
+    ingestor.lote = int(os.getenv('INGESTAO_LOTE', '200'))
+    ingestor.latencia = float(os.getenv('INGESTAO_LATENCIA_MS', '50')) / 1000
+    ingestor.tamanho_fila = int(os.getenv('INGESTAO_FILA_MAX', '10000'))
+    ingestor.escritores = int(os.getenv('INGESTAO_ESCRITORES', '1'))
+    ingestor.durabilidade = os.getenv('INGESTAO_DURABILIDADE', 'commit')
+    if ingestor.durabilidade not in DURABILIDADES:
+        raise ValueError(f'INGESTAO_DURABILIDADE inválida: {ingestor.durabilidade}')
+    ingestor.ativo = os.getenv('INGESTAO_ATIVA') == '1'
+    if ingestor.ativo:
+        atexit.register(ingestor.parar)
@@ -0,0 +1,323 @@
+import glob
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from flask import request
+from sqlalchemy import event
+from src.models.user import db
+from src.services import banco
+
+PREFIXO = 'atendimento_'
+LIMITES_DURACAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+LIMITES_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+HTTP = ('metodo', 'rota')
+
+# nome: (tipo, descrição, rótulos, limites dos buckets)
+METRICAS = {
+    'http_requisicoes_total': ('counter', 'Requisições atendidas por rota e status', HTTP + ('status',), None),
+    'http_duracao_segundos': ('histogram', 'Tempo de resposta por rota', HTTP, LIMITES_DURACAO),
+    'http_resposta_bytes': ('histogram', 'Tamanho do corpo das respostas com tamanho conhecido', HTTP, LIMITES_BYTES),
+    'sql_consultas_por_requisicao': ('histogram', 'Comandos SQL executados por requisição', HTTP, LIMITES_CONSULTAS),
+    'sql_duracao_por_requisicao_segundos': ('histogram', 'Tempo gasto no banco por requisição', HTTP, LIMITES_DURACAO),
+    'sql_consultas_lentas_total': ('counter', 'Comandos SQL acima de METRICAS_SQL_LENTA_MS', ('rota',), None),
+    'sql_consultas_fora_de_requisicao_total': ('counter', 'Comandos SQL das threads em segundo plano', (), None),
+    'pool_checkouts_total': ('counter', 'Conexões retiradas do pool', (), None),
+    'pool_espera_segundos_total': ('counter', 'Tempo total esperando por conexão do pool', (), None),
+    'pool_timeouts_total': ('counter', 'Esperas por conexão que estouraram BANCO_POOL_TIMEOUT', (), None),
+    'pool_conexoes_abertas_total': ('counter', 'Conexões novas abertas com o banco', (), None),
+    'pool_conexoes_invalidadas_total': ('counter', 'Conexões descartadas por erro ou pre-ping', (), None),
+}
+
+
+class Registro:
+    """
+    Contadores e histogramas deste processo. Cada série é identificada
+    pelo nome da métrica e pelos rótulos, em ordem fixa.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores = {}
+        self._histogramas = {}
+        self.versao = 0
+
+    def incrementar(self, nome, rotulos=(), valor=1):
+        with self._lock:
+            chave = (nome, rotulos)
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+            self.versao += 1
+
+    def registrar_requisicao(self, rotulos, status, duracao, tamanho, consultas, tempo_sql):
+        """Tudo o que uma requisição gera, sob um único lock"""
+        with self._lock:
+            chave = ('http_requisicoes_total', rotulos + (status,))
+            self._contadores[chave] = self._contadores.get(chave, 0) + 1
+            self._observar('http_duracao_segundos', rotulos, duracao)
+            if tamanho is not None:
+                self._observar('http_resposta_bytes', rotulos, tamanho)
+            self._observar('sql_consultas_por_requisicao', rotulos, consultas)
+            self._observar('sql_duracao_por_requisicao_segundos', rotulos, tempo_sql)
+            self.versao += 1
+
+    def _observar(self, nome, rotulos, valor):
+        limites = METRICAS[nome][3]
+        serie = self._histogramas.get((nome, rotulos))
+        if serie is None:
+            # Contagem por bucket (o último é +Inf), soma e total
+            serie = self._histogramas[(nome, rotulos)] = [[0] * (len(limites) + 1), 0.0, 0]
+        serie[0][bisect_left(limites, valor)] += 1
+        serie[1] += valor
+        serie[2] += 1
+
+    def instantaneo(self):
+        """Cópia serializável em JSON, gravada no arquivo deste worker"""
+        with self._lock:
+            contadores = [[nome, list(rotulos), valor] for (nome, rotulos), valor in self._contadores.items()]
+            histogramas = [[nome, list(rotulos), list(serie[0]), serie[1], serie[2]]
+                           for (nome, rotulos), serie in self._histogramas.items()]
+        contadores += [[f'pool_{nome}_total', [], valor] for nome, valor in banco.metricas.totais().items()]
+        return {'contadores': contadores, 'histogramas': histogramas}
+
+
+registro = Registro()
+_requisicao = threading.local()
+
+
+def _formato_parametros(parametros):
+    """Tipos dos parâmetros (nunca os valores) para o log de consultas lentas"""
+    if isinstance(parametros, (list, tuple)) and parametros and isinstance(parametros[0], (dict, list, tuple)):
+        return f'{len(parametros)} x {_formato_parametros(parametros[0])}'
+    if isinstance(parametros, dict):
+        return '{' + ', '.join(f'{chave}: {type(valor).__name__}' for chave, valor in parametros.items()) + '}'
+    if isinstance(parametros, (list, tuple)):
+        return '(' + ', '.join(type(valor).__name__ for valor in parametros) + ')'
+    return type(parametros).__name__
+
+
+def _texto_consulta(comando, limite=500):
+    comando = re.sub(r'\s+', ' ', comando).strip()
+    return comando if len(comando) <= limite else comando[:limite] + '...'
+
+
+class Instrumentacao:
+    """
+    Mede cada requisição (latência, tamanho da resposta, comandos SQL e
+    tempo no banco) e loga as consultas lentas com o formato dos
+    parâmetros.
+
+    Cada worker do gunicorn acumula em memória e grava um instantâneo em
+    `diretorio` a cada `intervalo` segundos; /api/metrics soma os arquivos
+    de todos os workers. Arquivos de workers que já saíram continuam
+    somando, para que os contadores nunca diminuam.
+    """
+
+    def __init__(self, app=None, diretorio=None, intervalo=5.0, sql_lenta_ms=200):
+        self.app = app
+        self.diretorio_configurado = diretorio
+        self.intervalo = intervalo
+        self.sql_lenta = sql_lenta_ms / 1000
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._arquivo = None
+
+    @property
+    def diretorio(self):
+        # Workers do mesmo master compartilham o diretório
+        return self.diretorio_configurado or os.path.join(tempfile.gettempdir(), f'metricas-{os.getppid()}')
+
+    def iniciar(self):
+        # Criado sob demanda em cada processo, depois do fork do gunicorn
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            # O horário evita herdar o arquivo de um worker antigo com o mesmo pid
+            self._arquivo = os.path.join(self.diretorio, f'{self._pid}-{time.time_ns()}.json')
+            self._thread = threading.Thread(target=self._executar, daemon=True)
+            self._thread.start()
+
+    def _executar(self):
+        versao = None
+        while True:
+            time.sleep(self.intervalo)
+            if registro.versao != versao:
+                versao = registro.versao
+                self.gravar()
+
+    def gravar(self):
+        """Grava o instantâneo deste worker (escrita atômica)"""
+        try:
+            os.makedirs(self.diretorio, exist_ok=True)
+            temporario = f'{self._arquivo}.tmp'
+            with open(temporario, 'w', encoding='utf-8') as arquivo:
+                json.dump(registro.instantaneo(), arquivo)
+            os.replace(temporario, self._arquivo)
+        except Exception as e:
+            print(f"Erro ao gravar métricas: {str(e)}")
+
+    # Ciclo da requisição
+
+    def antes(self):
+        self.iniciar()
+        _requisicao.inicio = time.perf_counter()
+        _requisicao.consultas = 0
+        _requisicao.tempo_sql = 0.0
+        _requisicao.status = None
+        _requisicao.tamanho = None
+
+    def depois(self, resposta):
+        _requisicao.status = resposta.status_code
+        # Respostas em streaming não têm tamanho conhecido
+        _requisicao.tamanho = resposta.content_length if not resposta.is_streamed else None
+        return resposta
+
+    def finalizar(self, erro=None):
+        # teardown roda depois do fim do streaming, então a latência inclui o corpo todo
+        inicio = getattr(_requisicao, 'inicio', None)
+        if inicio is None:
+            return
+        _requisicao.inicio = None
+        regra = request.url_rule.rule if request.url_rule is not None else 'desconhecida'
+        status = _requisicao.status or 500
+        registro.registrar_requisicao(
+            (request.method, regra), str(status), time.perf_counter() - inicio,
+            _requisicao.tamanho, _requisicao.consultas, _requisicao.tempo_sql
+        )
+
+    # Eventos do engine
+
+    def antes_do_comando(self, conexao, cursor, comando, parametros, contexto, executemany):
+        conexao.info.setdefault('inicio_comando', []).append(time.perf_counter())
+
+    def depois_do_comando(self, conexao, cursor, comando, parametros, contexto, executemany):
+        inicios = conexao.info.get('inicio_comando')
+        if not inicios:
+            return
+        duracao = time.perf_counter() - inicios.pop()
+
+        em_requisicao = getattr(_requisicao, 'inicio', None) is not None
+        if em_requisicao:
+            _requisicao.consultas += 1
+            _requisicao.tempo_sql += duracao
+        else:
+            registro.incrementar('sql_consultas_fora_de_requisicao_total')
+
+        if duracao >= self.sql_lenta:
+            rota = request.url_rule.rule if em_requisicao and request.url_rule is not None else '-'
+            registro.incrementar('sql_consultas_lentas_total', (rota,))
+            print(f"Consulta lenta ({duracao * 1000:.0f} ms) em {rota}: {_texto_consulta(comando)} "
+                  f"parâmetros {_formato_parametros(parametros)}")
+
+
+def _rotulos(nomes, valores, le=None):
+    pares = [f'{rotulo}="{_escapar(valor)}"' for rotulo, valor in zip(nomes, valores)]
+    if le is not None:
+        pares.append(f'le="{le}"')
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def agregar(instantaneos):
+    """Soma os instantâneos de vários workers, série a série"""
+    contadores = {}
+    histogramas = {}
+    for dados in instantaneos:
+        for nome, rotulos, valor in dados.get('contadores', []):
+            chave = (nome, tuple(rotulos))
+            contadores[chave] = contadores.get(chave, 0) + valor
+        for nome, rotulos, buckets, soma, total in dados.get('histogramas', []):
+            chave = (nome, tuple(rotulos))
+            atual = histogramas.get(chave)
+            if atual is None or len(atual[0]) != len(buckets):
+                # Buckets diferentes só aparecem entre versões; vale o mais recente
+                histogramas[chave] = [list(buckets), soma, total]
+            else:
+                atual[0] = [a + b for a, b in zip(atual[0], buckets)]
+                atual[1] += soma
+                atual[2] += total
+    return contadores, histogramas
+
+
+def formatar(contadores, histogramas):
+    """Formato texto do Prometheus (versão 0.0.4)"""
+    linhas = []
+    for nome, (tipo, descricao, nomes, limites) in METRICAS.items():
+        linhas.append(f'# HELP {PREFIXO}{nome} {descricao}')
+        linhas.append(f'# TYPE {PREFIXO}{nome} {tipo}')
+        if tipo == 'counter':
+            for (serie, rotulos), valor in sorted(contadores.items()):
+                if serie == nome:
+                    linhas.append(f'{PREFIXO}{nome}{_rotulos(nomes, rotulos)} {_numero(valor)}')
+        else:
+            for (serie, rotulos), (buckets, soma, total) in sorted(histogramas.items()):
+                if serie != nome:
+                    continue
+                acumulado = 0
+                for limite, quantidade in zip(list(limites) + ['+Inf'], buckets):
+                    acumulado += quantidade
+                    linhas.append(f'{PREFIXO}{nome}_bucket{_rotulos(nomes, rotulos, limite)} {acumulado}')
+                linhas.append(f'{PREFIXO}{nome}_sum{_rotulos(nomes, rotulos)} {_numero(soma)}')
+                linhas.append(f'{PREFIXO}{nome}_count{_rotulos(nomes, rotulos)} {total}')
+    return '\n'.join(linhas) + '\n'
+
+
+def exportar():
+    """Métricas de todos os workers no formato do Prometheus"""
+    instantaneos = [registro.instantaneo()]
+    if _instrumentacao is not None and _instrumentacao._arquivo:
+        _instrumentacao.gravar()
+        for caminho in glob.glob(os.path.join(_instrumentacao.diretorio, '*.json')):
+            if caminho == _instrumentacao._arquivo:
+                continue
+            try:
+                with open(caminho, encoding='utf-8') as arquivo:
+                    instantaneos.append(json.load(arquivo))
+            except (OSError, ValueError):
+                # Arquivo sendo trocado ou removido; entra na próxima coleta
+                pass
+    return formatar(*agregar(instantaneos))
+
+
+_instrumentacao = None
+
+
+def init_app(app):
+    """
+    METRICAS_ATIVAS (1), METRICAS_DIR (diretório compartilhado entre os
+    workers; padrão: temporário por master), METRICAS_INTERVALO (5 s) e
+    METRICAS_SQL_LENTA_MS (200).
+    """
+    global _instrumentacao
+    if os.getenv('METRICAS_ATIVAS', '1') != '1':
+        return
+
+    _instrumentacao = Instrumentacao(
+        app,
+        diretorio=os.getenv('METRICAS_DIR'),
+        intervalo=float(os.getenv('METRICAS_INTERVALO', '5')),
+        sql_lenta_ms=float(os.getenv('METRICAS_SQL_LENTA_MS', '200'))
+    )
+    app.before_request(_instrumentacao.antes)
+    app.after_request(_instrumentacao.depois)
+    app.teardown_request(_instrumentacao.finalizar)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _instrumentacao.antes_do_comando)
+    event.listen(engine, 'after_cursor_execute', _instrumentacao.depois_do_comando)
@@ -0,0 +1,169 @@
+import json
+from collections import deque, namedtuple
+from src.utils.texto import normalizar, tokenizar
+
+Intencao = namedtuple('Intencao', ['prioridade', 'tipo', 'valor'])
+
+# Grupos na mesma ordem de precedência do antigo if-chain
+GRUPO_ATENDENTE = 0
+GRUPO_FAQ = 1
+GRUPO_SAUDACAO = 2
+GRUPO_HORARIO = 3
+GRUPO_DEPARTAMENTO = 4
+
+PALAVRAS_ATENDENTE = ['atendente', 'humano', 'pessoa', 'falar com alguém', 'operador']
+SAUDACOES = ['oi', 'olá', 'bom dia', 'boa tarde', 'boa noite', 'hey', 'alo']
+PALAVRAS_HORARIO = ['horário', 'horarios', 'funciona']
+
+# Departamentos padrão e suas palavras-chave
+DEPARTAMENTOS_PADRAO = [
+    {
+        'id': 'vendas',
+        'mensagem': 'Vou transferir você para o departamento de Vendas.',
+        'palavras_chave': ['vendas', 'comprar', 'produto', 'produtos']
+    },
+    {
+        'id': 'suporte',
+        'mensagem': 'Vou transferir você para o Suporte Técnico.',
+        'palavras_chave': ['suporte', 'problema', 'problemas', 'ajuda', 'erro', 'erros']
+    },
+    {
+        'id': 'financeiro',
+        'mensagem': 'Vou transferir você para o departamento Financeiro.',
+        'palavras_chave': ['financeiro', 'boleto', 'boletos', 'pagamento', 'pagamentos', 'fatura', 'faturas']
+    }
+]
+
+
+def carregar_json(valor):
+    if not valor:
+        return []
+    if isinstance(valor, str):
+        try:
+            return json.loads(valor)
+        except ValueError:
+            return []
+    return valor
+
+
+class MotorIntencoes:
+    """
+    Casa todas as palavras-chave do bot em uma única passada pela mensagem.
+
+    As palavras-chave (inclusive expressões como 'bom dia') são compiladas
+    em um autômato Aho-Corasick sobre palavras, então só casam palavras
+    inteiras: 'oi' não casa dentro de 'boi'. Quando várias intenções casam,
+    vence a de menor prioridade, na mesma ordem do antigo if-chain.
+    """
+
+    def __init__(self, departamentos=None, perguntas_frequentes=None):
+        self._transicoes = [{}]
+        self._falha = [0]
+        self._melhor = [None]
+        self.total_palavras = 0
+
+        for palavra in PALAVRAS_ATENDENTE:
+            self.adicionar(palavra, Intencao((GRUPO_ATENDENTE, 0), 'atendente', None))
+        for palavra in SAUDACOES:
+            self.adicionar(palavra, Intencao((GRUPO_SAUDACAO, 0), 'saudacao', None))
+        for palavra in PALAVRAS_HORARIO:
+            self.adicionar(palavra, Intencao((GRUPO_HORARIO, 0), 'horario', None))
+
+        intencoes_departamento = {}
+        for departamento in DEPARTAMENTOS_PADRAO:
+            intencao = Intencao((GRUPO_DEPARTAMENTO, len(intencoes_departamento)), 'departamento', departamento)
+            intencoes_departamento[departamento['id']] = intencao
+            for palavra in departamento['palavras_chave']:
+                self.adicionar(palavra, intencao)
+
+        # Departamentos configurados no chatbot, com palavras-chave opcionais
+        for departamento in carregar_json(departamentos):
+            if not isinstance(departamento, dict) or not departamento.get('id'):
+                continue
+            palavras = list(departamento.get('palavras_chave', []))
+            intencao = intencoes_departamento.get(departamento['id'])
+            if intencao is None:
+                nome = departamento.get('nome') or departamento['id']
+                intencao = Intencao((GRUPO_DEPARTAMENTO, len(intencoes_departamento)), 'departamento', {
+                    'id': departamento['id'],
+                    'mensagem': f'Vou transferir você para o departamento {nome}.'
+                })
+                intencoes_departamento[departamento['id']] = intencao
+                palavras += [departamento['id'], nome]
+            for palavra in palavras:
+                self.adicionar(palavra, intencao)
+
+        for i, faq in enumerate(carregar_json(perguntas_frequentes)):
+            if not isinstance(faq, dict) or not faq.get('resposta'):
+                continue
+            intencao = Intencao((GRUPO_FAQ, i), 'faq', faq['resposta'])
+            for palavra in [faq.get('pergunta') or ''] + list(faq.get('palavras_chave', [])):
+                self.adicionar(palavra, intencao)
+
+        self._compilar()
+
+    def adicionar(self, palavra, intencao):
+        tokens = tokenizar(palavra)
+        if not tokens:
+            return
+
+        no = 0
+        for token in tokens:
+            proximo = self._transicoes[no].get(token)
+            if proximo is None:
+                proximo = len(self._transicoes)
+                self._transicoes.append({})
+                self._falha.append(0)
+                self._melhor.append(None)
+                self._transicoes[no][token] = proximo
+            no = proximo
+
+        atual = self._melhor[no]
+        if atual is None or intencao.prioridade < atual.prioridade:
+            self._melhor[no] = intencao
+        self.total_palavras += 1
+
+    def _compilar(self):
+        """Calcula os links de falha em largura (BFS), como no Aho-Corasick"""
+        fila = deque(self._transicoes[0].values())
+        while fila:
+            no = fila.popleft()
+            for token, filho in self._transicoes[no].items():
+                fila.append(filho)
+                falha = self._falha[no]
+                while falha and token not in self._transicoes[falha]:
+                    falha = self._falha[falha]
+                self._falha[filho] = self._transicoes[falha].get(token, 0)
+
+                # Cada nó guarda a melhor intenção entre ele e seus sufixos
+                herdada = self._melhor[self._falha[filho]]
+                if herdada is not None and (self._melhor[filho] is None or herdada.prioridade < self._melhor[filho].prioridade):
+                    self._melhor[filho] = herdada
+
+    def identificar(self, mensagem):
+        """Retorna a intenção de maior prioridade presente na mensagem, ou None"""
+        transicoes = self._transicoes
+        falha = self._falha
+        melhor_no = self._melhor
+
+        no = 0
+        melhor = None
+        for token in tokenizar(mensagem):
+            while no and token not in transicoes[no]:
+                no = falha[no]
+            no = transicoes[no].get(token, 0)
+            candidata = melhor_no[no]
+            if candidata is not None and (melhor is None or candidata.prioridade < melhor.prioridade):
+                melhor = candidata
+        return melhor
+
+
+_motor_padrao = None
+
+
+def motor_padrao():
+    """Motor só com as palavras-chave embutidas, usado quando não há configuração"""
+    global _motor_padrao
+    if _motor_padrao is None:
+        _motor_padrao = MotorIntencoes()
+    return _motor_padrao
@@ -0,0 +1,294 @@
+import heapq
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+import click
+from sqlalchemy import select
+from src.models.user import db
+from src.models.atendimento import Agente, AgenteDepartamento, Atendimento
+from src.services import fila
+from src.services.versoes import FILA, obter_versao
+from src.services.eventos import (
+    LimiteAssinantes, obter_barramento, publicar_evento, FILA_ATUALIZADA, ATENDIMENTO_ATRIBUIDO
+)
+
+POLITICAS = ('menos_ocupado', 'round_robin')
+
+
+class Roteador:
+    """
+    Decide qual agente recebe cada atendimento da fila, sem acessar o banco.
+
+    A fila fica em um heap ordenado por (prioridade desc, iniciado_em), então
+    cada rodada só olha o topo. A política escolhe entre os agentes livres:
+    'menos_ocupado' (menor ocupação relativa) ou 'round_robin'. Com afinidade,
+    agentes do departamento do atendimento têm preferência; com afinidade
+    estrita, o atendimento espera por um deles.
+    """
+
+    def __init__(self, politica='menos_ocupado', afinidade=True, afinidade_estrita=False):
+        if politica not in POLITICAS:
+            raise ValueError(f'Política de roteamento inválida: {politica}')
+        self.politica = politica
+        self.afinidade = afinidade
+        self.afinidade_estrita = afinidade_estrita
+        self._heap = []
+        self._ids = set()
+        self._ultimo_agente = None
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, atendimento_id):
+        return atendimento_id in self._ids
+
+    def ids(self):
+        return set(self._ids)
+
+    def adicionar(self, atendimento_id, prioridade, iniciado_em, departamento=None):
+        if atendimento_id in self._ids:
+            return
+        self._ids.add(atendimento_id)
+        heapq.heappush(self._heap, (-(prioridade or 0), iniciado_em or datetime.min, atendimento_id, departamento))
+
+    def remover(self, atendimento_id):
+        # Remoção preguiçosa: o item é descartado quando chegar ao topo
+        self._ids.discard(atendimento_id)
+
+    def substituir(self, itens):
+        """Reconstrói o heap a partir de um snapshot completo da fila"""
+        self._heap = [(-(p or 0), i or datetime.min, a, d) for a, p, i, d in itens]
+        heapq.heapify(self._heap)
+        self._ids = {item[2] for item in self._heap}
+
+    def _candidatos(self, departamento, livres):
+        if not self.afinidade or not departamento:
+            return livres
+        do_departamento = [a for a in livres if departamento in a['departamentos']]
+        if do_departamento or self.afinidade_estrita:
+            return do_departamento
+        return livres
+
+    def _escolher(self, candidatos):
+        if self.politica == 'round_robin':
+            ordenados = sorted(candidatos, key=lambda a: a['id'])
+            if self._ultimo_agente is not None:
+                for agente in ordenados:
+                    if agente['id'] > self._ultimo_agente:
+                        return agente
+            return ordenados[0]
+        return min(candidatos, key=lambda a: (a['ativos'] / a['max'], a['ativos'], a['id']))
+
+    def distribuir(self, agentes):
+        """
+        Distribui o máximo possível da fila entre os agentes informados.
+        `agentes` é uma lista de dicts com id, ativos, max e departamentos;
+        os contadores `ativos` são atualizados conforme as atribuições.
+        Retorna a lista de (item, agente_id).
+        """
+        livres = [a for a in agentes if a['ativos'] < a['max']]
+        atribuicoes = []
+        adiados = []
+
+        while self._heap and livres:
+            item = heapq.heappop(self._heap)
+            atendimento_id = item[2]
+            if atendimento_id not in self._ids:
+                continue
+
+            candidatos = self._candidatos(item[3], livres)
+            if not candidatos:
+                adiados.append(item)
+                continue
+
+            agente = self._escolher(candidatos)
+            self._ids.discard(atendimento_id)
+            self._ultimo_agente = agente['id']
+            agente['ativos'] += 1
+            if agente['ativos'] >= agente['max']:
+                livres.remove(agente)
+            atribuicoes.append((item, agente['id']))
+
+        for item in adiados:
+            heapq.heappush(self._heap, item)
+        return atribuicoes
+
+    def devolver(self, item):
+        """Recoloca um item cuja atribuição não se concretizou"""
+        _, iniciado_em, atendimento_id, departamento = item
+        self.adicionar(atendimento_id, -item[0], iniciado_em, departamento)
+
+
+class ServicoRoteamento:
+    """
+    Laço que mantém o Roteador sincronizado com o banco e aplica as
+    atribuições com fila.atribuir (compare-and-set), então convive com
+    agentes pegando atendimentos manualmente.
+
+    A cada volta lê só a versão FILA de versoes_recurso, incrementada por
+    toda escrita que muda a fila. Quando ela muda, relê os ids da fila
+    (cobertos por ix_atendimentos_fila) e carrega os detalhes apenas dos
+    que o roteador ainda não conhece, inclusive os que voltaram do bot com
+    id antigo: o `flask rotear` separado não depende de ver os eventos dos
+    workers web. Os eventos do barramento só antecipam a volta; um
+    snapshot completo é feito a cada `ressincronizar` segundos.
+    """
+
+    def __init__(self, app, roteador, intervalo=1.0, ressincronizar=60):
+        self.app = app
+        self.roteador = roteador
+        self.intervalo = intervalo
+        self.ressincronizar = ressincronizar
+        self._ultimo_snapshot = 0.0
+        self._versao_fila = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self.executar, daemon=True)
+            self._thread.start()
+
+    def executar(self):
+        with self.app.app_context():
+            barramento = obter_barramento()
+            try:
+                assinatura = barramento.assinar()
+            except LimiteAssinantes:
+                # Sem vaga no barramento o roteador só perde a antecipação por eventos
+                assinatura = None
+            try:
+                while True:
+                    self._esperar(assinatura)
+                    try:
+                        self.rodada()
+                    except Exception as e:
+                        db.session.rollback()
+                        print(f"Erro no roteamento: {str(e)}")
+                    finally:
+                        db.session.remove()
+            finally:
+                if assinatura is not None:
+                    barramento.cancelar(assinatura)
+
+    def _esperar(self, assinatura):
+        """Espera o intervalo, ou menos se chegar um evento de fila deste processo"""
+        if assinatura is None:
+            time.sleep(self.intervalo)
+            return
+        prazo = time.monotonic() + self.intervalo
+        try:
+            while assinatura.get(timeout=max(0, prazo - time.monotonic()))['tipo'] != FILA_ATUALIZADA:
+                pass
+            # Junta a rajada: a fila é relida do banco de qualquer forma
+            while True:
+                assinatura.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _carregar(self, *condicoes):
+        return db.session.query(
+            Atendimento.id, Atendimento.prioridade, Atendimento.iniciado_em, Atendimento.departamento
+        ).filter(Atendimento.status == 'fila', *condicoes).all()
+
+    def sincronizar(self):
+        # Lida antes da fila: uma mudança que chegue entre as duas leituras aparece na próxima volta
+        versao = obter_versao(FILA)
+        if time.monotonic() - self._ultimo_snapshot >= self.ressincronizar:
+            self.roteador.substituir(self._carregar())
+            self._ultimo_snapshot = time.monotonic()
+            self._versao_fila = versao
+            return
+        if versao == self._versao_fila:
+            return
+        self._versao_fila = versao
+
+        na_fila = set(db.session.execute(
+            select(Atendimento.id).where(Atendimento.status == 'fila')
+        ).scalars())
+        # Pegos manualmente ou que saíram da fila desde a última volta
+        for atendimento_id in self.roteador.ids() - na_fila:
+            self.roteador.remover(atendimento_id)
+        desconhecidos = [i for i in na_fila if i not in self.roteador]
+        if desconhecidos:
+            for atendimento_id, prioridade, iniciado_em, departamento in self._carregar(
+                Atendimento.id.in_(desconhecidos)
+            ):
+                self.roteador.adicionar(atendimento_id, prioridade, iniciado_em, departamento)
+
+    def agentes_disponiveis(self):
+        agentes = {
+            a.id: {'id': a.id, 'ativos': a.atendimentos_ativos or 0, 'max': a.max_atendimentos or 0, 'departamentos': set()}
+            for a in db.session.query(Agente.id, Agente.atendimentos_ativos, Agente.max_atendimentos).filter(
+                Agente.status == 'online',
+                Agente.atendimentos_ativos < Agente.max_atendimentos
+            )
+        }
+        if agentes and self.roteador.afinidade:
+            for agente_id, departamento in db.session.query(
+                AgenteDepartamento.agente_id, AgenteDepartamento.departamento
+            ).filter(AgenteDepartamento.agente_id.in_(list(agentes))):
+                agentes[agente_id]['departamentos'].add(departamento)
+        return list(agentes.values())
+
+    def rodada(self):
+        """Sincroniza a fila e aplica uma rodada de atribuições; retorna quantas deram certo"""
+        self.sincronizar()
+        if not len(self.roteador):
+            return 0
+
+        atribuidos = 0
+        for item, agente_id in self.roteador.distribuir(self.agentes_disponiveis()):
+            try:
+                atendimento = fila.atribuir(item[2], agente_id, status_esperados=('fila',))
+            except fila.AtendimentoIndisponivel:
+                # Já foi pego manualmente ou saiu da fila
+                continue
+            except fila.CapacidadeEsgotada:
+                self.roteador.devolver(item)
+                continue
+            atribuidos += 1
+            publicar_evento(ATENDIMENTO_ATRIBUIDO, {
+                'atendimento_id': atendimento.id,
+                'agente_id': atendimento.agente_id
+            })
+        return atribuidos
+
+
+def criar_servico(app):
+    roteador = Roteador(
+        politica=os.getenv('ROTEADOR_POLITICA', 'menos_ocupado'),
+        afinidade=os.getenv('ROTEADOR_AFINIDADE', '1') == '1',
+        afinidade_estrita=os.getenv('ROTEADOR_AFINIDADE_ESTRITA', '0') == '1'
+    )
+    return ServicoRoteamento(
+        app,
+        roteador,
+        intervalo=float(os.getenv('ROTEADOR_INTERVALO', '1')),
+        ressincronizar=float(os.getenv('ROTEADOR_RESSINCRONIZAR', '60'))
+    )
+
+
+def init_app(app):
+    """
+    Registra o comando `flask rotear`. Com ROTEADOR_ATIVO=1 o roteador também
+    roda dentro do processo web (indicado apenas com um único worker).
+    """
+    @app.cli.command('rotear')
+    def rotear_comando():
+        """Roda o roteamento automático da fila em primeiro plano"""
+        servico = criar_servico(app)
+        click.echo(f'Roteador iniciado (política: {servico.roteador.politica})')
+        servico.executar()
+
+    if os.getenv('ROTEADOR_ATIVO') == '1':
+        servico = criar_servico(app)
+        app.before_request(servico.iniciar)
@@ -0,0 +1,195 @@
+import json
+import click
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.atendimento import Tag, Cliente, ClienteTag, Atendimento, AtendimentoTag
+
+TAMANHO_TAG = Tag.nome.type.length
+
+# Modelo dono das tags -> (associação, coluna do dono na associação)
+ASSOCIACOES = {
+    Cliente: (ClienteTag, ClienteTag.cliente_id),
+    Atendimento: (AtendimentoTag, AtendimentoTag.atendimento_id),
+}
+
+
+def normalizar_nomes(nomes):
+    """Remove espaços, vazios e repetições, preservando a ordem"""
+    if isinstance(nomes, str):
+        nomes = [nomes]
+    resultado = []
+    for nome in nomes or []:
+        nome = str(nome).strip()[:TAMANHO_TAG]
+        if nome and nome not in resultado:
+            resultado.append(nome)
+    return resultado
+
+
+def obter_ids(nomes, criar=True):
+    """
+    Mapeia nomes de tags para ids. Tags inexistentes são criadas em um
+    savepoint; se outra requisição criar a mesma tag ao mesmo tempo, a
+    violação da constraint única é ignorada e o id existente é usado.
+    """
+    nomes = normalizar_nomes(nomes)
+    if not nomes:
+        return {}
+    ids = dict(db.session.execute(select(Tag.nome, Tag.id).where(Tag.nome.in_(nomes))).all())
+    if criar:
+        for nome in nomes:
+            if nome in ids:
+                continue
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(Tag.__table__.insert().values(nome=nome))
+            except IntegrityError:
+                pass
+            ids[nome] = db.session.execute(select(Tag.id).where(Tag.nome == nome)).scalar_one()
+    return ids
+
+
+def _inserir_associacoes(associacao, coluna, registro_id, tag_ids):
+    existentes = set(db.session.execute(
+        select(associacao.tag_id).where(coluna == registro_id, associacao.tag_id.in_(tag_ids))
+    ).scalars())
+    for tag_id in tag_ids:
+        if tag_id in existentes:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.execute(associacao.__table__.insert().values({'tag_id': tag_id, coluna.key: registro_id}))
+        except IntegrityError:
+            # Outra requisição adicionou a mesma tag: o estado final é o desejado
+            pass
+
+
+def _expirar(registro):
+    if registro is not None and registro in db.session:
+        db.session.expire(registro, ['lista_tags'])
+
+
+def adicionar(registro, nomes):
+    """Adiciona tags a um cliente ou atendimento sem reescrever as demais"""
+    associacao, coluna = ASSOCIACOES[type(registro)]
+    tag_ids = list(obter_ids(nomes).values())
+    if tag_ids:
+        _inserir_associacoes(associacao, coluna, registro.id, tag_ids)
+    _expirar(registro)
+
+
+def remover(registro, nomes):
+    """Remove tags com um único DELETE, sem ler a lista atual"""
+    associacao, coluna = ASSOCIACOES[type(registro)]
+    tag_ids = list(obter_ids(nomes, criar=False).values())
+    if tag_ids:
+        db.session.execute(associacao.__table__.delete().where(
+            coluna == registro.id, associacao.tag_id.in_(tag_ids)
+        ))
+    _expirar(registro)
+
+
+def definir(registro, nomes):
+    """Substitui o conjunto de tags do registro"""
+    associacao, coluna = ASSOCIACOES[type(registro)]
+    tag_ids = list(obter_ids(nomes).values())
+    remocao = associacao.__table__.delete().where(coluna == registro.id)
+    if tag_ids:
+        remocao = remocao.where(associacao.tag_id.notin_(tag_ids))
+        _inserir_associacoes(associacao, coluna, registro.id, tag_ids)
+    db.session.execute(remocao)
+    if registro.tags_legado is not None:
+        registro.tags_legado = None
+    _expirar(registro)
+
+
+def filtrar(modelo, nome, limite, antes_de=None):
+    """
+    Ids dos registros com a tag, do mais novo para o mais antigo, usando
+    a PK (tag_id, id) da associação. Retorna limite + 1 ids para o
+    chamador saber se há próxima página.
+    """
+    associacao, coluna = ASSOCIACOES[modelo]
+    query = select(coluna).join(Tag, Tag.id == associacao.tag_id).where(Tag.nome == nome)
+    if antes_de is not None:
+        query = query.where(coluna < antes_de)
+    return db.session.execute(query.order_by(coluna.desc()).limit(limite + 1)).scalars().all()
+
+
+def _ler_legado(valor):
+    try:
+        nomes = json.loads(valor)
+    except ValueError:
+        # Valor que não é JSON vira uma tag só, em vez de ser descartado
+        return normalizar_nomes([valor])
+    return normalizar_nomes(nomes if isinstance(nomes, list) else [nomes])
+
+
+def _migrar_lote(modelo, ultimo_id, lote):
+    associacao, coluna = ASSOCIACOES[modelo]
+    linhas = db.session.execute(
+        select(modelo.id, modelo.tags_legado).where(
+            modelo.tags_legado.isnot(None), modelo.id > ultimo_id
+        ).order_by(modelo.id).limit(lote)
+    ).all()
+    if not linhas:
+        return None, 0
+
+    por_registro = {registro_id: _ler_legado(valor) for registro_id, valor in linhas}
+    ids = obter_ids({nome for nomes in por_registro.values() for nome in nomes})
+    existentes = set(db.session.execute(
+        select(coluna, associacao.tag_id).where(coluna.in_(list(por_registro)))
+    ).all())
+    novas = [
+        {coluna.key: registro_id, 'tag_id': ids[nome]}
+        for registro_id, nomes in por_registro.items()
+        for nome in nomes
+        if (registro_id, ids[nome]) not in existentes
+    ]
+    if novas:
+        db.session.execute(associacao.__table__.insert(), novas)
+    db.session.execute(
+        update(modelo).where(modelo.id.in_(list(por_registro))).values(tags_legado=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return linhas[-1][0], len(linhas)
+
+
+def migrar(lote=1000, tentativas=3):
+    """
+    Converte as tags antigas (JSON na coluna tags) para as tabelas
+    normalizadas, em lotes com um commit por lote. Registros convertidos
+    têm a coluna antiga zerada, então a migração pode ser interrompida e
+    rodada de novo (inclusive por vários processos ao mesmo tempo).
+    """
+    totais = {}
+    for modelo in ASSOCIACOES:
+        ultimo_id = 0
+        total = 0
+        falhas = 0
+        while True:
+            try:
+                ultimo, quantidade = _migrar_lote(modelo, ultimo_id, lote)
+            except IntegrityError:
+                # Outro processo migrou parte do lote; relê a partir do mesmo ponto
+                db.session.rollback()
+                falhas += 1
+                if falhas >= tentativas:
+                    raise
+                continue
+            if ultimo is None:
+                break
+            ultimo_id = ultimo
+            total += quantidade
+        totais[modelo.__tablename__] = total
+    return totais
+
+
+def init_app(app):
+    @app.cli.command('migrar-tags')
+    @click.option('--lote', default=1000, show_default=True)
+    def migrar_comando(lote):
+        """Converte tags em JSON para as tabelas tags/clientes_tags/atendimentos_tags"""
+        for tabela, total in migrar(lote).items():
+            click.echo(f'{tabela}: {total} registro(s) convertido(s)')
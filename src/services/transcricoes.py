@@ -0,0 +1,140 @@
+import csv
+import io
+import json
+import zlib
+import click
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from src.models.user import db
+from src.models.atendimento import Agente, Atendimento, AtendimentoArquivado, Cliente, Mensagem, MensagemArquivada
+from src.utils.paginacao import ParametroInvalido, ler_data
+
+FORMATOS = ('ndjson', 'csv')
+LOTE = 5000
+COLUNAS = [
+    'mensagem_id', 'enviada_em', 'remetente', 'tipo', 'conteudo', 'arquivo_url',
+    'atendimento_id', 'status', 'departamento', 'assunto', 'iniciado_em', 'finalizado_em',
+    'cliente_id', 'cliente_nome', 'cliente_telefone',
+    'agente_id', 'agente_nome'
+]
+
+AgenteMensagem = aliased(Agente)
+
+
+def consulta(desde=None, ate=None, departamento=None, arquivo=False):
+    """
+    Mensagens com os dados do atendimento, do cliente e do agente, em ordem
+    de envio. O agente é o autor da mensagem ou, nas mensagens do cliente e
+    do bot, o agente do atendimento. `ate` é exclusivo, como nas listagens.
+    Com `arquivo`, lê as tabelas de atendimentos e mensagens arquivados.
+    """
+    mensagem, atendimento = (MensagemArquivada, AtendimentoArquivado) if arquivo else (Mensagem, Atendimento)
+    comando = select(
+        mensagem.id.label('mensagem_id'), mensagem.enviada_em, mensagem.remetente, mensagem.tipo,
+        mensagem.conteudo, mensagem.arquivo_url,
+        atendimento.id.label('atendimento_id'), atendimento.status, atendimento.departamento,
+        atendimento.assunto, atendimento.iniciado_em, atendimento.finalizado_em,
+        Cliente.id.label('cliente_id'), Cliente.nome.label('cliente_nome'), Cliente.telefone.label('cliente_telefone'),
+        db.func.coalesce(mensagem.agente_id, atendimento.agente_id).label('agente_id'),
+        db.func.coalesce(AgenteMensagem.nome, Agente.nome).label('agente_nome')
+    ).join(
+        atendimento, atendimento.id == mensagem.atendimento_id
+    ).join(
+        Cliente, Cliente.id == mensagem.cliente_id
+    ).outerjoin(
+        AgenteMensagem, AgenteMensagem.id == mensagem.agente_id
+    ).outerjoin(
+        Agente, Agente.id == atendimento.agente_id
+    ).order_by(mensagem.enviada_em, mensagem.id)
+
+    if desde:
+        comando = comando.where(mensagem.enviada_em >= desde)
+    if ate:
+        comando = comando.where(mensagem.enviada_em < ate)
+    if departamento:
+        comando = comando.where(atendimento.departamento == departamento)
+    return comando
+
+
+def _registro(linha):
+    registro = dict(linha._mapping)
+    for campo in ('enviada_em', 'iniciado_em', 'finalizado_em'):
+        if registro[campo]:
+            registro[campo] = registro[campo].isoformat()
+    return registro
+
+
+def exportar(formato, desde=None, ate=None, departamento=None, compactar=None, lote=LOTE):
+    """
+    Gera a exportação em pedaços de bytes, um por lote do cursor no
+    servidor (yield_per): a memória usada é a de um lote, qualquer que seja
+    o período. Mensagens arquivadas saem antes das da tabela quente. CSV
+    sai compactado em gzip por padrão; NDJSON, só com compactar=True.
+    """
+    if compactar is None:
+        compactar = formato == 'csv'
+    # wbits=31: stream gzip completo (cabeçalho e CRC), legível por gunzip
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compactar else None
+
+    saida = io.StringIO()
+    escritor = csv.writer(saida)
+    if formato == 'csv':
+        escritor.writerow(COLUNAS)
+
+    # O arquivo só tem atendimentos mais antigos, então vem primeiro
+    resultados = (
+        db.session.execute(consulta(desde, ate, departamento, arquivo).execution_options(yield_per=lote))
+        for arquivo in (True, False)
+    )
+    for linhas in (particao for resultado in resultados for particao in resultado.partitions()):
+        for linha in linhas:
+            registro = _registro(linha)
+            if formato == 'csv':
+                escritor.writerow([registro[c] for c in COLUNAS])
+            else:
+                saida.write(json.dumps(registro, ensure_ascii=False))
+                saida.write('\n')
+        dados = saida.getvalue().encode('utf-8')
+        saida.seek(0)
+        saida.truncate()
+        if compressor:
+            dados = compressor.compress(dados)
+        if dados:
+            yield dados
+
+    dados = saida.getvalue().encode('utf-8')
+    if compressor:
+        dados = compressor.compress(dados) + compressor.flush()
+    if dados:
+        yield dados
+
+
+def nome_arquivo(formato, compactar=None):
+    if compactar is None:
+        compactar = formato == 'csv'
+    return f"transcricoes.{formato}{'.gz' if compactar else ''}"
+
+
+def init_app(app):
+    @app.cli.command('exportar-transcricoes')
+    @click.option('--formato', type=click.Choice(FORMATOS), default='ndjson')
+    @click.option('--desde', help='data ou data/hora ISO (inclusiva)')
+    @click.option('--ate', help='data ou data/hora ISO; uma data inclui o dia inteiro')
+    @click.option('--departamento')
+    @click.option('--gzip/--sem-gzip', 'compactar', default=None, help='padrão: gzip só no CSV')
+    @click.option('--saida', type=click.Path(dir_okay=False, writable=True), help='arquivo de saída (padrão: stdout)')
+    def exportar_comando(formato, desde, ate, departamento, compactar, saida):
+        """Exporta as mensagens com os dados do atendimento em NDJSON ou CSV"""
+        try:
+            desde = ler_data(desde)
+            ate = ler_data(ate, fim_do_dia=True)
+        except ParametroInvalido as e:
+            raise click.BadParameter(str(e))
+
+        destino = open(saida, 'wb') if saida else click.get_binary_stream('stdout')
+        try:
+            for dados in exportar(formato, desde, ate, departamento, compactar):
+                destino.write(dados)
+        finally:
+            if saida:
+                destino.close()
@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+from datetime import datetime
+from functools import wraps
+from flask import make_response, request
+from sqlalchemy import event
+from src.models.user import db
+from src.models.atendimento import VersaoRecurso
+from src.utils.upsert import inserir_ignorando
+
+# Recursos observados pelas listagens com ETag
+FILA = 'fila'
+AGENTES = 'agentes'
+CLIENTES = 'clientes'
+
+
+def atendimentos_do_agente(agente_id):
+    return f'agente:{agente_id}:atendimentos'
+
+
+def obter_versao(recurso):
+    """Versão atual do recurso (0 se nunca foi alterado)"""
+    versao = db.session.query(VersaoRecurso.versao).filter_by(recurso=recurso).scalar()
+    return versao or 0
+
+
+def incrementar_versao(recurso):
+    """
+    Incrementa a versão do recurso dentro da transação atual.
+    Deve ser chamado antes do commit da escrita que alterou o recurso.
+    """
+    valores = {VersaoRecurso.versao: VersaoRecurso.versao + 1, VersaoRecurso.atualizado_em: datetime.utcnow()}
+    atualizados = VersaoRecurso.query.filter_by(recurso=recurso).update(valores, synchronize_session=False)
+    if not atualizados:
+        # Primeira alteração: duas transações podem chegar aqui juntas, então a linha é criada sem conflito
+        inserir_ignorando(VersaoRecurso.__table__, [{'recurso': recurso, 'versao': 0}], ['recurso'])
+        VersaoRecurso.query.filter_by(recurso=recurso).update(valores, synchronize_session=False)
+    db.session.info['versoes_alteradas'] = True
+
+
+def incrementar_versoes(*recursos):
+    """Incrementa vários recursos, sempre na mesma ordem para não haver deadlock entre transações"""
+    for recurso in sorted(set(r for r in recursos if r)):
+        incrementar_versao(recurso)
+
+
+def recursos_do_atendimento(status, agente_id):
+    """Listagens em que um atendimento com esse status e agente aparece"""
+    recursos = []
+    if status == 'fila':
+        recursos.append(FILA)
+    if agente_id:
+        recursos.append(atendimentos_do_agente(agente_id))
+    return recursos
+
+
+class CacheVersoes:
+    """
+    Versões de todos os recursos em memória, relidas do banco (uma única
+    consulta) no máximo a cada `ttl` segundos. Commits deste processo que
+    incrementam versões descartam o cache na hora; os de outros workers
+    aparecem em até `ttl` segundos, menos que a espera do frontend antes
+    de recarregar após um evento.
+    """
+
+    def __init__(self, ttl=0.25):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._versoes = {}
+        self._validade = 0.0
+
+    def obter(self, recursos):
+        if time.monotonic() >= self._validade:
+            with self._lock:
+                if time.monotonic() >= self._validade:
+                    self._versoes = dict(db.session.query(VersaoRecurso.recurso, VersaoRecurso.versao).all())
+                    self._validade = time.monotonic() + self.ttl
+        versoes = self._versoes
+        return [versoes.get(recurso, 0) for recurso in recursos]
+
+    def invalidar(self):
+        self._validade = 0.0
+
+
+cache_versoes = CacheVersoes(ttl=float(os.getenv('VERSOES_TTL', '0.25')))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apos_commit(sessao):
+    if sessao.info.pop('versoes_alteradas', False):
+        cache_versoes.invalidar()
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _apos_rollback(sessao, transacao_anterior):
+    sessao.info.pop('versoes_alteradas', None)
+
+
+def com_etag(*recursos):
+    """
+    GET condicional para listagens. O ETag é formado pelas versões dos
+    `recursos` (nomes ou funções que recebem os argumentos da rota); se o
+    If-None-Match confere, responde 304 sem executar a rota.
+    """
+    def decorador(funcao):
+        @wraps(funcao)
+        def rota(**kwargs):
+            nomes = [r(**kwargs) if callable(r) else r for r in recursos]
+            try:
+                etag = '.'.join(str(v) for v in cache_versoes.obter(nomes))
+            except Exception:
+                # Sem as versões, a rota responde normalmente (e trata o erro do banco)
+                db.session.rollback()
+                return funcao(**kwargs)
+
+            if request.if_none_match.contains_weak(etag):
+                resposta = make_response('', 304)
+            else:
+                resposta = make_response(funcao(**kwargs))
+                if resposta.status_code != 200:
+                    return resposta
+            resposta.set_etag(etag, weak=True)
+            # O navegador sempre revalida; o corpo só volta quando algo mudou
+            resposta.headers['Cache-Control'] = 'no-cache'
+            return resposta
+        return rota
+    return decorador
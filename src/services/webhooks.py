@@ -0,0 +1,261 @@
+import json
+import os
+import queue
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy import and_, event
+from src.models.user import db
+from src.models.atendimento import Webhook, EntregaWebhook
+from src.utils.serializacao import dumps
+
+
+class EntregadorWebhooks:
+    """
+    Entrega os webhooks gravados na tabela `entregas_webhook` em segundo plano.
+
+    Um único laço por processo reivindica as entregas vencidas, envia em um
+    pool limitado de threads (com uma sessão keep-alive por host) e grava os
+    resultados em lote. Falhas são reagendadas com backoff exponencial.
+    """
+
+    def __init__(self, app=None, workers=4, timeout=10, max_tentativas=5,
+                 backoff_base=2, backoff_maximo=3600, intervalo=1.0, lease=60):
+        self.app = app
+        self.workers = workers
+        self.timeout = timeout
+        self.max_tentativas = max_tentativas
+        self.backoff_base = backoff_base
+        self.backoff_maximo = backoff_maximo
+        self.intervalo = intervalo
+        self.lease = lease
+
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._resultados = queue.Queue()
+        self._sessoes = {}
+        self._em_voo = 0
+        self._pool = None
+        self._thread = None
+        self._pid = None
+
+    def iniciar(self):
+        # Criado sob demanda em cada processo, depois do fork do gunicorn
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._sessoes = {}
+            self._em_voo = 0
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='webhook')
+            self._thread = threading.Thread(target=self._executar, daemon=True)
+            self._thread.start()
+
+    def notificar(self):
+        """Acorda o laço de entrega sem esperar o próximo intervalo"""
+        self.iniciar()
+        self._acordar.set()
+
+    def calcular_backoff(self, tentativas):
+        return min(self.backoff_base * (2 ** (tentativas - 1)), self.backoff_maximo)
+
+    def _sessao(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            sessao = self._sessoes.get(host)
+            if sessao is None:
+                sessao = requests.Session()
+                adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+                sessao.mount('http://', adaptador)
+                sessao.mount('https://', adaptador)
+                self._sessoes[host] = sessao
+        return sessao
+
+    def _executar(self):
+        with self.app.app_context():
+            while True:
+                self._acordar.wait(timeout=self.intervalo)
+                self._acordar.clear()
+                try:
+                    self._gravar_resultados()
+                    self._despachar()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Erro no entregador de webhooks: {str(e)}")
+                finally:
+                    db.session.remove()
+
+    def _despachar(self):
+        with self._lock:
+            livres = self.workers * 2 - self._em_voo
+        if livres <= 0:
+            return
+
+        for entrega in self._reivindicar(livres):
+            with self._lock:
+                self._em_voo += 1
+            self._pool.submit(self._enviar, entrega)
+
+    def _reivindicar(self, limite):
+        """Marca entregas vencidas como 'enviando' e retorna os dados para envio"""
+        agora = datetime.utcnow()
+        candidatas = db.session.query(EntregaWebhook, Webhook).join(
+            Webhook, Webhook.id == EntregaWebhook.webhook_id
+        ).filter(
+            EntregaWebhook.status.in_(['pendente', 'enviando']),
+            EntregaWebhook.proxima_tentativa <= agora
+        ).order_by(EntregaWebhook.proxima_tentativa).limit(limite).all()
+
+        reivindicadas = []
+        for entrega, webhook in candidatas:
+            # Compare-and-set: outro worker pode ter pego a mesma entrega
+            resultado = db.session.execute(
+                EntregaWebhook.__table__.update().where(and_(
+                    EntregaWebhook.id == entrega.id,
+                    EntregaWebhook.status == entrega.status,
+                    EntregaWebhook.proxima_tentativa == entrega.proxima_tentativa
+                )).values(
+                    status='enviando',
+                    proxima_tentativa=agora + timedelta(seconds=self.lease)
+                )
+            )
+            if resultado.rowcount == 1:
+                reivindicadas.append({
+                    'id': entrega.id,
+                    'webhook_id': webhook.id,
+                    'url': webhook.url,
+                    'headers': webhook.headers,
+                    'payload': entrega.payload,
+                    'tentativas': entrega.tentativas or 0
+                })
+        db.session.commit()
+        return reivindicadas
+
+    def _enviar(self, entrega):
+        erro = None
+        try:
+            headers = json.loads(entrega['headers']) if entrega['headers'] else {}
+            headers['Content-Type'] = 'application/json'
+            response = self._sessao(entrega['url']).post(
+                entrega['url'],
+                data=entrega['payload'],
+                headers=headers,
+                timeout=self.timeout
+            )
+            if response.status_code >= 400:
+                erro = f'HTTP {response.status_code}'
+        except Exception as e:
+            erro = str(e)
+        finally:
+            with self._lock:
+                self._em_voo -= 1
+
+        self._resultados.put((entrega, erro, datetime.utcnow()))
+        self._acordar.set()
+
+    def _gravar_resultados(self):
+        """Grava em lote o resultado das entregas concluídas desde a última volta"""
+        atualizacoes = []
+        execucoes = defaultdict(int)
+        ultima_execucao = {}
+
+        while True:
+            try:
+                entrega, erro, momento = self._resultados.get_nowait()
+            except queue.Empty:
+                break
+
+            tentativas = entrega['tentativas'] + 1
+            execucoes[entrega['webhook_id']] += 1
+            ultima_execucao[entrega['webhook_id']] = momento
+
+            if erro is None:
+                atualizacoes.append({
+                    'id': entrega['id'], 'status': 'entregue', 'tentativas': tentativas,
+                    'entregue_em': momento, 'ultimo_erro': None
+                })
+            elif tentativas >= self.max_tentativas:
+                atualizacoes.append({
+                    'id': entrega['id'], 'status': 'falhou', 'tentativas': tentativas,
+                    'ultimo_erro': erro
+                })
+            else:
+                atualizacoes.append({
+                    'id': entrega['id'], 'status': 'pendente', 'tentativas': tentativas,
+                    'ultimo_erro': erro,
+                    'proxima_tentativa': momento + timedelta(seconds=self.calcular_backoff(tentativas))
+                })
+
+        if not atualizacoes:
+            return
+
+        db.session.bulk_update_mappings(EntregaWebhook, atualizacoes)
+        for webhook_id, total in execucoes.items():
+            Webhook.query.filter_by(id=webhook_id).update({
+                Webhook.total_execucoes: db.func.coalesce(Webhook.total_execucoes, 0) + total,
+                Webhook.ultima_execucao: ultima_execucao[webhook_id]
+            }, synchronize_session=False)
+        db.session.commit()
+
+
+entregador = EntregadorWebhooks()
+
+
+def init_app(app):
+    entregador.app = app
+    entregador.workers = int(os.getenv('WEBHOOK_WORKERS', '4'))
+    entregador.timeout = float(os.getenv('WEBHOOK_TIMEOUT', '10'))
+    entregador.max_tentativas = int(os.getenv('WEBHOOK_MAX_TENTATIVAS', '5'))
+    entregador.backoff_base = float(os.getenv('WEBHOOK_BACKOFF_BASE', '2'))
+
+    # Retoma entregas pendentes assim que o worker atender a primeira requisição
+    app.before_request(entregador.iniciar)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apos_commit(sessao):
+    # As entregas só ficam visíveis ao entregador depois do commit de quem as gravou
+    if sessao.info.pop('webhooks_pendentes', False):
+        entregador.notificar()
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _apos_rollback(sessao, transacao_anterior):
+    sessao.info.pop('webhooks_pendentes', None)
+
+
+def enfileirar_webhooks(evento, dados):
+    """
+    Grava uma entrega por webhook ativo do evento na transação do chamador
+    (outbox): as entregas existem se e somente se a mudança que as gerou
+    for confirmada. Não faz commit; o envio começa depois do commit.
+    """
+    webhook_ids = [linha.id for linha in db.session.query(Webhook.id).filter(
+        Webhook.evento == evento,
+        Webhook.ativo.is_(True)
+    )]
+    if not webhook_ids:
+        return 0
+
+    payload = dumps(dados)
+    agora = datetime.utcnow()
+    db.session.execute(EntregaWebhook.__table__.insert(), [
+        {
+            'webhook_id': webhook_id,
+            'evento': evento,
+            'payload': payload,
+            'status': 'pendente',
+            'tentativas': 0,
+            'proxima_tentativa': agora,
+            'criado_em': agora
+        }
+        for webhook_id in webhook_ids
+    ])
+    db.session.info['webhooks_pendentes'] = True
+    return len(webhook_ids)
@@ -129,4 +129,4 @@ Error generating stack: `+l.message+`
  *
  * This source code is licensed under the ISC license.
  * See the LICENSE file in the root directory of this source tree.
- */const Mb=[["path",{d:"M4 14a1 1 0 0 1-.78-1.63l9.9-10.2a.5.5 0 0 1 .86.46l-1.92 6.02A1 1 0 0 0 13 10h7a1 1 0 0 1 .78 1.63l-9.9 10.2a.5.5 0 0 1-.86-.46l1.92-6.02A1 1 0 0 0 11 14z",key:"1xq2db"}]],Dm=Ce("zap",Mb),nl="/api";function Ob(){var ut,Rt;const[i,s]=z.useState(null),[f,r]=z.useState({email:"agente@demo.com",senha:"demo123"}),[d,h]=z.useState([]),[S,T]=z.useState(null),[p,v]=z.useState([]),[A,O]=z.useState(""),[w,Y]=z.useState([]),[V,J]=z.useState({}),[X,lt]=z.useState(!1),vt=async $=>{$.preventDefault(),lt(!0);try{const nt=await fetch(`${nl}/agentes/login`,{method:"POST",headers:{"Content-Type":"application/json"},body:JSON.stringify(f)}),jt=await nt.json();nt.ok?(s(jt.agente),F()):alert(jt.error||"Erro ao fazer login")}catch{alert("Erro ao conectar com o servidor")}lt(!1)},F=async()=>{try{const nt=await(await fetch(`${nl}/fila`)).json();Y(nt.atendimentos||[]);const ne=await(await fetch(`${nl}/estatisticas`)).json();if(J(ne),i){const M=await(await fetch(`${nl}/agentes/${i.id}/atendimentos?status=em_atendimento`)).json();h(M.atendimentos||[])}}catch($){console.error("Erro ao carregar dados:",$)}},it=async()=>{if(i){lt(!0);try{const $=await fetch(`${nl}/fila/proximo`,{method:"POST",headers:{"Content-Type":"application/json"},body:JSON.stringify({agente_id:i.id})}),nt=await $.json();$.ok?(T(nt),P(nt.id),F()):alert(nt.error||nt.message||"Erro ao pegar atendimento")}catch{alert("Erro ao conectar com o servidor")}lt(!1)}},P=async $=>{try{const jt=await(await fetch(`${nl}/atendimentos/${$}/mensagens`)).json();v(jt)}catch(nt){console.error("Erro ao carregar mensagens:",nt)}},ht=async $=>{if($.preventDefault(),!(!A.trim()||!S))try{const nt=await fetch(`${nl}/atendimentos/${S.id}/mensagens`,{method:"POST",headers:{"Content-Type":"application/json"},body:JSON.stringify({remetente:"agente",conteudo:A,agente_id:i.id})}),jt=await nt.json();nt.ok&&(v([...p,jt]),O(""))}catch(nt){console.error("Erro ao enviar mensagem:",nt)}},pt=async()=>{if(S)try{(await fetch(`${nl}/atendimentos/${S.id}/finalizar`,{method:"POST",headers:{"Content-Type":"application/json"},body:JSON.stringify({})})).ok&&(T(null),v([]),F())}catch($){console.error("Erro ao finalizar atendimento:",$)}},G=async()=>{i&&await fetch(`${nl}/agentes/${i.id}/logout`,{method:"POST"}),s(null),T(null),v([])};return z.useEffect(()=>{if(i){F();const $=setInterval(F,5e3);return()=>clearInterval($)}},[i]),i?g.jsxs("div",{className:"min-h-screen bg-slate-50 dark:bg-slate-950",children:[g.jsx("header",{className:"bg-white dark:bg-slate-900 border-b border-slate-200 dark:border-slate-800 px-6 py-4",children:g.jsxs("div",{className:"flex items-center justify-between",children:[g.jsxs("div",{className:"flex items-center gap-3",children:[g.jsx("div",{className:"w-10 h-10 bg-blue-500 rounded-full flex items-center justify-center",children:g.jsx(Kr,{className:"w-5 h-5 text-white"})}),g.jsxs("div",{children:[g.jsx("h1",{className:"text-xl font-bold text-slate-900 dark:text-white",children:"Painel de Atendimento"}),g.jsx("p",{className:"text-sm text-slate-600 dark:text-slate-400",children:"Sistema Multiagente"})]})]}),g.jsxs("div",{className:"flex items-center gap-4",children:[g.jsxs(mi,{variant:"outline",className:"gap-2",children:[g.jsx(Mm,{className:"w-4 h-4 text-green-500"}),"Online"]}),g.jsxs("div",{className:"flex items-center gap-2",children:[g.jsx(Nm,{children:g.jsx(Rm,{children:i.nome.substring(0,2).toUpperCase()})}),g.jsxs("div",{className:"text-right",children:[g.jsx("p",{className:"text-sm font-medium",children:i.nome}),g.jsxs("p",{className:"text-xs text-slate-600 dark:text-slate-400",children:[i.atendimentos_ativos,"/",i.max_atendimentos," atendimentos"]})]})]}),g.jsx(Va,{variant:"ghost",size:"icon",onClick:G,children:g.jsx(xb,{className:"w-5 h-5"})})]})]})}),g.jsxs("div",{className:"flex h-[calc(100vh-80px)]",children:[g.jsx("aside",{className:"w-80 bg-white dark:bg-slate-900 border-r border-slate-200 dark:border-slate-800 p-4 overflow-y-auto",children:g.jsxs(jy,{defaultValue:"fila",className:"w-full",children:[g.jsxs(Cy,{className:"grid w-full grid-cols-2",children:[g.jsx(pm,{value:"fila",children:"Fila"}),g.jsx(pm,{value:"stats",children:"Estatísticas"})]}),g.jsxs(Sm,{value:"fila",className:"space-y-4",children:[g.jsxs("div",{className:"flex items-center justify-between",children:[g.jsx("h3",{className:"font-semibold",children:"Fila de Atendimento"}),g.jsx(mi,{children:w.length})]}),g.jsxs(Va,{onClick:it,className:"w-full",disabled:X||i.atendimentos_ativos>=i.max_atendimentos,children:[g.jsx(Dm,{className:"w-4 h-4 mr-2"}),"Pegar Próximo"]}),g.jsx(Am,{className:"h-[calc(100vh-300px)]",children:g.jsxs("div",{className:"space-y-2",children:[w.map($=>{var nt,jt;return g.jsx(ea,{className:"cursor-pointer hover:bg-slate-50 dark:hover:bg-slate-800",children:g.jsx(la,{className:"p-3",children:g.jsxs("div",{className:"flex items-start justify-between",children:[g.jsxs("div",{className:"flex-1",children:[g.jsx("p",{className:"font-medium text-sm",children:((nt=$.cliente)==null?void 0:nt.nome)||"Cliente"}),g.jsx("p",{className:"text-xs text-slate-600 dark:text-slate-400",children:(jt=$.cliente)==null?void 0:jt.telefone}),$.assunto&&g.jsx("p",{className:"text-xs text-slate-500 mt-1",children:$.assunto})]}),g.jsxs("div",{className:"flex flex-col items-end gap-1",children:[$.prioridade>0&&g.jsx(mi,{variant:"destructive",className:"text-xs",children:"Alta"}),g.jsxs("span",{className:"text-xs text-slate-500",children:[g.jsx(wm,{className:"w-3 h-3 inline mr-1"}),new Date($.iniciado_em).toLocaleTimeString("pt-BR",{hour:"2-digit",minute:"2-digit"})]})]})]})})},$.id)}),w.length===0&&g.jsxs("div",{className:"text-center py-8 text-slate-500",children:[g.jsx(Om,{className:"w-12 h-12 mx-auto mb-2 opacity-50"}),g.jsx("p",{children:"Nenhum atendimento na fila"})]})]})})]}),g.jsxs(Sm,{value:"stats",className:"space-y-4",children:[g.jsx("h3",{className:"font-semibold",children:"Estatísticas do Sistema"}),g.jsxs("div",{className:"grid grid-cols-2 gap-2",children:[g.jsx(ea,{children:g.jsxs(la,{className:"p-3 text-center",children:[g.jsx(zb,{className:"w-6 h-6 mx-auto mb-1 text-blue-500"}),g.jsx("p",{className:"text-2xl font-bold",children:V.em_atendimento||0}),g.jsx("p",{className:"text-xs text-slate-600",children:"Em Atendimento"})]})}),g.jsx(ea,{children:g.jsxs(la,{className:"p-3 text-center",children:[g.jsx(wm,{className:"w-6 h-6 mx-auto mb-1 text-yellow-500"}),g.jsx("p",{className:"text-2xl font-bold",children:V.em_fila||0}),g.jsx("p",{className:"text-xs text-slate-600",children:"Na Fila"})]})}),g.jsx(ea,{children:g.jsxs(la,{className:"p-3 text-center",children:[g.jsx(Om,{className:"w-6 h-6 mx-auto mb-1 text-green-500"}),g.jsx("p",{className:"text-2xl font-bold",children:V.finalizados||0}),g.jsx("p",{className:"text-xs text-slate-600",children:"Finalizados"})]})}),g.jsx(ea,{children:g.jsxs(la,{className:"p-3 text-center",children:[g.jsx(Mm,{className:"w-6 h-6 mx-auto mb-1 text-purple-500"}),g.jsx("p",{className:"text-2xl font-bold",children:V.agentes_online||0}),g.jsx("p",{className:"text-xs text-slate-600",children:"Agentes Online"})]})})]}),g.jsxs(ea,{children:[g.jsx(gm,{className:"p-3",children:g.jsx(ym,{className:"text-sm",children:"Tempo Médio"})}),g.jsxs(la,{className:"p-3 pt-0 space-y-2",children:[g.jsxs("div",{className:"flex justify-between text-sm",children:[g.jsx("span",{className:"text-slate-600",children:"Espera:"}),g.jsxs("span",{className:"font-medium",children:[Math.floor((V.tempo_medio_espera||0)/60),"min"]})]}),g.jsxs("div",{className:"flex justify-between text-sm",children:[g.jsx("span",{className:"text-slate-600",children:"Atendimento:"}),g.jsxs("span",{className:"font-medium",children:[Math.floor((V.tempo_medio_atendimento||0)/60),"min"]})]})]})]})]})]})}),g.jsx("main",{className:"flex-1 flex flex-col",children:S?g.jsxs(g.Fragment,{children:[g.jsx("div",{className:"bg-white dark:bg-slate-900 border-b border-slate-200 dark:border-slate-800 p-4",children:g.jsxs("div",{className:"flex items-center justify-between",children:[g.jsxs("div",{className:"flex items-center gap-3",children:[g.jsx(Nm,{children:g.jsx(Rm,{children:g.jsx(bb,{className:"w-6 h-6"})})}),g.jsxs("div",{children:[g.jsx("h3",{className:"font-semibold",children:((ut=S.cliente)==null?void 0:ut.nome)||"Cliente"}),g.jsxs("div",{className:"flex items-center gap-2 text-sm text-slate-600 dark:text-slate-400",children:[g.jsx(Tb,{className:"w-3 h-3"}),(Rt=S.cliente)==null?void 0:Rt.telefone]})]})]}),g.jsxs("div",{className:"flex items-center gap-2",children:[g.jsxs(mi,{variant:"outline",children:["#",S.id]}),g.jsx(Va,{variant:"destructive",size:"sm",onClick:pt,children:"Finalizar"})]})]})}),g.jsx(Am,{className:"flex-1 p-4",children:g.jsx("div",{className:"space-y-4 max-w-4xl mx-auto",children:p.map($=>g.jsx("div",{className:`flex ${$.remetente==="agente"?"justify-end":"justify-start"}`,children:g.jsxs("div",{className:`max-w-[70%] rounded-lg p-3 ${$.remetente==="agente"?"bg-blue-500 text-white":$.remetente==="bot"?"bg-purple-100 dark:bg-purple-900 text-slate-900 dark:text-white":"bg-slate-200 dark:bg-slate-800 text-slate-900 dark:text-white"}`,children:[$.remetente==="bot"&&g.jsxs("div",{className:"flex items-center gap-1 mb-1 text-xs opacity-75",children:[g.jsx(vb,{className:"w-3 h-3"}),g.jsx("span",{children:"Bot"})]}),g.jsx("p",{className:"text-sm whitespace-pre-wrap",children:$.conteudo}),g.jsx("p",{className:"text-xs opacity-75 mt-1",children:new Date($.enviada_em).toLocaleTimeString("pt-BR",{hour:"2-digit",minute:"2-digit"})})]})},$.id))})}),g.jsx("div",{className:"bg-white dark:bg-slate-900 border-t border-slate-200 dark:border-slate-800 p-4",children:g.jsxs("form",{onSubmit:ht,className:"flex gap-2 max-w-4xl mx-auto",children:[g.jsx(Vr,{placeholder:"Digite sua mensagem...",value:A,onChange:$=>O($.target.value),className:"flex-1"}),g.jsx(Va,{type:"submit",disabled:!A.trim(),children:g.jsx(Nb,{className:"w-4 h-4"})})]})})]}):g.jsx("div",{className:"flex-1 flex items-center justify-center text-slate-500",children:g.jsxs("div",{className:"text-center",children:[g.jsx(Kr,{className:"w-16 h-16 mx-auto mb-4 opacity-50"}),g.jsx("h3",{className:"text-xl font-semibold mb-2",children:"Nenhum atendimento ativo"}),g.jsx("p",{className:"mb-4",children:"Pegue um atendimento da fila para começar"}),g.jsxs(Va,{onClick:it,disabled:X,children:[g.jsx(Dm,{className:"w-4 h-4 mr-2"}),"Pegar Próximo da Fila"]})]})})})]})]}):g.jsx("div",{className:"min-h-screen bg-gradient-to-br from-blue-50 to-indigo-100 dark:from-slate-950 dark:to-slate-900 flex items-center justify-center p-4",children:g.jsxs(ea,{className:"w-full max-w-md",children:[g.jsxs(gm,{className:"text-center",children:[g.jsx("div",{className:"flex justify-center mb-4",children:g.jsx("div",{className:"w-16 h-16 bg-blue-500 rounded-full flex items-center justify-center",children:g.jsx(Kr,{className:"w-8 h-8 text-white"})})}),g.jsx(ym,{className:"text-2xl",children:"Sistema de Atendimento"}),g.jsx(Ig,{children:"Faça login para acessar o painel"})]}),g.jsx(la,{children:g.jsxs("form",{onSubmit:vt,className:"space-y-4",children:[g.jsxs("div",{className:"space-y-2",children:[g.jsx(bm,{htmlFor:"email",children:"Email"}),g.jsx(Vr,{id:"email",type:"email",placeholder:"seu@email.com",value:f.email,onChange:$=>r({...f,email:$.target.value}),required:!0})]}),g.jsxs("div",{className:"space-y-2",children:[g.jsx(bm,{htmlFor:"senha",children:"Senha"}),g.jsx(Vr,{id:"senha",type:"password",placeholder:"••••••••",value:f.senha,onChange:$=>r({...f,senha:$.target.value}),required:!0})]}),g.jsx(Va,{type:"submit",className:"w-full",disabled:X,children:X?"Entrando...":"Entrar"}),g.jsx("p",{className:"text-sm text-center text-muted-foreground",children:"Demo: agente@demo.com / demo123"})]})})]})})}fg.createRoot(document.getElementById("root")).render(g.jsx(z.StrictMode,{children:g.jsx(Ob,{})}));
+ */const Mb=[["path",{d:"M4 14a1 1 0 0 1-.78-1.63l9.9-10.2a.5.5 0 0 1 .86.46l-1.92 6.02A1 1 0 0 0 13 10h7a1 1 0 0 1 .78 1.63l-9.9 10.2a.5.5 0 0 1-.86-.46l1.92-6.02A1 1 0 0 0 11 14z",key:"1xq2db"}]],Dm=Ce("zap",Mb),nl="/api";function Ob(){var ut,Rt;const[i,s]=z.useState(null),[f,r]=z.useState({email:"agente@demo.com",senha:"demo123"}),[d,h]=z.useState([]),[S,T]=z.useState(null),[p,v]=z.useState([]),[A,O]=z.useState(""),[w,Y]=z.useState([]),[V,J]=z.useState({}),[X,lt]=z.useState(!1),vt=async $=>{$.preventDefault(),lt(!0);try{const nt=await fetch(`${nl}/agentes/login`,{method:"POST",headers:{"Content-Type":"application/json"},body:JSON.stringify(f)}),jt=await nt.json();nt.ok?(s(jt.agente),F()):alert(jt.error||"Erro ao fazer login")}catch{alert("Erro ao conectar com o servidor")}lt(!1)},F=async()=>{try{const nt=await(await fetch(`${nl}/fila`)).json();Y(nt.atendimentos||[]);const ne=await(await fetch(`${nl}/estatisticas`)).json();if(J(ne),i){const M=await(await fetch(`${nl}/agentes/${i.id}/atendimentos?status=em_atendimento`)).json();h(M.atendimentos||[])}}catch($){console.error("Erro ao carregar dados:",$)}},it=async()=>{if(i){lt(!0);try{const $=await fetch(`${nl}/fila/proximo`,{method:"POST",headers:{"Content-Type":"application/json"},body:JSON.stringify({agente_id:i.id})}),nt=await $.json();$.ok?(T(nt),P(nt.id),F()):alert(nt.error||nt.message||"Erro ao pegar atendimento")}catch{alert("Erro ao conectar com o servidor")}lt(!1)}},P=async $=>{try{const jt=await(await fetch(`${nl}/atendimentos/${$}/mensagens`)).json();v(jt)}catch(nt){console.error("Erro ao carregar mensagens:",nt)}},ht=async $=>{if($.preventDefault(),!(!A.trim()||!S))try{const nt=await fetch(`${nl}/atendimentos/${S.id}/mensagens`,{method:"POST",headers:{"Content-Type":"application/json"},body:JSON.stringify({remetente:"agente",conteudo:A,agente_id:i.id})}),jt=await nt.json();nt.ok&&(v(x=>x.some(y=>y.id===jt.id)?x:[...x,jt]),O(""))}catch(nt){console.error("Erro ao enviar mensagem:",nt)}},pt=async()=>{if(S)try{(await fetch(`${nl}/atendimentos/${S.id}/finalizar`,{method:"POST",headers:{"Content-Type":"application/json"},body:JSON.stringify({})})).ok&&(T(null),v([]),F())}catch($){console.error("Erro ao finalizar atendimento:",$)}},G=async()=>{i&&await fetch(`${nl}/agentes/${i.id}/logout`,{method:"POST"}),s(null),T(null),v([])};const atendimentoAtivoRef=z.useRef(null);return z.useEffect(()=>{atendimentoAtivoRef.current=S},[S]),z.useEffect(()=>{if(!i)return;F();let r=null;const ag=()=>{clearTimeout(r),r=setTimeout(F,300)};let es=null,pl=null,rc=null;const cn=()=>{es=new EventSource(`${nl}/eventos/stream`),es.addEventListener("open",()=>{clearInterval(pl),pl=null}),es.addEventListener("error",()=>{es.readyState===EventSource.CLOSED&&(pl||(pl=setInterval(F,5e3)),rc=setTimeout(cn,3e4))}),["fila_atualizada","atendimento_atribuido","atendimento_finalizado"].forEach(t=>es.addEventListener(t,ag)),es.addEventListener("nova_mensagem",t=>{const{atendimento_id:a,mensagem:m}=JSON.parse(t.data);atendimentoAtivoRef.current?.id===a&&v(x=>x.some(y=>y.id===m.id)?x:[...x,m])})};cn();const iv=setInterval(F,6e4);return()=>{es.close(),clearInterval(iv),clearInterval(pl),clearTimeout(r),clearTimeout(rc)}},[i]),i?g.jsxs("div",{className:"min-h-screen bg-slate-50 dark:bg-slate-950",children:[g.jsx("header",{className:"bg-white dark:bg-slate-900 border-b border-slate-200 dark:border-slate-800 px-6 py-4",children:g.jsxs("div",{className:"flex items-center justify-between",children:[g.jsxs("div",{className:"flex items-center gap-3",children:[g.jsx("div",{className:"w-10 h-10 bg-blue-500 rounded-full flex items-center justify-center",children:g.jsx(Kr,{className:"w-5 h-5 text-white"})}),g.jsxs("div",{children:[g.jsx("h1",{className:"text-xl font-bold text-slate-900 dark:text-white",children:"Painel de Atendimento"}),g.jsx("p",{className:"text-sm text-slate-600 dark:text-slate-400",children:"Sistema Multiagente"})]})]}),g.jsxs("div",{className:"flex items-center gap-4",children:[g.jsxs(mi,{variant:"outline",className:"gap-2",children:[g.jsx(Mm,{className:"w-4 h-4 text-green-500"}),"Online"]}),g.jsxs("div",{className:"flex items-center gap-2",children:[g.jsx(Nm,{children:g.jsx(Rm,{children:i.nome.substring(0,2).toUpperCase()})}),g.jsxs("div",{className:"text-right",children:[g.jsx("p",{className:"text-sm font-medium",children:i.nome}),g.jsxs("p",{className:"text-xs text-slate-600 dark:text-slate-400",children:[i.atendimentos_ativos,"/",i.max_atendimentos," atendimentos"]})]})]}),g.jsx(Va,{variant:"ghost",size:"icon",onClick:G,children:g.jsx(xb,{className:"w-5 h-5"})})]})]})}),g.jsxs("div",{className:"flex h-[calc(100vh-80px)]",children:[g.jsx("aside",{className:"w-80 bg-white dark:bg-slate-900 border-r border-slate-200 dark:border-slate-800 p-4 overflow-y-auto",children:g.jsxs(jy,{defaultValue:"fila",className:"w-full",children:[g.jsxs(Cy,{className:"grid w-full grid-cols-2",children:[g.jsx(pm,{value:"fila",children:"Fila"}),g.jsx(pm,{value:"stats",children:"Estatísticas"})]}),g.jsxs(Sm,{value:"fila",className:"space-y-4",children:[g.jsxs("div",{className:"flex items-center justify-between",children:[g.jsx("h3",{className:"font-semibold",children:"Fila de Atendimento"}),g.jsx(mi,{children:w.length})]}),g.jsxs(Va,{onClick:it,className:"w-full",disabled:X||i.atendimentos_ativos>=i.max_atendimentos,children:[g.jsx(Dm,{className:"w-4 h-4 mr-2"}),"Pegar Próximo"]}),g.jsx(Am,{className:"h-[calc(100vh-300px)]",children:g.jsxs("div",{className:"space-y-2",children:[w.map($=>{var nt,jt;return g.jsx(ea,{className:"cursor-pointer hover:bg-slate-50 dark:hover:bg-slate-800",children:g.jsx(la,{className:"p-3",children:g.jsxs("div",{className:"flex items-start justify-between",children:[g.jsxs("div",{className:"flex-1",children:[g.jsx("p",{className:"font-medium text-sm",children:((nt=$.cliente)==null?void 0:nt.nome)||"Cliente"}),g.jsx("p",{className:"text-xs text-slate-600 dark:text-slate-400",children:(jt=$.cliente)==null?void 0:jt.telefone}),$.assunto&&g.jsx("p",{className:"text-xs text-slate-500 mt-1",children:$.assunto})]}),g.jsxs("div",{className:"flex flex-col items-end gap-1",children:[$.prioridade>0&&g.jsx(mi,{variant:"destructive",className:"text-xs",children:"Alta"}),g.jsxs("span",{className:"text-xs text-slate-500",children:[g.jsx(wm,{className:"w-3 h-3 inline mr-1"}),new Date($.iniciado_em).toLocaleTimeString("pt-BR",{hour:"2-digit",minute:"2-digit"})]})]})]})})},$.id)}),w.length===0&&g.jsxs("div",{className:"text-center py-8 text-slate-500",children:[g.jsx(Om,{className:"w-12 h-12 mx-auto mb-2 opacity-50"}),g.jsx("p",{children:"Nenhum atendimento na fila"})]})]})})]}),g.jsxs(Sm,{value:"stats",className:"space-y-4",children:[g.jsx("h3",{className:"font-semibold",children:"Estatísticas do Sistema"}),g.jsxs("div",{className:"grid grid-cols-2 gap-2",children:[g.jsx(ea,{children:g.jsxs(la,{className:"p-3 text-center",children:[g.jsx(zb,{className:"w-6 h-6 mx-auto mb-1 text-blue-500"}),g.jsx("p",{className:"text-2xl font-bold",children:V.em_atendimento||0}),g.jsx("p",{className:"text-xs text-slate-600",children:"Em Atendimento"})]})}),g.jsx(ea,{children:g.jsxs(la,{className:"p-3 text-center",children:[g.jsx(wm,{className:"w-6 h-6 mx-auto mb-1 text-yellow-500"}),g.jsx("p",{className:"text-2xl font-bold",children:V.em_fila||0}),g.jsx("p",{className:"text-xs text-slate-600",children:"Na Fila"})]})}),g.jsx(ea,{children:g.jsxs(la,{className:"p-3 text-center",children:[g.jsx(Om,{className:"w-6 h-6 mx-auto mb-1 text-green-500"}),g.jsx("p",{className:"text-2xl font-bold",children:V.finalizados||0}),g.jsx("p",{className:"text-xs text-slate-600",children:"Finalizados"})]})}),g.jsx(ea,{children:g.jsxs(la,{className:"p-3 text-center",children:[g.jsx(Mm,{className:"w-6 h-6 mx-auto mb-1 text-purple-500"}),g.jsx("p",{className:"text-2xl font-bold",children:V.agentes_online||0}),g.jsx("p",{className:"text-xs text-slate-600",children:"Agentes Online"})]})})]}),g.jsxs(ea,{children:[g.jsx(gm,{className:"p-3",children:g.jsx(ym,{className:"text-sm",children:"Tempo Médio"})}),g.jsxs(la,{className:"p-3 pt-0 space-y-2",children:[g.jsxs("div",{className:"flex justify-between text-sm",children:[g.jsx("span",{className:"text-slate-600",children:"Espera:"}),g.jsxs("span",{className:"font-medium",children:[Math.floor((V.tempo_medio_espera||0)/60),"min"]})]}),g.jsxs("div",{className:"flex justify-between text-sm",children:[g.jsx("span",{className:"text-slate-600",children:"Atendimento:"}),g.jsxs("span",{className:"font-medium",children:[Math.floor((V.tempo_medio_atendimento||0)/60),"min"]})]})]})]})]})]})}),g.jsx("main",{className:"flex-1 flex flex-col",children:S?g.jsxs(g.Fragment,{children:[g.jsx("div",{className:"bg-white dark:bg-slate-900 border-b border-slate-200 dark:border-slate-800 p-4",children:g.jsxs("div",{className:"flex items-center justify-between",children:[g.jsxs("div",{className:"flex items-center gap-3",children:[g.jsx(Nm,{children:g.jsx(Rm,{children:g.jsx(bb,{className:"w-6 h-6"})})}),g.jsxs("div",{children:[g.jsx("h3",{className:"font-semibold",children:((ut=S.cliente)==null?void 0:ut.nome)||"Cliente"}),g.jsxs("div",{className:"flex items-center gap-2 text-sm text-slate-600 dark:text-slate-400",children:[g.jsx(Tb,{className:"w-3 h-3"}),(Rt=S.cliente)==null?void 0:Rt.telefone]})]})]}),g.jsxs("div",{className:"flex items-center gap-2",children:[g.jsxs(mi,{variant:"outline",children:["#",S.id]}),g.jsx(Va,{variant:"destructive",size:"sm",onClick:pt,children:"Finalizar"})]})]})}),g.jsx(Am,{className:"flex-1 p-4",children:g.jsx("div",{className:"space-y-4 max-w-4xl mx-auto",children:p.map($=>g.jsx("div",{className:`flex ${$.remetente==="agente"?"justify-end":"justify-start"}`,children:g.jsxs("div",{className:`max-w-[70%] rounded-lg p-3 ${$.remetente==="agente"?"bg-blue-500 text-white":$.remetente==="bot"?"bg-purple-100 dark:bg-purple-900 text-slate-900 dark:text-white":"bg-slate-200 dark:bg-slate-800 text-slate-900 dark:text-white"}`,children:[$.remetente==="bot"&&g.jsxs("div",{className:"flex items-center gap-1 mb-1 text-xs opacity-75",children:[g.jsx(vb,{className:"w-3 h-3"}),g.jsx("span",{children:"Bot"})]}),g.jsx("p",{className:"text-sm whitespace-pre-wrap",children:$.conteudo}),g.jsx("p",{className:"text-xs opacity-75 mt-1",children:new Date($.enviada_em).toLocaleTimeString("pt-BR",{hour:"2-digit",minute:"2-digit"})})]})},$.id))})}),g.jsx("div",{className:"bg-white dark:bg-slate-900 border-t border-slate-200 dark:border-slate-800 p-4",children:g.jsxs("form",{onSubmit:ht,className:"flex gap-2 max-w-4xl mx-auto",children:[g.jsx(Vr,{placeholder:"Digite sua mensagem...",value:A,onChange:$=>O($.target.value),className:"flex-1"}),g.jsx(Va,{type:"submit",disabled:!A.trim(),children:g.jsx(Nb,{className:"w-4 h-4"})})]})})]}):g.jsx("div",{className:"flex-1 flex items-center justify-center text-slate-500",children:g.jsxs("div",{className:"text-center",children:[g.jsx(Kr,{className:"w-16 h-16 mx-auto mb-4 opacity-50"}),g.jsx("h3",{className:"text-xl font-semibold mb-2",children:"Nenhum atendimento ativo"}),g.jsx("p",{className:"mb-4",children:"Pegue um atendimento da fila para começar"}),g.jsxs(Va,{onClick:it,disabled:X,children:[g.jsx(Dm,{className:"w-4 h-4 mr-2"}),"Pegar Próximo da Fila"]})]})})})]})]}):g.jsx("div",{className:"min-h-screen bg-gradient-to-br from-blue-50 to-indigo-100 dark:from-slate-950 dark:to-slate-900 flex items-center justify-center p-4",children:g.jsxs(ea,{className:"w-full max-w-md",children:[g.jsxs(gm,{className:"text-center",children:[g.jsx("div",{className:"flex justify-center mb-4",children:g.jsx("div",{className:"w-16 h-16 bg-blue-500 rounded-full flex items-center justify-center",children:g.jsx(Kr,{className:"w-8 h-8 text-white"})})}),g.jsx(ym,{className:"text-2xl",children:"Sistema de Atendimento"}),g.jsx(Ig,{children:"Faça login para acessar o painel"})]}),g.jsx(la,{children:g.jsxs("form",{onSubmit:vt,className:"space-y-4",children:[g.jsxs("div",{className:"space-y-2",children:[g.jsx(bm,{htmlFor:"email",children:"Email"}),g.jsx(Vr,{id:"email",type:"email",placeholder:"seu@email.com",value:f.email,onChange:$=>r({...f,email:$.target.value}),required:!0})]}),g.jsxs("div",{className:"space-y-2",children:[g.jsx(bm,{htmlFor:"senha",children:"Senha"}),g.jsx(Vr,{id:"senha",type:"password",placeholder:"••••••••",value:f.senha,onChange:$=>r({...f,senha:$.target.value}),required:!0})]}),g.jsx(Va,{type:"submit",className:"w-full",disabled:X,children:X?"Entrando...":"Entrar"}),g.jsx("p",{className:"text-sm text-center text-muted-foreground",children:"Demo: agente@demo.com / demo123"})]})})]})})}fg.createRoot(document.getElementById("root")).render(g.jsx(z.StrictMode,{children:g.jsx(Ob,{})}));
@@ -0,0 +1,63 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+class CacheTTL:
+    """
+    Cache em memória com expiração por tempo. Enquanto um valor é
+    recalculado, as demais threads esperam o resultado em vez de repetir
+    o mesmo trabalho.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._valores = {}
+
+    def obter(self, chave, calcular):
+        entrada = self._valores.get(chave)
+        if entrada is not None and time.monotonic() < entrada[0]:
+            return entrada[1]
+
+        with self._lock:
+            entrada = self._valores.get(chave)
+            if entrada is not None and time.monotonic() < entrada[0]:
+                return entrada[1]
+
+            valor = calcular()
+            self._valores[chave] = (time.monotonic() + self.ttl, valor)
+            return valor
+
+    def invalidar(self, chave=None):
+        with self._lock:
+            if chave is None:
+                self._valores.clear()
+            else:
+                self._valores.pop(chave, None)
+
+
+class CacheLRU:
+    """Mapa em memória limitado a `tamanho` entradas; descarta as menos usadas"""
+
+    def __init__(self, tamanho):
+        self.tamanho = tamanho
+        self._lock = threading.Lock()
+        self._valores = OrderedDict()
+
+    def obter(self, chave, padrao=None):
+        with self._lock:
+            if chave not in self._valores:
+                return padrao
+            self._valores.move_to_end(chave)
+            return self._valores[chave]
+
+    def guardar(self, chave, valor):
+        with self._lock:
+            self._valores[chave] = valor
+            self._valores.move_to_end(chave)
+            while len(self._valores) > self.tamanho:
+                self._valores.popitem(last=False)
+
+    def __len__(self):
+        return len(self._valores)
@@ -0,0 +1,210 @@
+import base64
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 200
+
+
+class ParametroInvalido(ValueError):
+    """Parâmetro de listagem malformado (cursor, limite, datas)"""
+
+
+class CursorInvalido(ParametroInvalido):
+    """Cursor de paginação malformado"""
+
+
+def codificar_cursor(momento, registro_id):
+    """Gera um cursor opaco a partir do par (data, id) do último registro"""
+    bruto = f"{momento.isoformat() if momento else ''}|{registro_id}"
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Converte um cursor opaco de volta para o par (data, id)"""
+    try:
+        preenchimento = '=' * (-len(cursor) % 4)
+        bruto = base64.urlsafe_b64decode(cursor + preenchimento).decode()
+        momento, registro_id = bruto.rsplit('|', 1)
+        return (datetime.fromisoformat(momento) if momento else None), int(registro_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise CursorInvalido(f'Cursor inválido: {cursor}') from e
+
+
+def obter_limite(valor, padrao=LIMITE_PADRAO, maximo=LIMITE_MAXIMO):
+    """Normaliza o parâmetro limit recebido na query string"""
+    if valor in (None, ''):
+        return padrao
+    try:
+        limite = int(valor)
+    except (TypeError, ValueError):
+        raise CursorInvalido(f'Limite inválido: {valor}')
+    return max(1, min(limite, maximo))
+
+
+def filtro_antes(coluna_data, coluna_id, momento, registro_id):
+    """Condição de keyset para registros estritamente anteriores a (data, id)"""
+    return or_(
+        coluna_data < momento,
+        and_(coluna_data == momento, coluna_id < registro_id)
+    )
+
+
+def filtro_depois(coluna_data, coluna_id, momento, registro_id):
+    """Condição de keyset para registros estritamente posteriores a (data, id)"""
+    return or_(
+        coluna_data > momento,
+        and_(coluna_data == momento, coluna_id > registro_id)
+    )
+
+
+def ler_data(valor, fim_do_dia=False):
+    """Lê uma data ISO dos parâmetros; com fim_do_dia, 'AAAA-MM-DD' vai até o fim do dia"""
+    if not valor:
+        return None
+    try:
+        momento = datetime.fromisoformat(valor)
+    except ValueError:
+        raise ParametroInvalido(f'Data inválida: {valor}')
+    # 'ate=2024-01-31' inclui o dia inteiro
+    if fim_do_dia and len(valor) == 10:
+        momento += timedelta(days=1)
+    return momento
+
+
+class ParametrosListagem:
+    """
+    Parâmetros comuns das listagens: limit, cursor, fields (campos
+    separados por vírgula), count=false para pular o total e o intervalo
+    desde/ate aplicado à coluna de data da listagem.
+    """
+
+    def __init__(self, limite=LIMITE_PADRAO, cursor=None, campos=None, contar=True, desde=None, ate=None):
+        self.limite = limite
+        self.cursor = cursor
+        self.campos = campos
+        self.contar = contar
+        self.desde = desde
+        self.ate = ate
+
+    @classmethod
+    def da_requisicao(cls, args):
+        cursor = args.get('cursor')
+        campos = args.get('fields')
+        return cls(
+            limite=obter_limite(args.get('limit')),
+            cursor=decodificar_cursor(cursor) if cursor else None,
+            campos={c.strip() for c in campos.split(',') if c.strip()} if campos else None,
+            contar=args.get('count', 'true').lower() not in ('0', 'false', 'nao', 'não'),
+            desde=ler_data(args.get('desde')),
+            ate=ler_data(args.get('ate'), fim_do_dia=True)
+        )
+
+    def inclui(self, campo):
+        """Se o campo deve aparecer na resposta (sem fields=, todos aparecem)"""
+        return self.campos is None or campo in self.campos
+
+    def filtrar(self, dados):
+        """Aplica a seleção de campos a um dict serializado"""
+        if self.campos is None:
+            return dados
+        return {campo: valor for campo, valor in dados.items() if campo in self.campos}
+
+
+class Pagina:
+    """Resultado de paginar(): registros da página, cursor seguinte e total opcional"""
+
+    def __init__(self, registros, next_cursor, has_more, total):
+        self.registros = registros
+        self.next_cursor = next_cursor
+        self.has_more = has_more
+        self.total = total
+
+    def to_dict(self, chave, itens):
+        resposta = {
+            chave: itens,
+            'next_cursor': self.next_cursor,
+            'has_more': self.has_more
+        }
+        if self.total is not None:
+            resposta['total'] = self.total
+        return resposta
+
+
+def paginar(query, parametros, coluna_data=None, coluna_id=None, decrescente=True):
+    """
+    Pagina uma query por keyset. Com `coluna_data`, ordena por (data, id)
+    decrescentes e aplica desde/ate nessa coluna; registros sem data vêm
+    depois, em ordem de id, para que o cursor nunca compare com NULL. Sem
+    `coluna_data`, pagina só pelo id. O total, quando pedido, é um COUNT
+    com os mesmos filtros, sem o cursor.
+    """
+    limite = parametros.limite
+    cursor = parametros.cursor
+
+    if coluna_data is not None:
+        if parametros.desde:
+            query = query.filter(coluna_data >= parametros.desde)
+        if parametros.ate:
+            query = query.filter(coluna_data < parametros.ate)
+
+    total = query.order_by(None).count() if parametros.contar else None
+
+    if coluna_data is None:
+        if cursor:
+            query = query.filter(coluna_id < cursor[1] if decrescente else coluna_id > cursor[1])
+        registros = query.order_by(coluna_id.desc() if decrescente else coluna_id).limit(limite + 1).all()
+    else:
+        registros = []
+        if cursor is None or cursor[0] is not None:
+            com_data = query.filter(coluna_data.isnot(None))
+            if cursor:
+                com_data = com_data.filter(filtro_antes(coluna_data, coluna_id, *cursor))
+            registros = com_data.order_by(coluna_data.desc(), coluna_id.desc()).limit(limite + 1).all()
+
+        if len(registros) <= limite and not (parametros.desde or parametros.ate):
+            sem_data = query.filter(coluna_data.is_(None))
+            if cursor and cursor[0] is None:
+                sem_data = sem_data.filter(coluna_id < cursor[1])
+            registros += sem_data.order_by(coluna_id.desc()).limit(limite + 1 - len(registros)).all()
+
+    has_more = len(registros) > limite
+    registros = registros[:limite]
+
+    next_cursor = None
+    if has_more:
+        ultimo = registros[-1]
+        momento = getattr(ultimo, coluna_data.key) if coluna_data is not None else None
+        next_cursor = codificar_cursor(momento, getattr(ultimo, coluna_id.key))
+
+    return Pagina(registros, next_cursor, has_more, total)
+
+
+def paginar_uniao(consultas, parametros):
+    """
+    Pagina várias queries como se fossem uma só, cada uma dada como
+    (query, coluna_data, coluna_id), na mesma ordem de paginar(). Os ids
+    precisam ser únicos entre as queries (ex.: tabela quente e arquivo). Cada
+    query traz no máximo uma página e o resultado é intercalado aqui.
+    """
+    registros = []
+    has_more = False
+    total = 0 if parametros.contar else None
+    for query, coluna_data, coluna_id in consultas:
+        pagina = paginar(query, parametros, coluna_data, coluna_id)
+        registros += [(getattr(r, coluna_data.key), getattr(r, coluna_id.key), r) for r in pagina.registros]
+        has_more = has_more or pagina.has_more
+        if total is not None:
+            total += pagina.total
+
+    # (data, id) decrescentes, registros sem data por último
+    registros.sort(key=lambda item: (item[0] is not None, item[0] or datetime.min, item[1]), reverse=True)
+    has_more = has_more or len(registros) > parametros.limite
+    registros = registros[:parametros.limite]
+
+    next_cursor = None
+    if has_more and registros:
+        momento, registro_id, _ = registros[-1]
+        next_cursor = codificar_cursor(momento, registro_id)
+
+    return Pagina([r for _, _, r in registros], next_cursor, has_more, total)
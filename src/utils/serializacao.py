@@ -0,0 +1,93 @@
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from itertools import islice
+from uuid import UUID
+from flask import Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # opcional: sem ele, fica o encoder da biblioteca padrão
+    orjson = None
+
+LOTE_STREAMING = 100
+
+
+def _padrao(valor):
+    """Tipos fora do JSON; datas sempre em ISO 8601, com ou sem orjson"""
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    if isinstance(valor, (Decimal, UUID)):
+        return str(valor)
+    if hasattr(valor, '__html__'):
+        return str(valor.__html__())
+    raise TypeError(f'Objeto do tipo {type(valor).__name__} não é serializável em JSON')
+
+
+def dumps_bytes(dados, indentar=False):
+    """JSON em UTF-8; orjson serializa datetime nativamente, sem isoformat() por campo"""
+    if orjson is not None:
+        opcoes = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indentar else 0)
+        return orjson.dumps(dados, default=_padrao, option=opcoes)
+    return json.dumps(
+        dados, default=_padrao, ensure_ascii=False, indent=2 if indentar else None,
+        separators=None if indentar else (',', ':')
+    ).encode('utf-8')
+
+
+def dumps(dados):
+    return dumps_bytes(dados).decode('utf-8')
+
+
+class ProvedorJSON(DefaultJSONProvider):
+    """
+    jsonify() com orjson quando instalado. As chaves saem na ordem em que
+    foram montadas (sem sort_keys) e as datas em ISO 8601, igual ao
+    isoformat() que os modelos usavam.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return dumps(obj)
+        kwargs.setdefault('default', _padrao)
+        return json.dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        dados = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            dumps_bytes(dados, indentar=self._app.debug) + b'\n', mimetype=self.mimetype
+        )
+
+
+def _gerar_json(dados, lote):
+    """Partes de um objeto JSON em que os valores iteráveis viram listas em streaming"""
+    yield b'{'
+    for posicao, (chave, valor) in enumerate(dados.items()):
+        yield (b',' if posicao else b'') + dumps_bytes(chave) + b':'
+        if isinstance(valor, (dict, list, tuple, str, bytes)) or not hasattr(valor, '__iter__'):
+            yield dumps_bytes(valor)
+            continue
+        itens = iter(valor)
+        primeiro = True
+        yield b'['
+        while True:
+            bloco = list(islice(itens, lote))
+            if not bloco:
+                break
+            # Um lote por vez: a lista inteira nunca fica montada em memória
+            parte = dumps_bytes(bloco)[1:-1]
+            if parte:
+                yield parte if primeiro else b',' + parte
+                primeiro = False
+        yield b']'
+    yield b'}\n'
+
+
+def resposta_streaming(dados, status=200, lote=LOTE_STREAMING):
+    """
+    Resposta JSON de um dict cujos valores podem ser geradores (por exemplo,
+    registros serializados sob demanda). Cada gerador sai como uma lista,
+    serializada em lotes de `lote` itens.
+    """
+    return Response(stream_with_context(_gerar_json(dados, lote)), status=status, mimetype='application/json')
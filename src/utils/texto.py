@@ -0,0 +1,28 @@
+import re
+import unicodedata
+
+_TOKEN = re.compile(r'\w+')
+_TERMO_BUSCA = re.compile(r'[a-z0-9]+')
+_NAO_DIGITO = re.compile(r'\D')
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos, para 'Horário' e 'horario' casarem igual"""
+    texto = texto.lower()
+    if texto.isascii():
+        return texto
+    decomposto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def tokenizar(texto):
+    return _TOKEN.findall(normalizar(texto))
+
+
+def termos_busca(texto):
+    """Palavras normalizadas restritas a [a-z0-9], usadas no índice de busca"""
+    return _TERMO_BUSCA.findall(normalizar(texto or ''))
+
+
+def somente_digitos(texto):
+    return _NAO_DIGITO.sub('', texto or '')
@@ -0,0 +1,13 @@
+import re
+from xml.sax.saxutils import escape
+
+# Caracteres de controle não são permitidos em XML 1.0 nem escapados
+_INVALIDOS_XML = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def gerar_twiml(mensagem=None):
+    """Resposta TwiML com uma <Message>, ou vazia quando não há o que responder"""
+    if not mensagem:
+        return '<?xml version="1.0" encoding="UTF-8"?>\n<Response/>'
+    texto = escape(_INVALIDOS_XML.sub('', mensagem))
+    return f'<?xml version="1.0" encoding="UTF-8"?>\n<Response>\n    <Message>{texto}</Message>\n</Response>'
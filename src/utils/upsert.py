@@ -0,0 +1,52 @@
+from sqlalchemy import func
+from src.models.user import db
+
+
+def inserir_ignorando(tabela, linhas, chaves):
+    """
+    INSERT em lote que ignora linhas cuja chave única (`chaves`) já existe:
+    ON CONFLICT DO NOTHING no Postgres/SQLite e INSERT IGNORE no MySQL.
+    """
+    if not linhas:
+        return
+    dialeto = db.engine.dialect.name
+    if dialeto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        comando = insert(tabela).on_conflict_do_nothing(index_elements=chaves)
+    elif dialeto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        comando = insert(tabela).on_conflict_do_nothing(index_elements=chaves)
+    elif dialeto == 'mysql':
+        comando = tabela.insert().prefix_with('IGNORE')
+    else:
+        raise NotImplementedError(f'INSERT ignorando conflitos não suportado para {dialeto}')
+    db.session.execute(comando, linhas)
+
+
+def upsert(tabela, linhas, chaves, atualizar):
+    """
+    INSERT em lote que, quando a chave única já existe, atualiza as colunas
+    `atualizar` com os valores novos não nulos (ON CONFLICT DO UPDATE no
+    Postgres/SQLite, ON DUPLICATE KEY UPDATE no MySQL).
+    """
+    if not linhas:
+        return
+    dialeto = db.engine.dialect.name
+    if dialeto in ('postgresql', 'sqlite'):
+        if dialeto == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        comando = insert(tabela)
+        comando = comando.on_conflict_do_update(index_elements=chaves, set_={
+            coluna: func.coalesce(comando.excluded[coluna], tabela.c[coluna]) for coluna in atualizar
+        })
+    elif dialeto == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        comando = insert(tabela)
+        comando = comando.on_duplicate_key_update({
+            coluna: func.coalesce(comando.inserted[coluna], tabela.c[coluna]) for coluna in atualizar
+        })
+    else:
+        raise NotImplementedError(f'Upsert não suportado para {dialeto}')
+    db.session.execute(comando, linhas)
@@ -0,0 +1,22 @@
+import os
+import tempfile
+import pytest
+
+# src.main configura o banco ao ser importado, então a URL vem antes de qualquer import do app.
+# TESTES_DATABASE_URL roda a suíte contra MySQL/Postgres; sem ela, um SQLite temporário.
+os.environ['DATABASE_URL'] = os.getenv('TESTES_DATABASE_URL') or \
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'testes.db')}"
+
+
+@pytest.fixture(scope='session')
+def app():
+    from src.main import app
+    return app
+
+
+@pytest.fixture
+def contexto(app):
+    from src.models.user import db
+    with app.app_context():
+        yield
+        db.session.remove()
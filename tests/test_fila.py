@@ -0,0 +1,99 @@
+import threading
+import uuid
+from collections import Counter
+from src.models.user import db
+from src.models.atendimento import Agente, Atendimento, Cliente
+from src.services import fila
+
+
+def _criar_agentes(total, capacidade):
+    agentes = [
+        Agente(nome=f'Teste {i}', email=f'{uuid.uuid4().hex}@teste', senha_hash='-', status='online',
+               max_atendimentos=capacidade, atendimentos_ativos=0, total_atendimentos=0)
+        for i in range(total)
+    ]
+    db.session.add_all(agentes)
+    db.session.commit()
+    return [a.id for a in agentes]
+
+
+def _criar_atendimentos(total):
+    cliente = Cliente(nome='Teste', telefone=uuid.uuid4().hex[:20])
+    db.session.add(cliente)
+    db.session.flush()
+    atendimentos = [Atendimento(cliente_id=cliente.id, status='fila', prioridade=i % 3) for i in range(total)]
+    db.session.add_all(atendimentos)
+    db.session.commit()
+    return [a.id for a in atendimentos]
+
+
+def _em_paralelo(app, alvos):
+    """Roda cada função numa thread própria, com app context, largando todas juntas"""
+    largada = threading.Barrier(len(alvos))
+
+    def executar(alvo):
+        with app.app_context():
+            largada.wait()
+            try:
+                alvo()
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=executar, args=(alvo,)) for alvo in alvos]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def test_reivindicacoes_concorrentes_nunca_repetem_atendimento(app, contexto):
+    atendimento_ids = _criar_atendimentos(60)
+    agente_ids = _criar_agentes(6, capacidade=1000)
+    reivindicados = []
+    lock = threading.Lock()
+
+    def agente_trabalhando(agente_id):
+        def trabalhar():
+            while True:
+                atendimento = fila.reivindicar_proximo(agente_id)
+                if atendimento is None:
+                    return
+                with lock:
+                    reivindicados.append((atendimento.id, agente_id))
+        return trabalhar
+
+    _em_paralelo(app, [agente_trabalhando(agente_id) for agente_id in agente_ids])
+
+    repetidos = [i for i, n in Counter(i for i, _ in reivindicados).items() if n > 1]
+    assert not repetidos
+    assert {i for i, _ in reivindicados} == set(atendimento_ids)
+
+    por_agente = Counter(agente_id for _, agente_id in reivindicados)
+    for agente in Agente.query.filter(Agente.id.in_(agente_ids)):
+        assert agente.atendimentos_ativos == por_agente[agente.id]
+    for atendimento in Atendimento.query.filter(Atendimento.id.in_(atendimento_ids)):
+        assert (atendimento.id, atendimento.agente_id) in reivindicados
+
+
+def test_dois_agentes_disputando_o_mesmo_atendimento(app, contexto):
+    atendimento_id, = _criar_atendimentos(1)
+    agente_ids = _criar_agentes(2, capacidade=5)
+    resultados = {}
+
+    def atribuir(agente_id):
+        def tentar():
+            try:
+                fila.atribuir(atendimento_id, agente_id)
+                resultados[agente_id] = 'atribuido'
+            except fila.AtendimentoIndisponivel:
+                resultados[agente_id] = 'indisponivel'
+        return tentar
+
+    _em_paralelo(app, [atribuir(agente_id) for agente_id in agente_ids])
+
+    assert sorted(resultados.values()) == ['atribuido', 'indisponivel']
+    vencedor = next(a for a, r in resultados.items() if r == 'atribuido')
+    assert db.session.get(Atendimento, atendimento_id).agente_id == vencedor
+    # A vaga reservada por quem perdeu volta com o rollback
+    ativos = dict(db.session.query(Agente.id, Agente.atendimentos_ativos).filter(Agente.id.in_(agente_ids)))
+    assert ativos == {vencedor: 1, next(a for a in agente_ids if a != vencedor): 0}
@@ -0,0 +1,10 @@
+from src.services import indices
+
+
+def test_consultas_criticas_usam_indice(contexto):
+    """Mesma verificação do `flask verificar-indices`: nenhuma consulta crítica lê a tabela inteira"""
+    planos = indices.verificar_planos()
+
+    assert set(planos) == set(indices.consultas_criticas())
+    varreduras = {nome: plano for nome, (plano, completas) in planos.items() if completas}
+    assert not varreduras
@@ -0,0 +1,71 @@
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from src.models.user import db
+from src.models.atendimento import EntregaWebhook, Webhook
+from src.services.webhooks import enfileirar_webhooks, entregador
+
+
+@pytest.fixture
+def receptor():
+    """Servidor HTTP local que responde 500 na primeira entrega e 200 nas seguintes"""
+    recebidas = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            recebidas.append(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            self.send_response(500 if len(recebidas) == 1 else 200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{servidor.server_address[1]}/hook', recebidas
+    servidor.shutdown()
+
+
+def test_entrega_que_falha_e_repetida_ate_ser_entregue(contexto, receptor, monkeypatch):
+    url, recebidas = receptor
+    monkeypatch.setattr(entregador, 'backoff_base', 0.05)
+    monkeypatch.setattr(entregador, 'intervalo', 0.05)
+
+    evento = f'teste-{uuid.uuid4().hex}'
+    db.session.add(Webhook(nome='Teste', url=url, evento=evento, ativo=True))
+    db.session.commit()
+
+    assert enfileirar_webhooks(evento, {'atendimento_id': 1}) == 1
+    # O entregador só é acordado pelo commit de quem gravou a entrega
+    db.session.commit()
+
+    prazo = time.monotonic() + 10
+    while True:
+        db.session.expire_all()
+        entrega = EntregaWebhook.query.filter_by(evento=evento).one()
+        if entrega.status in ('entregue', 'falhou') or time.monotonic() > prazo:
+            break
+        time.sleep(0.05)
+
+    assert entrega.status == 'entregue'
+    assert entrega.tentativas == 2
+    assert entrega.ultimo_erro is None
+    assert len(recebidas) == 2
+    assert recebidas[0] == recebidas[1] == entrega.payload.encode()
+
+
+def test_entregas_desfeitas_com_a_transacao(contexto):
+    evento = f'teste-{uuid.uuid4().hex}'
+    db.session.add(Webhook(nome='Teste', url='http://127.0.0.1:9/hook', evento=evento, ativo=True))
+    db.session.commit()
+
+    enfileirar_webhooks(evento, {'atendimento_id': 1})
+    db.session.rollback()
+
+    assert EntregaWebhook.query.filter_by(evento=evento).count() == 0
+    assert 'webhooks_pendentes' not in db.session.info